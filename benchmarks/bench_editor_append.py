@@ -0,0 +1,95 @@
+# benchmarks/bench_editor_append.py
+# Uso: python -m benchmarks.bench_editor_append [--segments 10000] [--batch 8]
+# Misura la latenza per inserimento nell'editor interno durante una sessione lunga:
+# con la lettura O(1) dell'ultimo carattere gli ultimi inserimenti devono costare quanto i primi.
+import argparse
+import os
+import statistics
+import sys
+import time
+from typing import List
+
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")  # Nessuna finestra visibile
+from PyQt6.QtWidgets import QApplication, QTextEdit
+
+from src.core.output_handler import OutputHandler
+
+SAMPLE_SEGMENTS = [
+    "Il paziente riferisce dolore toracico da circa tre giorni.",
+    "Pressione arteriosa 130/85.",
+    "\n",
+    "Esame obiettivo nella norma (murmure vescicolare presente).",
+    "Si consiglia ECG di controllo.",
+]
+
+
+def percentile(values: List[float], q: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+def report(label: str, latencies_s: List[float]):
+    tenth = max(1, len(latencies_s) // 10)
+    first_ms = statistics.mean(latencies_s[:tenth]) * 1000
+    last_ms = statistics.mean(latencies_s[-tenth:]) * 1000
+    print(f"{label:22s} p50 {percentile(latencies_s, 0.5) * 1000:7.3f} ms  p95 {percentile(latencies_s, 0.95) * 1000:7.3f} ms  "
+          f"max {max(latencies_s) * 1000:7.2f} ms  primo 10% {first_ms:7.3f} ms  ultimo 10% {last_ms:7.3f} ms  "
+          f"totale {sum(latencies_s):6.2f} s")
+
+
+def run_single(segments: List[str]) -> List[float]:
+    editor = QTextEdit()
+    handler = OutputHandler(editor)
+    handler.set_output_mode(True, editor)
+    latencies_s = []
+    for text in segments:
+        started_at = time.perf_counter()
+        handler.type_text(text)
+        latencies_s.append(time.perf_counter() - started_at)
+    return latencies_s
+
+
+def run_batched(segments: List[str], batch_size: int) -> List[float]:
+    editor = QTextEdit()
+    handler = OutputHandler(editor)
+    handler.set_output_mode(True, editor)
+    latencies_s = []
+    for i in range(0, len(segments), batch_size):
+        batch = segments[i:i + batch_size]
+        started_at = time.perf_counter()
+        handler.type_batch(batch)
+        latencies_s.extend([(time.perf_counter() - started_at) / len(batch)] * len(batch))
+    return latencies_s
+
+
+def run_plain_text_copy(segments: List[str]) -> List[float]:
+    # Riferimento: il costo di toPlainText() a ogni inserimento, come faceva la versione precedente.
+    editor = QTextEdit()
+    latencies_s = []
+    for text in segments:
+        started_at = time.perf_counter()
+        _ = editor.toPlainText()[-1:]
+        editor.insertPlainText(text)
+        latencies_s.append(time.perf_counter() - started_at)
+    return latencies_s
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Latenza per inserimento nell'editor interno su una sessione lunga.")
+    parser.add_argument("--segments", type=int, default=10_000)
+    parser.add_argument("--batch", type=int, default=8, help="Testi per blocco in modalità type_batch")
+    parser.add_argument("--skip-plain-text", action="store_true", help="Salta il riferimento con toPlainText()")
+    args = parser.parse_args()
+
+    # Il logger scrive una riga per inserimento: qui interessa solo il costo dell'editor.
+    import logging
+    from src.utils.logger import app_logger
+    app_logger.setLevel(logging.WARNING)
+
+    app = QApplication(sys.argv)
+    test_segments = [SAMPLE_SEGMENTS[i % len(SAMPLE_SEGMENTS)] for i in range(args.segments)]
+    print(f"{args.segments} segmenti, {sum(map(len, test_segments))} caratteri totali")
+    report("type_text", run_single(test_segments))
+    report(f"type_batch ({args.batch})", run_batched(test_segments, args.batch))
+    if not args.skip_plain_text:
+        report("toPlainText() + insert", run_plain_text_copy(test_segments))
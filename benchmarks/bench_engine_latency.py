@@ -0,0 +1,89 @@
+# benchmarks/bench_engine_latency.py
+# Uso: python -m benchmarks.bench_engine_latency [--cycles 20] [--model tiny] [--listen 0.5]
+# Misura la latenza di START e STOP del worker persistente (TranscriptionEngine) su più cicli
+# e la confronta con il tempo di apertura/chiusura dello stream audio. Richiede un microfono.
+import argparse
+import shutil
+import tempfile
+import time
+from pathlib import Path
+from threading import Event
+
+from src.config import APP_PREFERENCES_FILENAME
+from src.core.profile_manager import ProfileManager
+from src.core.transcription_engine import TranscriptionEngine
+from src.utils.metrics import metrics
+
+PROFILE_NAME = "Benchmark Motore"
+
+
+def print_latencies(label: str, values_s):
+    values_ms = sorted(value * 1000 for value in values_s)
+    p50 = values_ms[len(values_ms) // 2]
+    p95 = values_ms[min(len(values_ms) - 1, int(len(values_ms) * 0.95))]
+    print(f"{label:32s} p50 {p50:8.2f} ms   p95 {p95:8.2f} ms   max {values_ms[-1]:8.2f} ms")
+
+
+def print_histogram(label: str, name: str):
+    snapshot = metrics.histogram(name).snapshot()
+    if not snapshot or not snapshot["count"]:
+        print(f"{label:32s} nessun dato")
+        return
+    print(f"{label:32s} p50 {snapshot['p50'] * 1000:8.2f} ms   p95 {snapshot['p95'] * 1000:8.2f} ms   "
+          f"max {snapshot['max'] * 1000:8.2f} ms")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Latenza di START/STOP del motore di trascrizione persistente.")
+    parser.add_argument("--cycles", type=int, default=20, help="Numero di cicli START/STOP")
+    parser.add_argument("--model", default="tiny", help="Modello Whisper del profilo di prova")
+    parser.add_argument("--listen", type=float, default=0.5, help="Secondi di ascolto per ciclo")
+    args = parser.parse_args()
+
+    import logging
+    from src.utils.logger import app_logger
+    app_logger.setLevel(logging.WARNING)
+
+    base_path = Path(tempfile.mkdtemp(prefix="bench_engine_latency_"))
+    started, stopped = Event(), Event()
+    failures = []
+
+    def on_started(success: bool, message: str):
+        if not success: failures.append(message)
+        started.set()
+
+    pm = ProfileManager(profiles_dir=base_path / "profiles", app_prefs_file=base_path / APP_PREFERENCES_FILENAME)
+    pm.create_profile(PROFILE_NAME)
+    pm.load_profile(PROFILE_NAME)
+    pm.set_profile_setting("whisper_model", args.model)
+    engine = TranscriptionEngine(pm, on_started=on_started, on_stopped=stopped.set)
+    engine.start()
+    try:
+        # Il primo comando carica il modello: escluso dalla misura, come il precaricamento della GUI.
+        loading_started_at = time.perf_counter()
+        engine.request_reconfigure()
+        engine.request_start(); started.wait()
+        print(f"Caricamento modello '{args.model}' + primo START: {(time.perf_counter() - loading_started_at):.2f} s")
+        engine.request_stop(); stopped.wait()
+        if failures:
+            print(f"Avvio fallito: {failures[0]}")
+        else:
+            start_latencies, stop_latencies = [], []
+            for _ in range(args.cycles):
+                started.clear(); stopped.clear()
+                requested_at = time.perf_counter()
+                engine.request_start(); started.wait()
+                start_latencies.append(time.perf_counter() - requested_at)
+                time.sleep(args.listen)
+                requested_at = time.perf_counter()
+                engine.request_stop(); stopped.wait()
+                stop_latencies.append(time.perf_counter() - requested_at)
+            print(f"{args.cycles} cicli START/STOP, {args.listen}s di ascolto ciascuno")
+            print_latencies("START (comando -> ascolto)", start_latencies)
+            print_histogram("  apertura stream audio", "audio.stream_open_s")
+            print_latencies("STOP (comando -> fermo)", stop_latencies)
+            print_histogram("  chiusura stream audio", "audio.stream_close_s")
+    finally:
+        engine.shutdown(timeout=10.0)
+        pm.flush_pending_writes()
+        shutil.rmtree(base_path, ignore_errors=True)
@@ -0,0 +1,130 @@
+# benchmarks/bench_logging.py
+# Uso: python -m benchmarks.bench_logging [--utterances 2000]
+# Misura quanto costa il logging, per frase dettata, al thread che logga: elaborazione del testo
+# (TextProcessor.process_text) più i messaggi della pipeline (segmentazione, inferenza, output).
+# Confronta la configurazione precedente (FileHandler e console sincroni, livello DEBUG, f-string)
+# con quella attuale (QueueHandler/QueueListener, formattazione differita) a livello INFO e DEBUG.
+import argparse
+import contextlib
+import logging
+import os
+import shutil
+import tempfile
+import time
+from pathlib import Path
+
+from src.core.profile_snapshot import ProfileSnapshot
+from src.core.text_processor import TextProcessor
+from src.utils.logger import LOG_FORMAT, app_logger, setup_logger, stop_logging
+
+SAMPLE_TEXTS = [
+    "Buongiorno, oggi visita di controllo per il paziente.",
+    "Pressione arteriosa nella norma. A capo. Prossimo controllo tra tre mesi.",
+    "Firma dottore",
+    "Il paziente riferisce dolore toracico da circa due giorni, non irradiato.",
+]
+
+
+class BenchProfileManager:
+    def __init__(self):
+        macros = {"firma dottore": "Dr. Mario Rossi\nSpecialista in Cardiologia"}
+        self.snapshot = ProfileSnapshot("bench", {"display_name": "Benchmark"}, macros, {}, 1)
+
+    def get_current_profile_display_name(self): return "Benchmark"
+
+
+def legacy_pipeline_logs(logger: logging.Logger, text: str):
+    # Chiamate come erano prima: f-string costruite sempre, anche quando il livello le scarta
+    logger.debug(f"Processo SILENZIO ({0.62:.2f}s). Buffer: {2.40:.2f}s, parlato: {1.70:.2f}s")
+    logger.info(f"Segmento in coda di inferenza: {2.40:.2f}s di audio (in attesa: {0}).")
+    logger.info(f"Invio a Whisper: {2.40:.2f}s di audio.")
+    logger.info(f"Whisper ha trascritto: {repr(text)}")
+    logger.info(f"TextProcessor: Input originale: '{text}' (Profilo: Benchmark)")
+    logger.info(f"TextProcessor: Output finale: '{text}'")
+    logger.debug(f"MainWindow: Testo grezzo da thread: {repr(text)}")
+    logger.info(f"OutputHandler: Inserimento testo: '{text}'")
+    logger.info(f"OutputHandler: Testo digitato\n"
+                f"  lunghezza: {len(text)}\n"
+                f"  contenuto: {repr(text)}")
+
+
+def pipeline_logs(logger: logging.Logger, text: str):
+    # Chiamate attuali: argomenti %-style, formattati solo se il record viene emesso
+    logger.debug("Processo SILENZIO (%.2fs). Buffer: %.2fs, parlato: %.2fs", 0.62, 2.40, 1.70)
+    logger.info("Segmento in coda di inferenza: %.2fs di audio (in attesa: %d).", 2.40, 0)
+    logger.debug("Invio a Whisper: %.2fs di audio%s.", 2.40, "")
+    logger.debug("Whisper ha trascritto: %r", text)
+    logger.debug("MainWindow: Testo grezzo da thread: %r", text)
+    logger.debug("OutputHandler: Inserimento testo: %r", text)
+    logger.debug("OutputHandler: Testo digitato (%d caratteri): %r", len(text), text)
+
+
+def configure_legacy(log_file: Path, devnull):
+    stop_logging(app_logger.name)
+    app_logger.handlers.clear()
+    for log_filter in list(app_logger.filters):
+        app_logger.removeFilter(log_filter)
+    formatter = logging.Formatter(LOG_FORMAT)
+    for handler in (logging.FileHandler(log_file, encoding='utf-8'), logging.StreamHandler(devnull)):
+        handler.setFormatter(formatter)
+        app_logger.addHandler(handler)
+    app_logger.setLevel(logging.DEBUG)
+
+
+def configure_queue(log_file: Path, devnull, level_name: str):
+    # La console del listener scrive su devnull: si misura il costo per il thread, non per il terminale
+    with contextlib.redirect_stdout(devnull):
+        setup_logger(app_logger.name, log_file, level_name)
+
+
+def run_utterances(processor: TextProcessor, count: int, log_calls) -> float:
+    started_at = time.perf_counter()
+    for i in range(count):
+        text = SAMPLE_TEXTS[i % len(SAMPLE_TEXTS)]
+        processed = processor.process_text(text)
+        log_calls(app_logger, processed)
+    return time.perf_counter() - started_at
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Costo del logging per frase dettata, prima e dopo.")
+    parser.add_argument("--utterances", type=int, default=2000, help="Numero di frasi simulate per configurazione")
+    args = parser.parse_args()
+
+    base_path = Path(tempfile.mkdtemp(prefix="bench_logging_"))
+    processor = TextProcessor(BenchProfileManager())
+    results = []
+    with open(os.devnull, 'w') as devnull:
+        try:
+            # Riferimento: logging spento, resta solo l'elaborazione del testo
+            configure_queue(base_path / "off.log", devnull, "INFO")
+            app_logger.setLevel(logging.CRITICAL + 1)
+            baseline_s = run_utterances(processor, args.utterances, pipeline_logs)
+
+            configure_legacy(base_path / "legacy.log", devnull)
+            elapsed_s = run_utterances(processor, args.utterances, legacy_pipeline_logs)
+            results.append(("Prima: sincrono, DEBUG, f-string", elapsed_s, 0.0, base_path / "legacy.log"))
+            for handler in list(app_logger.handlers):
+                handler.close()
+                app_logger.removeHandler(handler)
+
+            for level_name in ("INFO", "DEBUG"):
+                log_file = base_path / f"queue_{level_name.lower()}.log"
+                configure_queue(log_file, devnull, level_name)
+                elapsed_s = run_utterances(processor, args.utterances, pipeline_logs)
+                drain_started_at = time.perf_counter()
+                stop_logging(app_logger.name) # Il listener scrive su disco i record ancora in coda
+                drain_s = time.perf_counter() - drain_started_at
+                results.append((f"Dopo: coda, {level_name}", elapsed_s, drain_s, log_file))
+        finally:
+            app_logger.handlers.clear()
+            stop_logging(app_logger.name)
+            setup_logger()
+
+    print(f"{args.utterances} frasi simulate. Logging spento: {baseline_s / args.utterances * 1e6:8.1f} us/frase")
+    for label, elapsed_s, drain_s, log_file in results:
+        overhead_us = (elapsed_s - baseline_s) / args.utterances * 1e6
+        log_size_kb = log_file.stat().st_size / 1024 if log_file.exists() else 0.0
+        print(f"{label:34s} overhead {overhead_us:8.1f} us/frase   "
+              f"svuotamento coda {drain_s * 1000:7.1f} ms   file {log_size_kb:8.1f} KB")
+    shutil.rmtree(base_path, ignore_errors=True)
@@ -0,0 +1,173 @@
+# benchmarks/bench_pipeline_overhead.py
+# Uso: python -m benchmarks.bench_pipeline_overhead [--utterances 20] [--speed 4] [--fixed-delay 0.05] [--rtf 0.1]
+# Misura il costo della pipeline senza l'inferenza: frasi sintetiche riprodotte con ReplayInputStream,
+# motore finto "fake-whisper" (ritardo noto, testo dal copione), TextProcessor, pipeline di output e
+# consegna al thread Qt tramite un segnale in coda, come fa MainWindow. Tutto è deterministico e
+# non richiede modelli, microfono né display: adatto anche alla CI.
+import argparse
+import shutil
+import sys
+import tempfile
+import time
+from pathlib import Path
+from threading import Thread
+from typing import Dict, List, Optional
+
+import numpy as np
+from PyQt6.QtCore import QCoreApplication, QObject, pyqtSignal
+
+from src.config import APP_PREFERENCES_FILENAME, AUDIO_SAMPLE_RATE, FAKE_WHISPER_BACKEND
+from src.core.output_pipeline import OutputPipeline
+from src.core.profile_manager import ProfileManager
+from src.core.replay_stream import ReplayInputStream
+from src.core.text_processor import TextProcessor
+from src.core.transcriber import Transcriber
+from src.utils.metrics import metrics
+
+PROFILE_NAME = "Benchmark Pipeline"
+# Fasi nell'ordine in cui le attraversa una frase, dal blocco audio catturato al testo nella GUI
+STAGE_HISTOGRAMS = [
+    ("audio.block_queue_wait_s", "callback audio -> segmentatore"),
+    ("audio.segmentation_delay_s", "fine parlato -> segmento chiuso"),
+    ("audio.concatenate_s", "concatenazione blocchi"),
+    ("inference.queue_wait_s", "attesa coda di inferenza"),
+    ("inference.duration_s", "inferenza (finta)"),
+    ("text.process_s", "TextProcessor"),
+    ("output.queue_wait_s", "attesa coda di output"),
+    ("output.gui_dispatch_s", "segnale Qt -> thread GUI"),
+    ("latency.end_to_end_s", "fine parlato -> testo nella GUI"),
+]
+
+
+class GuiProbe(QObject):
+    """Fa la parte di MainWindow: riceve i testi nel thread Qt con un segnale in coda."""
+    output_batch_ready = pyqtSignal(list, float, list)
+    replay_done = pyqtSignal()
+
+    def __init__(self):
+        super().__init__()
+        self.delivered_texts: List[str] = []
+        self.output_pipeline: Optional[OutputPipeline] = None
+        self.output_batch_ready.connect(self._on_output_batch)
+
+    def deliver(self, texts: List[str], speech_ends: List[float]) -> bool:
+        # Come l'editor interno: la latenza end-to-end si registra nel thread Qt, dopo l'inserimento
+        self.output_batch_ready.emit(texts, time.monotonic(), speech_ends)
+        return False
+
+    def _on_output_batch(self, texts: List[str], emitted_at: float, speech_ends: List[float]):
+        metrics.histogram("output.gui_dispatch_s").observe(time.monotonic() - emitted_at)
+        self.delivered_texts.extend(texts)
+        self.output_pipeline.observe_delivered(speech_ends)
+
+
+def synthetic_utterances(count: int, speech_s: float = 1.5, pause_s: float = 1.5, seed: int = 0) -> np.ndarray:
+    """Frasi finte: toni armonici modulati (sopra la soglia del VAD a energia) separati da silenzio."""
+    rng = np.random.default_rng(seed)
+    speech_t = np.arange(int(speech_s * AUDIO_SAMPLE_RATE)) / AUDIO_SAMPLE_RATE
+    pause = np.zeros(int(pause_s * AUDIO_SAMPLE_RATE), dtype=np.float32)
+    parts = [pause]
+    for _ in range(count):
+        pitch = rng.uniform(110.0, 220.0)
+        envelope = 0.5 + 0.5 * np.sin(2 * np.pi * 4.0 * speech_t) # ~4 sillabe al secondo
+        tone = sum(np.sin(2 * np.pi * pitch * k * speech_t) / k for k in (1, 2, 3))
+        parts.append((0.1 * envelope * tone).astype(np.float32))
+        parts.append(pause)
+    return np.concatenate(parts).astype(np.float32)
+
+
+def run_pipeline(utterances: int, speed: float, fixed_delay_s: float, rtf: float) -> Dict[str, Optional[float]]:
+    """
+    Esegue il replay e restituisce le statistiche per fase (p50/p95 in secondi) più l'overhead medio
+    della pipeline fino al thread Qt, esclusi segmentazione (attesa del silenzio) e inferenza finta.
+    """
+    app = QCoreApplication.instance() or QCoreApplication(sys.argv)
+    # Le medie si calcolano sulla differenza dei totali: le metriche sono globali e cumulative
+    totals_before = {name: (metrics.histogram(name).count, metrics.histogram(name).total) for name, _ in STAGE_HISTOGRAMS}
+    base_path = Path(tempfile.mkdtemp(prefix="bench_pipeline_"))
+    pm = ProfileManager(profiles_dir=base_path / "profiles", app_prefs_file=base_path / APP_PREFERENCES_FILENAME)
+    pm.create_profile(PROFILE_NAME)
+    pm.load_profile(PROFILE_NAME)
+    pm.set_profile_setting("inference_backend", FAKE_WHISPER_BACKEND)
+
+    probe = GuiProbe()
+    probe.replay_done.connect(app.quit)
+    output_pipeline = OutputPipeline(TextProcessor(pm).process_text, probe.deliver)
+    probe.output_pipeline = output_pipeline
+    output_pipeline.start()
+    transcriber = Transcriber(
+        pm, on_transcription_callback=lambda text, speech_ended_at: output_pipeline.submit(text, speech_ended_at=speech_ended_at)
+    )
+    errors: List[str] = []
+
+    def replay():
+        try:
+            stream = transcriber.stream
+            stream.wait_finished(timeout=stream.duration_s / speed + 30.0)
+            transcriber.stop_listening()
+            output_pipeline.wait_idle(timeout=10.0)
+        except Exception as e:
+            errors.append(str(e))
+        finally:
+            probe.replay_done.emit()
+
+    try:
+        if not transcriber.model:
+            raise RuntimeError(f"Motore '{FAKE_WHISPER_BACKEND}' non caricato.")
+        fake_model = transcriber.backend.model
+        fake_model.fixed_delay_s, fake_model.rtf = fixed_delay_s, rtf
+        fake_model.reset()
+        transcriber.stream_factory = ReplayInputStream.factory(synthetic_utterances(utterances), speed=speed)
+        if not transcriber.start_listening():
+            raise RuntimeError("Avvio della riproduzione fallito.")
+        worker = Thread(target=replay, name="PipelineReplay", daemon=True)
+        worker.start()
+        app.exec()
+        worker.join()
+        app.processEvents() # Consegna gli ultimi segnali già in coda
+        if errors:
+            raise RuntimeError(errors[0])
+    finally:
+        transcriber.close()
+        output_pipeline.stop(timeout=5.0)
+        pm.flush_pending_writes()
+        shutil.rmtree(base_path, ignore_errors=True)
+
+    stats: Dict[str, Optional[float]] = {"delivered": float(len(probe.delivered_texts))}
+    means: Dict[str, float] = {}
+    for name, _ in STAGE_HISTOGRAMS:
+        histogram = metrics.histogram(name)
+        stats[f"{name}:p50"] = histogram.percentile(0.5)
+        stats[f"{name}:p95"] = histogram.percentile(0.95)
+        count_before, total_before = totals_before[name]
+        count = histogram.count - count_before
+        means[name] = (histogram.total - total_before) / count if count else 0.0
+    # latency.end_to_end_s arriva fino al testo inserito nel thread Qt, salto del segnale compreso
+    stats["overhead_mean_s"] = (means["latency.end_to_end_s"]
+                                - means["audio.segmentation_delay_s"] - means["inference.duration_s"])
+    return stats
+
+
+def format_ms(value: Optional[float]) -> str:
+    return f"{value * 1000:9.3f} ms" if value is not None else "        -   "
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Overhead della pipeline di dettatura con il motore finto.")
+    parser.add_argument("--utterances", type=int, default=20, help="Numero di frasi sintetiche")
+    parser.add_argument("--speed", type=float, default=4.0, help="Velocità di riproduzione (1 = tempo reale)")
+    parser.add_argument("--fixed-delay", type=float, default=0.05, help="Ritardo fisso dell'inferenza finta (s)")
+    parser.add_argument("--rtf", type=float, default=0.1, help="Ritardo dell'inferenza finta per secondo di audio")
+    args = parser.parse_args()
+
+    import logging
+    from src.utils.logger import app_logger
+    app_logger.setLevel(logging.WARNING)
+
+    stats = run_pipeline(args.utterances, args.speed, args.fixed_delay, args.rtf)
+    print(f"{args.utterances} frasi sintetiche, velocità x{args.speed}, inferenza finta "
+          f"{args.fixed_delay * 1000:.0f} ms + {args.rtf:.2f} x audio; testi consegnati: {stats['delivered']:.0f}")
+    print(f"{'fase':34s} {'p50':>12s} {'p95':>12s}")
+    for name, label in STAGE_HISTOGRAMS:
+        print(f"{label:34s} {format_ms(stats[f'{name}:p50'])} {format_ms(stats[f'{name}:p95'])}")
+    print(f"\nOverhead medio della pipeline (esclusi attesa del silenzio e inferenza): {format_ms(stats['overhead_mean_s'])}")
@@ -0,0 +1,71 @@
+# benchmarks/bench_profile_catalog.py
+# Uso: python -m benchmarks.bench_profile_catalog [--profiles 1000]
+# Confronta la scansione completa della cartella dei profili (lettura di ogni settings.json)
+# con le richieste servite dal catalogo in memoria di ProfileManager.
+import argparse
+import json
+import shutil
+import tempfile
+import time
+from pathlib import Path
+from typing import Callable
+
+from src.config import PROFILE_SETTINGS_FILENAME, APP_PREFERENCES_FILENAME
+from src.core.profile_manager import ProfileManager
+
+
+def create_profiles(profiles_dir: Path, count: int):
+    for i in range(count):
+        profile_path = profiles_dir / f"profilo_{i:05d}"
+        profile_path.mkdir(parents=True)
+        with open(profile_path / PROFILE_SETTINGS_FILENAME, 'w', encoding='utf-8') as f:
+            json.dump({"display_name": f"Profilo {i:05d}", "whisper_model": "base", "language": "italian"}, f)
+
+
+def full_scan(profiles_dir: Path) -> dict:
+    # Come faceva _get_available_profiles_internal prima del catalogo
+    profiles_map = {}
+    for item_path in profiles_dir.iterdir():
+        if item_path.is_dir():
+            with open(item_path / PROFILE_SETTINGS_FILENAME, 'r', encoding='utf-8') as f:
+                profiles_map[item_path.name] = json.load(f)["display_name"]
+    return profiles_map
+
+
+def measure(label: str, fn: Callable[[], object], repeat: int):
+    started_at = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    elapsed_ms = (time.perf_counter() - started_at) * 1000 / repeat
+    print(f"{label:50s} {elapsed_ms:9.3f} ms")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Costo delle ricerche sui profili con e senza catalogo in memoria.")
+    parser.add_argument("--profiles", type=int, default=1000)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    import logging
+    from src.utils.logger import app_logger
+    app_logger.setLevel(logging.WARNING)
+
+    base_path = Path(tempfile.mkdtemp(prefix="bench_profiles_"))
+    try:
+        profiles_dir = base_path / "profiles"
+        create_profiles(profiles_dir, args.profiles)
+        target_name = f"profilo {args.profiles - 1:05d}"  # Maiuscole diverse: ricerca case-insensitive
+        print(f"{args.profiles} profili in {profiles_dir}")
+
+        measure("scansione completa (versione precedente)", lambda: full_scan(profiles_dir), args.repeat)
+        started_at = time.perf_counter()
+        pm = ProfileManager(profiles_dir=profiles_dir, app_prefs_file=base_path / APP_PREFERENCES_FILENAME)
+        pm.get_available_profiles()
+        print(f"{'ProfileManager() + primo elenco (catalogo freddo)':50s} {(time.perf_counter() - started_at) * 1000:9.3f} ms")
+        measure("get_available_profiles()", pm.get_available_profiles, args.repeat)
+        measure("profile_display_name_exists()", lambda: pm.profile_display_name_exists(target_name), args.repeat)
+        measure("load_profile()", lambda: pm.load_profile(target_name), args.repeat)
+        pm.profile_catalog.invalidate()
+        measure("get_available_profiles() dopo invalidate()", pm.get_available_profiles, 1)
+    finally:
+        shutil.rmtree(base_path, ignore_errors=True)
@@ -0,0 +1,76 @@
+# benchmarks/bench_profile_store.py
+# Uso: python -m benchmarks.bench_profile_store [--terms 50000]
+# Confronta i due motori di archiviazione dei profili ("json" e "sqlite") con un vocabolario grande:
+# caricamento del profilo, primo accesso al vocabolario, aggiunta di un termine con salvataggio.
+import argparse
+import shutil
+import tempfile
+import time
+from pathlib import Path
+from typing import Callable
+
+from src.config import APP_PREFERENCES_FILENAME
+from src.core.profile_manager import ProfileManager
+
+PROFILE_NAME = "Vocabolario Grande"
+
+
+def measure(label: str, fn: Callable[[], object], repeat: int):
+    started_at = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    elapsed_ms = (time.perf_counter() - started_at) * 1000 / repeat
+    print(f"{label:50s} {elapsed_ms:9.3f} ms")
+
+
+def run_engine(engine: str, base_path: Path, terms: int, repeat: int):
+    profiles_dir = base_path / engine / "profiles"
+    prefs_file = base_path / engine / APP_PREFERENCES_FILENAME
+    pm = ProfileManager(profiles_dir=profiles_dir, app_prefs_file=prefs_file, storage_engine=engine)
+    pm.create_profile(PROFILE_NAME)
+    pm.load_profile(PROFILE_NAME)
+    pm.update_vocabulary([f"termine_{i:06d}" for i in range(terms)])
+    pm.update_macros({f"macro {i}": f"espansione {i}" for i in range(terms // 10)})
+    pm.save_current_profile_data()
+    pm.flush_pending_writes()
+
+    print(f"--- motore '{engine}' ---")
+    measure("load_profile()", lambda: pm.load_profile(PROFILE_NAME), repeat)
+
+    def load_and_read():
+        pm.load_profile(PROFILE_NAME)
+        pm.get_vocabulary()
+    measure("load_profile() + get_vocabulary()", load_and_read, repeat)
+
+    counter = iter(range(10 ** 9))
+
+    def add_term_and_save():
+        pm.add_vocabulary_terms([f"nuovo_{next(counter)}"])
+        pm.save_current_profile_data()
+        pm.flush_pending_writes() # Include la scrittura su disco (con JSON: l'intero file)
+    measure("add_vocabulary_terms() + salvataggio", add_term_and_save, repeat)
+
+    def edit_macro_and_save():
+        pm.add_macro("macro 1", f"modificata {next(counter)}")
+        pm.save_current_profile_data()
+        pm.flush_pending_writes()
+    measure("add_macro() + salvataggio", edit_macro_and_save, repeat)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Motori di archiviazione dei profili con un vocabolario grande.")
+    parser.add_argument("--terms", type=int, default=50_000)
+    parser.add_argument("--repeat", type=int, default=10)
+    args = parser.parse_args()
+
+    import logging
+    from src.utils.logger import app_logger
+    app_logger.setLevel(logging.WARNING)
+
+    base_path = Path(tempfile.mkdtemp(prefix="bench_profile_store_"))
+    try:
+        print(f"{args.terms} termini, {args.terms // 10} macro")
+        for engine in ("json", "sqlite"):
+            run_engine(engine, base_path, args.terms, args.repeat)
+    finally:
+        shutil.rmtree(base_path, ignore_errors=True)
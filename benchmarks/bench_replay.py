@@ -0,0 +1,144 @@
+# benchmarks/bench_replay.py
+# Uso: python -m benchmarks.bench_replay CORPUS [--model tiny] [--speed 4] [--jitter 0.02] [--dropout 0.01]
+# Fa passare un corpus di file audio nella pipeline completa (Transcriber con ReplayInputStream al posto
+# del microfono, TextProcessor, pipeline di output con sink nullo) e riporta latenza, RTF e WER.
+# CORPUS: una cartella o un elenco di file (.wav, .flac, .ogg); il riferimento di "frase.wav" è "frase.txt".
+# Non richiede microfono né scheda audio: funziona anche su un server Linux headless.
+import argparse
+import shutil
+import tempfile
+from pathlib import Path
+from typing import List, Optional, Tuple
+
+from src.config import (
+    APP_PREFERENCES_FILENAME, DEFAULT_WHISPER_MODEL, DEFAULT_LANGUAGE, DEFAULT_INFERENCE_BACKEND, AUDIO_SAMPLE_RATE
+)
+from src.core.output_pipeline import OutputPipeline
+from src.core.profile_manager import ProfileManager
+from src.core.replay_stream import ReplayInputStream
+from src.core.text_processor import TextProcessor
+from src.core.transcriber import Transcriber
+from src.utils.audio_files import read_wav_mono, word_errors
+from src.utils.metrics import metrics
+
+PROFILE_NAME = "Benchmark Replay"
+AUDIO_EXTENSIONS = {".wav", ".flac", ".ogg"}
+
+
+def collect_corpus(paths: List[str]) -> List[Path]:
+    files: List[Path] = []
+    for path in map(Path, paths):
+        if path.is_dir():
+            files.extend(sorted(p for p in path.iterdir() if p.suffix.lower() in AUDIO_EXTENSIONS))
+        elif path.suffix.lower() in AUDIO_EXTENSIONS:
+            files.append(path)
+    return files
+
+
+def read_reference(audio_path: Path) -> Optional[str]:
+    reference_path = audio_path.with_suffix(".txt")
+    return reference_path.read_text(encoding='utf-8').strip() if reference_path.exists() else None
+
+
+def histogram_totals(name: str) -> Tuple[int, float]:
+    histogram = metrics.histogram(name)
+    return histogram.count, histogram.total
+
+
+def format_seconds(value: Optional[float]) -> str:
+    return f"{value:6.2f}s" if value is not None else "     -"
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Riproduce un corpus audio nella pipeline di dettatura e misura latenza, RTF e WER.")
+    parser.add_argument("corpus", nargs="+", help="Cartelle o file audio; riferimento in <nome>.txt accanto all'audio")
+    parser.add_argument("--model", default=DEFAULT_WHISPER_MODEL, help="Modello Whisper del profilo di prova")
+    parser.add_argument("--backend", default=DEFAULT_INFERENCE_BACKEND, help="Motore di inferenza del profilo di prova")
+    parser.add_argument("--language", default=DEFAULT_LANGUAGE, help="Lingua del profilo di prova")
+    parser.add_argument("--speed", type=float, default=1.0, help="Velocità di riproduzione (1 = tempo reale)")
+    parser.add_argument("--jitter", type=float, default=0.0, help="Ritardo casuale massimo per blocco (s)")
+    parser.add_argument("--dropout", type=float, default=0.0, help="Probabilità di perdere un blocco audio")
+    parser.add_argument("--tail-silence", type=float, default=1.0, help="Silenzio aggiunto in fondo a ogni file (s)")
+    parser.add_argument("--seed", type=int, default=0, help="Seme per jitter e perdite (riproducibilità)")
+    args = parser.parse_args()
+
+    import logging
+    from src.utils.logger import app_logger
+    app_logger.setLevel(logging.WARNING)
+
+    corpus = collect_corpus(args.corpus)
+    if not corpus:
+        parser.error("Nessun file audio trovato nel corpus.")
+
+    base_path = Path(tempfile.mkdtemp(prefix="bench_replay_"))
+    pm = ProfileManager(profiles_dir=base_path / "profiles", app_prefs_file=base_path / APP_PREFERENCES_FILENAME)
+    pm.create_profile(PROFILE_NAME)
+    pm.load_profile(PROFILE_NAME)
+    with pm.batch_update():
+        pm.set_profile_setting("whisper_model", args.model)
+        pm.set_profile_setting("inference_backend", args.backend)
+        pm.set_profile_setting("language", args.language)
+
+    delivered_texts: List[str] = []
+    output_pipeline = OutputPipeline(TextProcessor(pm).process_text,
+                                     lambda texts, speech_ends: delivered_texts.extend(texts)) # Sink nullo: raccoglie e basta
+    output_pipeline.start()
+    transcriber = Transcriber(
+        pm, on_transcription_callback=lambda text, speech_ended_at: output_pipeline.submit(text, speech_ended_at=speech_ended_at)
+    )
+    try:
+        if not transcriber.model:
+            print(f"Modello '{args.model}' ({args.backend}) non caricato: impossibile eseguire il replay.")
+            raise SystemExit(1)
+        total_audio_s = total_inference_s = 0.0
+        total_errors = total_reference_words = 0
+        print(f"{'file':28s} {'audio':>7s} {'RTF':>6s} {'latenza media':>14s} {'WER':>7s}")
+        for audio_path in corpus:
+            samples, _ = read_wav_mono(audio_path)
+            audio_s = len(samples) / AUDIO_SAMPLE_RATE
+            transcriber.stream_factory = ReplayInputStream.factory(
+                samples, speed=args.speed, jitter_s=args.jitter, dropout_rate=args.dropout,
+                tail_silence_s=args.tail_silence, seed=args.seed
+            )
+            delivered_texts.clear()
+            _, inference_total = histogram_totals("inference.duration_s")
+            latency_count, latency_total = histogram_totals("latency.end_to_end_s")
+            if not transcriber.start_listening():
+                print(f"{audio_path.name[:28]:28s} avvio della riproduzione fallito")
+                continue
+            stream = transcriber.stream
+            stream.wait_finished(timeout=stream.duration_s / args.speed + 30.0)
+            transcriber.stop_listening() # Trascrive anche il parlato ancora nel buffer
+            output_pipeline.wait_idle(timeout=10.0)
+
+            file_inference_s = histogram_totals("inference.duration_s")[1] - inference_total
+            new_latency_count, new_latency_total = histogram_totals("latency.end_to_end_s")
+            mean_latency = ((new_latency_total - latency_total) / (new_latency_count - latency_count)
+                            if new_latency_count > latency_count else None)
+            total_audio_s += audio_s; total_inference_s += file_inference_s
+            hypothesis = " ".join(delivered_texts)
+            reference = read_reference(audio_path)
+            wer_text = "      -"
+            if reference is not None:
+                errors, reference_words = word_errors(reference, hypothesis)
+                total_errors += errors; total_reference_words += reference_words
+                wer_text = f"{errors / max(1, reference_words) * 100:6.1f}%"
+            rtf = file_inference_s / audio_s if audio_s else 0.0
+            print(f"{audio_path.name[:28]:28s} {audio_s:6.1f}s {rtf:6.3f} {format_seconds(mean_latency):>14s} {wer_text}")
+
+        latency = metrics.histogram("latency.end_to_end_s")
+        print(f"\nTotale: {len(corpus)} file, {total_audio_s:.1f}s di audio, velocità x{args.speed}, "
+              f"jitter {args.jitter * 1000:.0f} ms, perdite {args.dropout * 100:.1f}%")
+        print(f"RTF inferenza: {total_inference_s / max(total_audio_s, 1e-9):.3f}")
+        print(f"Latenza fine parlato -> testo: p50 {format_seconds(latency.percentile(0.5))}   "
+              f"p95 {format_seconds(latency.percentile(0.95))}   max {format_seconds(latency.max)}")
+        print(f"Segmentazione (p50): {format_seconds(metrics.histogram('audio.segmentation_delay_s').percentile(0.5))}   "
+              f"segmenti persi: {metrics.counter('inference.segments_dropped').value}   "
+              f"trascrizioni vuote: {metrics.counter('inference.empty_transcripts').value}")
+        if total_reference_words:
+            print(f"WER: {total_errors / total_reference_words * 100:.1f}% ({total_errors}/{total_reference_words} parole)")
+    finally:
+        transcriber.close()
+        output_pipeline.stop(timeout=5.0)
+        pm.flush_pending_writes()
+        shutil.rmtree(base_path, ignore_errors=True)
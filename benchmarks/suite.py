@@ -0,0 +1,315 @@
+# benchmarks/suite.py
+# Uso:
+#   python -m benchmarks.suite run [--output results.json] [--groups model,inference,text,profiles,editor,pipeline] [--models tiny,base]
+#   python -m benchmarks.suite run --save-baseline
+#   python -m benchmarks.suite compare [CURRENT] [--baseline benchmarks/baselines/baseline.json] [--threshold 0.10]
+# Esegue le misure che contano per l'app e le salva in JSON con i dati dell'ambiente; compare le confronta
+# con una baseline salvata e termina con codice 1 se qualcosa è peggiorato oltre la soglia, se mancano misure
+# della baseline o se la suite ha avuto errori (gate per gli aggiornamenti).
+# La baseline dipende dalla macchina: va generata con --save-baseline sulla stessa macchina (o runner CI)
+# che esegue il confronto e salvata nel repository in benchmarks/baselines/ (vedi README, "Benchmark").
+import argparse
+import json
+import os
+import platform
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+from importlib import metadata
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional
+
+import numpy as np
+
+from src.config import (
+    APP_NAME, VERSION, APP_PREFERENCES_FILENAME, AVAILABLE_WHISPER_MODELS, DEFAULT_INFERENCE_BACKEND,
+    DEFAULT_LANGUAGE, AUDIO_SAMPLE_RATE
+)
+
+BENCHMARKS_DIR = Path(__file__).resolve().parent
+DEFAULT_RESULTS_FILE = BENCHMARKS_DIR / "results" / "latest.json"
+DEFAULT_BASELINE_FILE = BENCHMARKS_DIR / "baselines" / "baseline.json"
+DEFAULT_REGRESSION_THRESHOLD = 0.10  # Peggioramento relativo tollerato (10%)
+SEGMENT_DURATIONS_S = [1, 3, 6, 15]
+RULE_COUNTS = [10, 1_000, 10_000]
+PROFILE_COUNTS = [10, 100, 1_000]
+EDITOR_SEGMENT_COUNTS = [1_000, 10_000]
+PIPELINE_UTTERANCES = 10
+ALL_GROUPS = ["model", "inference", "text", "profiles", "editor", "pipeline"]
+
+
+class SuiteResults:
+    def __init__(self):
+        self.results: List[Dict[str, Any]] = []
+        self.errors: List[Dict[str, str]] = []
+
+    def add(self, name: str, value: float, unit: str, lower_is_better: bool = True):
+        self.results.append({"name": name, "value": value, "unit": unit, "lower_is_better": lower_is_better})
+        print(f"  {name:45s} {value:12.4f} {unit}")
+
+    def add_error(self, name: str, error: Exception):
+        self.errors.append({"name": name, "error": str(error)})
+        print(f"  {name:45s} ERRORE: {error}")
+
+
+def median_time_s(fn: Callable[[], object], repeat: int) -> float:
+    durations = []
+    for _ in range(repeat):
+        started_at = time.perf_counter()
+        fn()
+        durations.append(time.perf_counter() - started_at)
+    return statistics.median(durations)
+
+
+def package_version(name: str) -> Optional[str]:
+    try:
+        return metadata.version(name)
+    except metadata.PackageNotFoundError:
+        return None
+
+
+def collect_environment() -> Dict[str, Any]:
+    try:
+        git_commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=BENCHMARKS_DIR, capture_output=True,
+                                    text=True, timeout=5).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        git_commit = None
+    return {
+        "app": f"{APP_NAME} {VERSION}",
+        "git_commit": git_commit,
+        "timestamp": datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "machine": platform.machine(),
+        "processor": platform.processor(),
+        "cpu_count": os.cpu_count(),
+        "packages": {name: package_version(name) for name in
+                     ("numpy", "torch", "openai-whisper", "faster-whisper", "PyQt6")},
+    }
+
+
+def synthetic_segment(duration_s: float, seed: int = 0) -> np.ndarray:
+    """Audio deterministico (rumore a basso livello): stesso input a ogni esecuzione."""
+    rng = np.random.default_rng(seed)
+    return (rng.standard_normal(int(duration_s * AUDIO_SAMPLE_RATE)) * 0.05).astype(np.float32)
+
+
+# --- Gruppi di misure ---
+
+def bench_models(results: SuiteResults, models: List[str], backend_name: str, repeat: int, with_inference: bool,
+                 with_load: bool):
+    # Import tardivi: torch e whisper servono solo a questo gruppo.
+    from src.core.inference_backends import create_inference_backend
+    from src.core.model_registry import model_registry
+
+    for model_name in models:
+        model_registry.clear()
+        backend = create_inference_backend(backend_name)
+        try:
+            started_at = time.perf_counter()
+            backend.load(model_name)
+            if with_load:
+                results.add(f"model_load_s[{backend_name}:{model_name}]", time.perf_counter() - started_at, "s")
+            if with_inference:
+                for duration_s in SEGMENT_DURATIONS_S:
+                    audio = synthetic_segment(duration_s)
+                    # "cold": prima trascrizione di questa durata dopo il caricamento, senza warm-up
+                    cold_s = median_time_s(lambda: backend.transcribe_segment(audio, DEFAULT_LANGUAGE), 1)
+                    warm_s = median_time_s(lambda: backend.transcribe_segment(audio, DEFAULT_LANGUAGE), repeat)
+                    results.add(f"inference_rtf_cold[{backend_name}:{model_name}:{duration_s}s]", cold_s / duration_s, "rtf")
+                    results.add(f"inference_rtf_warm[{backend_name}:{model_name}:{duration_s}s]", warm_s / duration_s, "rtf")
+        except Exception as e:
+            results.add_error(f"model[{backend_name}:{model_name}]", e)
+        finally:
+            backend.release()
+            model_registry.clear()
+
+
+def bench_text_processor(results: SuiteResults, repeat: int):
+    from src.core.profile_snapshot import ProfileSnapshot
+    from src.core.text_processor import TextProcessor
+
+    class SuiteProfileManager:
+        def __init__(self, rule_count: int):
+            rules = {f"termine parlato {i}": f"Termine{i}" for i in range(rule_count)}
+            macros = {f"macro numero {i}": f"Espansione {i}" for i in range(max(1, rule_count // 10))}
+            self.snapshot = ProfileSnapshot("suite", {"display_name": "Suite"}, macros, rules, 1)
+
+        def get_current_profile_display_name(self): return "Suite"
+
+    texts = [
+        "il paziente riferisce termine parlato 7 da circa due giorni a capo prossimo controllo",
+        "macro numero 3",
+        "pressione arteriosa nella norma, nessun termine da correggere in questa frase.",
+    ]
+    for rule_count in RULE_COUNTS:
+        processor = TextProcessor(SuiteProfileManager(rule_count))
+        processor.process_text(texts[0]) # Compilazione/cache fuori dalla misura
+        iterations = 1000
+
+        def run_batch():
+            for i in range(iterations):
+                processor.process_text(texts[i % len(texts)])
+        batch_s = median_time_s(run_batch, repeat)
+        results.add(f"text_process_throughput[{rule_count} regole]", iterations / batch_s, "testi/s", lower_is_better=False)
+
+
+def bench_profiles(results: SuiteResults, repeat: int):
+    from benchmarks.bench_profile_catalog import create_profiles
+    from src.core.profile_manager import ProfileManager
+
+    for profile_count in PROFILE_COUNTS:
+        base_path = Path(tempfile.mkdtemp(prefix="suite_profiles_"))
+        try:
+            profiles_dir = base_path / "profiles"
+            create_profiles(profiles_dir, profile_count)
+            started_at = time.perf_counter()
+            pm = ProfileManager(profiles_dir=profiles_dir, app_prefs_file=base_path / APP_PREFERENCES_FILENAME)
+            pm.get_available_profiles()
+            results.add(f"profile_catalog_cold_ms[{profile_count} profili]", (time.perf_counter() - started_at) * 1000, "ms")
+            target_name = f"Profilo {profile_count - 1:05d}"
+            results.add(f"profile_load_ms[{profile_count} profili]",
+                        median_time_s(lambda: pm.load_profile(target_name), repeat) * 1000, "ms")
+            pm.flush_pending_writes()
+        finally:
+            shutil.rmtree(base_path, ignore_errors=True)
+
+
+def bench_editor(results: SuiteResults):
+    from benchmarks.bench_editor_append import SAMPLE_SEGMENTS, percentile, run_single
+    from PyQt6.QtWidgets import QApplication
+
+    app = QApplication.instance() or QApplication(sys.argv)
+    for segment_count in EDITOR_SEGMENT_COUNTS:
+        segments = [SAMPLE_SEGMENTS[i % len(SAMPLE_SEGMENTS)] for i in range(segment_count)]
+        latencies_s = run_single(segments)
+        results.add(f"editor_append_p50_ms[{segment_count} segmenti]", percentile(latencies_s, 0.5) * 1000, "ms")
+        results.add(f"editor_append_p95_ms[{segment_count} segmenti]", percentile(latencies_s, 0.95) * 1000, "ms")
+        # Gli ultimi inserimenti devono costare quanto i primi (nessun degrado O(n) con il documento)
+        tail = latencies_s[-max(1, segment_count // 10):]
+        results.add(f"editor_append_last10pct_ms[{segment_count} segmenti]", statistics.mean(tail) * 1000, "ms")
+    app.processEvents()
+
+
+def bench_pipeline(results: SuiteResults):
+    # Motore finto "fake-whisper": misura solo cattura, segmentazione, elaborazione e consegna alla GUI
+    from benchmarks.bench_pipeline_overhead import run_pipeline
+
+    stats = run_pipeline(PIPELINE_UTTERANCES, speed=4.0, fixed_delay_s=0.05, rtf=0.1)
+    results.add("pipeline_overhead_mean_ms", stats["overhead_mean_s"] * 1000, "ms")
+    for name in ("audio.block_queue_wait_s", "output.queue_wait_s", "output.gui_dispatch_s"):
+        if stats[f"{name}:p95"] is not None:
+            results.add(f"pipeline_p95_ms[{name}]", stats[f"{name}:p95"] * 1000, "ms")
+
+
+def run_suite(args) -> int:
+    groups = [g.strip() for g in args.groups.split(",") if g.strip()]
+    unknown = set(groups) - set(ALL_GROUPS)
+    if unknown:
+        print(f"Gruppi sconosciuti: {', '.join(sorted(unknown))}. Disponibili: {', '.join(ALL_GROUPS)}")
+        return 2
+    models = [m.strip() for m in args.models.split(",") if m.strip()]
+
+    results = SuiteResults()
+    started_at = time.perf_counter()
+    if "model" in groups or "inference" in groups:
+        print(f"--- modelli ({args.backend}: {', '.join(models)}) ---")
+        try:
+            bench_models(results, models, args.backend, args.repeat,
+                         with_inference="inference" in groups, with_load="model" in groups)
+        except Exception as e: # Es. torch/whisper non installati
+            results.add_error("model", e)
+    for group, title, bench_fn in (("text", "TextProcessor", lambda: bench_text_processor(results, args.repeat)),
+                                   ("profiles", "ProfileManager", lambda: bench_profiles(results, args.repeat)),
+                                   ("editor", "editor interno", lambda: bench_editor(results)),
+                                   ("pipeline", "pipeline (motore finto)", lambda: bench_pipeline(results))):
+        if group not in groups: continue
+        print(f"--- {title} ---")
+        try:
+            bench_fn()
+        except Exception as e:
+            results.add_error(group, e)
+
+    report = {
+        "environment": collect_environment(),
+        "options": {"groups": groups, "models": models, "backend": args.backend, "repeat": args.repeat},
+        "duration_s": time.perf_counter() - started_at,
+        "results": results.results,
+        "errors": results.errors,
+    }
+    output_path = DEFAULT_BASELINE_FILE if args.save_baseline else Path(args.output)
+    output_path.parent.mkdir(parents=True, exist_ok=True)
+    with open(output_path, 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=2, ensure_ascii=False)
+    print(f"\n{len(results.results)} risultati ({len(results.errors)} errori) salvati in {output_path}")
+    return 0
+
+
+def compare_results(args) -> int:
+    with open(args.baseline, 'r', encoding='utf-8') as f:
+        baseline = json.load(f)
+    with open(args.current, 'r', encoding='utf-8') as f:
+        current = json.load(f)
+
+    for key in ("platform", "processor", "cpu_count", "python"):
+        if baseline["environment"].get(key) != current["environment"].get(key):
+            print(f"ATTENZIONE: ambiente diverso ({key}: {baseline['environment'].get(key)} -> {current['environment'].get(key)})")
+    baseline_by_name = {result["name"]: result for result in baseline["results"]}
+    regressions = 0
+    print(f"{'misura':45s} {'baseline':>12s} {'attuale':>12s} {'variazione':>11s}")
+    for result in current["results"]:
+        reference = baseline_by_name.pop(result["name"], None)
+        if reference is None:
+            print(f"{result['name']:45s} {'-':>12s} {result['value']:12.4f}   (nuova)")
+            continue
+        if reference["value"] == 0:
+            continue
+        change = (result["value"] - reference["value"]) / reference["value"]
+        worse_by = change if result.get("lower_is_better", True) else -change
+        flag = ""
+        if worse_by > args.threshold:
+            flag = "  REGRESSIONE"
+            regressions += 1
+        elif worse_by < -args.threshold:
+            flag = "  migliorata"
+        print(f"{result['name']:45s} {reference['value']:12.4f} {result['value']:12.4f} {change * 100:+10.1f}%{flag}")
+    # Una misura sparita o un gruppo andato in errore non devono far passare il gate
+    for name in baseline_by_name:
+        print(f"{name:45s} assente nei risultati attuali  MANCANTE")
+    errors = current.get("errors", [])
+    for error in errors:
+        print(f"ERRORE nei risultati attuali: {error['name']}: {error['error']}")
+
+    print(f"\n{regressions} regressioni oltre il {args.threshold * 100:.0f}%, "
+          f"{len(baseline_by_name)} misure mancanti, {len(errors)} errori.")
+    return 1 if regressions or baseline_by_name or errors else 0
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Suite di benchmark con baseline salvata e confronto delle regressioni.")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    run_parser = subparsers.add_parser("run", help="Esegue la suite e salva i risultati in JSON")
+    run_parser.add_argument("--output", default=str(DEFAULT_RESULTS_FILE), help="File JSON dei risultati")
+    run_parser.add_argument("--save-baseline", action="store_true", help=f"Salva i risultati come baseline ({DEFAULT_BASELINE_FILE})")
+    run_parser.add_argument("--groups", default=",".join(ALL_GROUPS), help=f"Gruppi da eseguire ({','.join(ALL_GROUPS)})")
+    run_parser.add_argument("--models", default=",".join(AVAILABLE_WHISPER_MODELS), help="Modelli per caricamento e RTF")
+    run_parser.add_argument("--backend", default=DEFAULT_INFERENCE_BACKEND, help="Motore di inferenza")
+    run_parser.add_argument("--repeat", type=int, default=5, help="Ripetizioni per misura (si usa la mediana)")
+
+    compare_parser = subparsers.add_parser("compare", help="Confronta i risultati con la baseline")
+    compare_parser.add_argument("current", nargs="?", default=str(DEFAULT_RESULTS_FILE), help="Risultati da controllare")
+    compare_parser.add_argument("--baseline", default=str(DEFAULT_BASELINE_FILE), help="Risultati di riferimento")
+    compare_parser.add_argument("--threshold", type=float, default=DEFAULT_REGRESSION_THRESHOLD,
+                                help="Peggioramento relativo oltre il quale una misura è una regressione (0.10 = 10%%)")
+    args = parser.parse_args()
+
+    import logging
+    from src.utils.logger import app_logger
+    app_logger.setLevel(logging.WARNING)
+
+    sys.exit(run_suite(args) if args.command == "run" else compare_results(args))
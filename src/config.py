@@ -37,9 +37,11 @@ else:  # Linux e altri (standard XDG)
 # Sottocartelle per profili e log
 PROFILES_DIR_NAME = "profiles"
 LOGS_DIR_NAME = "logs" # Usato anche per i debug audio
+MODEL_CACHE_DIR_NAME = "model_cache"
 
 PROFILES_DIR = APP_BASE_DATA_PATH / PROFILES_DIR_NAME
 LOGS_DIR = APP_BASE_DATA_PATH / LOGS_DIR_NAME # Directory per i log testuali e la sottocartella audio_debugs
+MODEL_CACHE_DIR = APP_BASE_DATA_PATH / MODEL_CACHE_DIR_NAME # Modelli convertiti (es. quantizzati), creata quando serve
 
 # Creazione delle directory necessarie all'avvio del modulo config
 try:
@@ -57,6 +59,10 @@ except OSError as e:
 # File per le preferenze globali dell'app
 APP_PREFERENCES_FILENAME = "preferences.json"
 APP_PREFERENCES_FILE = APP_BASE_DATA_PATH / APP_PREFERENCES_FILENAME
+# Scritture differite dei file JSON (preferenze e profili): un file modificato viene scritto
+# dopo PERSISTENCE_DEBOUNCE_S secondi senza altre modifiche, e comunque entro PERSISTENCE_MAX_DELAY_S.
+PERSISTENCE_DEBOUNCE_S = 0.5
+PERSISTENCE_MAX_DELAY_S = 5.0
 
 
 # --- Impostazioni Whisper ---
@@ -64,6 +70,44 @@ DEFAULT_WHISPER_MODEL = "base"  # Modello di default all'avvio o per nuovi profi
 DEFAULT_LANGUAGE = "italian"    # Lingua di default
 AVAILABLE_WHISPER_MODELS = ["tiny", "base", "small", "medium", "large"] # Modelli selezionabili
 
+# Budget di memoria (MB) per i modelli Whisper tenuti in cache dal registro dei modelli.
+# I modelli non più in uso restano caricati (pronti per il prossimo START) finché il totale
+# non supera il budget; allora vengono scaricati a partire dal meno recente.
+MODEL_REGISTRY_MEMORY_BUDGET_MB = 4096
+# Secondi di silenzio decodificati subito dopo il precaricamento del modello, per
+# inizializzare kernel e allocatori di PyTorch prima della prima dettatura reale.
+MODEL_WARMUP_AUDIO_S = 1.0
+
+# Motore di inferenza: "openai-whisper" (PyTorch, quello originale) oppure "faster-whisper"
+# (CTranslate2 con pesi quantizzati int8, molto più veloce su CPU; pacchetto opzionale 'faster-whisper').
+DEFAULT_INFERENCE_BACKEND = "openai-whisper"
+AVAILABLE_INFERENCE_BACKENDS = ["openai-whisper", "faster-whisper"]
+# Quantizzazione dei modelli openai-whisper su CPU: "none" (fp32) oppure "int8"
+# (torch.quantization.quantize_dynamic sui layer Linear; il modello convertito è salvato in MODEL_CACHE_DIR).
+DEFAULT_WHISPER_QUANTIZATION = "none"
+AVAILABLE_WHISPER_QUANTIZATIONS = ["none", "int8"]
+# Tipo di calcolo di CTranslate2 per faster-whisper ("int8", "int8_float32", "float32", ...).
+FASTER_WHISPER_COMPUTE_TYPE = "int8"
+# Ricerca greedy come model.transcribe() di openai-whisper con temperatura 0.
+FASTER_WHISPER_BEAM_SIZE = 1
+
+# Motore finto (src/core/fake_whisper.py) per misurare la pipeline senza l'inferenza: niente pesi né
+# download, ogni segmento restituisce la frase successiva di FAKE_WHISPER_SCRIPT dopo un ritardo di
+# FAKE_WHISPER_FIXED_DELAY_S + FAKE_WHISPER_RTF * durata dell'audio. Si sceglie come gli altri motori
+# (impostazione "inference_backend" del profilo, --backend dei benchmark); con FAKE_WHISPER_ENABLED
+# compare anche nella finestra dei profili.
+FAKE_WHISPER_BACKEND = "fake-whisper"
+FAKE_WHISPER_ENABLED = False
+FAKE_WHISPER_SCRIPT = [
+    "Buongiorno, oggi visita di controllo per il paziente.",
+    "Pressione arteriosa nella norma.",
+    "Prossimo controllo tra tre mesi.",
+]
+FAKE_WHISPER_FIXED_DELAY_S = 0.05
+FAKE_WHISPER_RTF = 0.1
+if FAKE_WHISPER_ENABLED:
+    AVAILABLE_INFERENCE_BACKENDS.append(FAKE_WHISPER_BACKEND)
+
 # Parametri di trascrizione di default per Whisper
 # Questi possono essere sovrascritti o estesi nel Transcriber
 DEFAULT_WHISPER_TEMPERATURE = 0.0 # Per un output più deterministico
@@ -88,7 +132,16 @@ SPECIAL_COMMANDS = COMMAND_START_RECORDING + COMMAND_STOP_RECORDING # Verrà usa
 # --- Impostazioni di Logging ---
 LOG_FILENAME = "app.log" # Nome del file di log principale
 LOG_FILE = LOGS_DIR / LOG_FILENAME
-LOG_LEVEL = "DEBUG"  # Livelli: DEBUG, INFO, WARNING, ERROR, CRITICAL (per sviluppo, DEBUG è utile)
+LOG_LEVEL = "INFO"  # Livelli: DEBUG, INFO, WARNING, ERROR, CRITICAL (DEBUG solo per sviluppo: i percorsi caldi loggano a DEBUG)
+# Il file di log ruota quando supera LOG_MAX_BYTES e al cambio di giorno (se LOG_ROTATE_DAILY);
+# i file ruotati vengono compressi (app.log.1.gz, ...) e ne restano al massimo LOG_BACKUP_COUNT.
+LOG_MAX_BYTES = 5 * 1024 * 1024
+LOG_BACKUP_COUNT = 5
+LOG_ROTATE_DAILY = True
+# Limite per punto di chiamata agli avvisi ripetuti (WARNING e oltre): al massimo LOG_RATE_LIMIT_BURST
+# messaggi ogni LOG_RATE_LIMIT_INTERVAL_S secondi; i soppressi vengono contati nel messaggio successivo.
+LOG_RATE_LIMIT_INTERVAL_S = 10.0
+LOG_RATE_LIMIT_BURST = 5
 # LOG_FORMAT = '%(asctime)s - %(name)s - %(levelname)s - [%(module)s.%(funcName)s:%(lineno)d] - %(message)s' # Definito nel logger
 
 
@@ -129,6 +182,23 @@ SORTED_PUNCTUATION_KEYS = sorted(PUNCTUATION_MAP.keys(), key=len, reverse=True)
 
 # --- Impostazioni Editor Interno ---
 INTERNAL_EDITOR_ENABLED_DEFAULT = False  # Default per nuovi profili
+# Oltre questa dimensione (caratteri) l'editor passa alla modalità "documento grande":
+# i blocchi di testo vengono inseriti con un solo aggiornamento del layout e del ridisegno.
+INTERNAL_EDITOR_LARGE_DOCUMENT_CHARS = 100_000
+
+# --- Output verso Applicazioni Esterne ---
+# "paste" copia il testo negli appunti, invia un solo tasto Incolla e poi ripristina gli appunti precedenti;
+# "type" digita carattere per carattere con pyautogui (più lento, per le applicazioni che rifiutano l'incolla).
+# Default "type": il ripristino degli appunti dopo EXTERNAL_PASTE_RESTORE_DELAY_S è euristico,
+# quindi "paste" va scelto esplicitamente nel profilo.
+DEFAULT_EXTERNAL_OUTPUT_MODE = "type"
+AVAILABLE_EXTERNAL_OUTPUT_MODES = ["paste", "type"]
+# Pausa tra un carattere e l'altro in modalità "type".
+EXTERNAL_TYPE_INTERVAL_S = 0.01
+# Attesa prima di ripristinare gli appunti: l'applicazione di destinazione legge gli appunti
+# in modo asincrono dopo aver ricevuto la scorciatoia Incolla.
+EXTERNAL_PASTE_RESTORE_DELAY_S = 0.15
+EXTERNAL_PASTE_HOTKEY = ("command", "v") if sys.platform == "darwin" else ("ctrl", "v")
 
 # --- Nomi File di Configurazione del Profilo ---
 # Questi nomi verranno usati per i file JSON all'interno di ogni cartella di profilo.
@@ -136,6 +206,22 @@ PROFILE_SETTINGS_FILENAME = "settings.json"          # Impostazioni generali del
 MACROS_FILENAME = "macros.json"                      # Macro definite dall'utente
 VOCABULARY_FILENAME = "vocabulary.json"              # Vocabolario personalizzato (lista di parole/frasi)
 PRONUNCIATION_RULES_FILENAME = "pronunciation.json"  # Regole di correzione della pronuncia
+# Catalogo dei profili (indice in memoria dei nomi visualizzati):
+# ogni quanti secondi, al massimo, ricontrollare le date di modifica dei settings.json
+# per accorgersi delle modifiche fatte da altri processi.
+PROFILE_CATALOG_STAT_INTERVAL_S = 2.0
+# Usa il pacchetto opzionale 'watchdog', se installato, per invalidare subito il catalogo.
+PROFILE_CATALOG_WATCHER_ENABLED = True
+# Archiviazione di macro, vocabolario e regole di pronuncia:
+# - "json": un file JSON per sezione, riscritto per intero a ogni salvataggio (layout classico);
+# - "sqlite": database SQLite con modifiche incrementali, adatto a vocabolari molto grandi.
+#   I profili JSON esistenti vengono migrati al primo caricamento; settings.json resta in JSON.
+PROFILE_STORAGE_ENGINE = "json"
+AVAILABLE_PROFILE_STORAGE_ENGINES = ["json", "sqlite"]
+# Con "sqlite": un database nella cartella di ogni profilo, oppure uno condiviso per tutti i profili.
+PROFILE_SQLITE_SHARED = False
+PROFILE_DB_FILENAME = "profile.sqlite3"             # Nella cartella del profilo
+PROFILES_SHARED_DB_FILENAME = "profiles.sqlite3"    # Accanto alla cartella dei profili
 
 
 # --- Costanti per l'Interfaccia Utente (se necessarie globalmente) ---
@@ -157,4 +243,91 @@ AUDIO_MAX_BUFFER_S_INTERIM = 6.0 # AUMENTATO COME DA TUA RICHIESTA (era 4.0)
 # Minimi secondi di audio registrato per considerare il silenzio come una pausa valida.
 AUDIO_MIN_SPEECH_FOR_SILENCE_S = 0.5
 # Minimi secondi di audio necessari nel buffer finale (quando si stoppa) per processarlo.
-AUDIO_MIN_CHUNK_FOR_FINAL_S = 0.2
\ No newline at end of file
+AUDIO_MIN_CHUNK_FOR_FINAL_S = 0.2
+# --- Rilevamento Attività Vocale (VAD) ---
+# Solo i blocchi classificati come parlato azzerano il timer di silenzio.
+# Motore di rilevamento di default: "energy" (RMS adattivo, nessuna dipendenza) o
+# "webrtc" (modello GMM di WebRTC, richiede il pacchetto opzionale 'webrtcvad').
+DEFAULT_VAD_ENGINE = "energy"
+AVAILABLE_VAD_ENGINES = ["energy", "webrtc"]
+# Durata dei frame di analisi all'interno di un blocco (10/20/30 ms sono validi anche per WebRTC).
+AUDIO_VAD_FRAME_S = 0.02
+# Un frame è vocale se la sua energia RMS supera il rumore di fondo di questo fattore...
+AUDIO_VAD_ENERGY_RATIO = 3.0
+# ...e comunque questa soglia assoluta (RMS su campioni float in [-1, 1]).
+AUDIO_VAD_MIN_ENERGY = 0.004
+# Stima iniziale del rumore di fondo e sue velocità di adattamento per blocco
+# (sale lentamente per non "inseguire" la voce, scende rapidamente quando torna il silenzio).
+AUDIO_VAD_NOISE_FLOOR_INIT = 0.001
+AUDIO_VAD_NOISE_RISE_RATE = 0.02
+AUDIO_VAD_NOISE_FALL_RATE = 0.5
+# Frazione minima di frame vocali perché un blocco sia considerato parlato.
+AUDIO_VAD_MIN_VOICED_RATIO = 0.2
+# Dopo l'ultimo blocco vocale, i blocchi successivi restano "vocali" per questa durata
+# (evita di spezzare le parole sulle consonanti finali deboli).
+AUDIO_VAD_HANGOVER_S = 0.2
+# Silenzio iniziale mantenuto prima dell'inizio del parlato (il resto viene scartato).
+AUDIO_VAD_PREROLL_S = 0.4
+# Aggressività del rilevatore WebRTC (0 = permissivo, 3 = aggressivo).
+AUDIO_VAD_WEBRTC_AGGRESSIVENESS = 2
+
+# --- Pipeline di Inferenza ---
+# Il thread di segmentazione accoda i segmenti; i worker di inferenza li trascrivono in parallelo
+# alla cattura e i testi vengono consegnati nell'ordine in cui l'audio è stato registrato.
+# Massimo numero di segmenti in attesa di trascrizione.
+INFERENCE_QUEUE_MAX_SEGMENTS = 3
+# Numero di worker di inferenza. Lo stesso modello trascrive un segmento alla volta:
+# più worker servono solo a sovrapporre il modello ridotto della politica "degrade".
+INFERENCE_WORKERS = 1
+# Cosa fare quando la coda è piena:
+# "drop" scarta il segmento più vecchio, "merge" unisce il nuovo all'ultimo in attesa,
+# "degrade" lo accoda comunque e lo trascrive con il modello ridotto BACKPRESSURE_DEGRADED_MODEL.
+DEFAULT_BACKPRESSURE_POLICY = "merge"
+AVAILABLE_BACKPRESSURE_POLICIES = ["drop", "merge", "degrade"]
+BACKPRESSURE_DEGRADED_MODEL = "tiny"
+# Con "degrade", segmenti accettati oltre INFERENCE_QUEUE_MAX_SEGMENTS (trascritti con il modello ridotto).
+# Oltre questo limite la coda non cresce più: i nuovi segmenti vengono uniti all'ultimo in attesa.
+BACKPRESSURE_DEGRADED_MAX_EXTRA_SEGMENTS = 3
+# Capacità del ring buffer audio, in multipli di AUDIO_MAX_BUFFER_S_INTERIM:
+# copre i segmenti in coda di inferenza (anche quelli oltre il limite con "degrade"),
+# quello in trascrizione e quello in registrazione.
+AUDIO_RING_BUFFER_HEADROOM = INFERENCE_QUEUE_MAX_SEGMENTS + BACKPRESSURE_DEGRADED_MAX_EXTRA_SEGMENTS + 2
+
+# --- Registrazione Audio di Debug ---
+# Il callback audio copia solo i campioni in un buffer circolare dedicato; un thread li converte
+# e li scrive nel WAV a intervalli, con scritture grandi. Il buffer copre i ritardi del disco:
+# se si riempie, i blocchi successivi mancano nel WAV (la trascrizione non ne risente).
+DEBUG_RECORDING_BUFFER_S = 30.0
+DEBUG_RECORDING_FLUSH_INTERVAL_S = 0.5
+
+# --- Metriche della Pipeline ---
+# Registro in-process di contatori, gauge e istogrammi (latenze per fase, RTF, segmenti persi...).
+# Con METRICS_ENABLED = False ogni metrica è un oggetto vuoto: nessun lock né calcolo nei percorsi caldi.
+METRICS_ENABLED = True
+# Istantanea periodica del registro, una riga JSON per dump, in LOGS_DIR / METRICS_DUMP_FILENAME
+# (scritta solo se qualcosa è cambiato dall'ultimo dump, più un'ultima all'uscita).
+METRICS_DUMP_FILENAME = "metrics.jsonl"
+METRICS_DUMP_INTERVAL_S = 60.0
+# Aggiornamento del riepilogo compatto nella barra di stato
+METRICS_STATUS_REFRESH_MS = 1000
+
+# --- Percorso Rapido per Espressioni Brevi ---
+# model.transcribe() porta sempre l'audio alla finestra di 30 s dell'encoder: un "a capo" di 1,5 s
+# costa quanto 30 s di parlato. Per i segmenti brevi l'encoder può elaborare solo i frame necessari.
+# "off" = sempre finestra piena, "trimmed" = finestra tagliata sulla durata del segmento,
+# "bucketed" = finestra scelta tra poche lunghezze fisse (SHORT_UTTERANCE_BUCKETS_S).
+# Whisper è addestrato su finestre di 30 s: la finestra ridotta può peggiorare l'accuratezza.
+# Resta quindi disattivata finché "python -m src.core.short_utterance" non è stato verificato su
+# un corpus reale; ogni profilo può attivarla dalla finestra dei profili.
+DEFAULT_SHORT_UTTERANCE_MODE = "off"
+AVAILABLE_SHORT_UTTERANCE_MODES = ["off", "trimmed", "bucketed"]
+# Segmenti più lunghi di così usano sempre la finestra piena
+# (con il silenzio di coda devono rientrare nel bucket più grande).
+SHORT_UTTERANCE_MAX_S = 9.5
+SHORT_UTTERANCE_BUCKETS_S = [2.0, 4.0, 6.0, 10.0]
+# Silenzio aggiunto in coda al segmento prima di tagliare la finestra (evita parole finali troncate).
+SHORT_UTTERANCE_TAIL_PAD_S = 0.5
+# Se il risultato rapido è poco affidabile si ripete la trascrizione con la finestra piena
+# (stesse soglie che model.transcribe() usa per il fallback di temperatura).
+SHORT_UTTERANCE_LOGPROB_THRESHOLD = -1.0
+SHORT_UTTERANCE_COMPRESSION_RATIO_THRESHOLD = 2.4
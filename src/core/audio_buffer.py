@@ -0,0 +1,123 @@
+# src/core/audio_buffer.py
+from collections import deque
+from threading import Lock
+from typing import Deque, List, Optional, Tuple
+
+import numpy as np
+
+from src.config import AUDIO_SAMPLE_RATE
+from src.utils.metrics import metrics
+
+
+class AudioRingBuffer:
+    """
+    Buffer circolare preallocato per l'audio catturato (mono, float32).
+
+    - write() è chiamato dal callback di sounddevice: una sola copia dei campioni, nessuna allocazione.
+    - La lunghezza è tenuta con contatori assoluti (O(1)), niente somme sulle liste di blocchi.
+    - take() restituisce una vista contigua senza copie; solo se la regione attraversa la fine
+      del buffer viene fatta un'unica copia. La regione resta riservata (non sovrascrivibile)
+      finché chi l'ha presa non chiama release() con il token ricevuto.
+
+    Presuppone un solo scrittore (il callback audio); letture e rilasci possono avvenire da altri thread.
+    """
+
+    def __init__(self, capacity_samples: int, dtype=np.float32):
+        if capacity_samples <= 0:
+            raise ValueError("La capacità del buffer audio deve essere positiva.")
+        self.capacity = int(capacity_samples)
+        self._buffer = np.zeros(self.capacity, dtype=dtype)
+        # Posizioni assolute (crescono sempre): scritto >= letto >= rilasciato
+        self._write_pos = 0
+        self._read_pos = 0
+        self._release_pos = 0
+        # Regioni prese e non ancora rilasciate, in ordine: [fine_assoluta, rilasciata]
+        self._reservations: Deque[List] = deque()
+        self._lock = Lock()
+        self.overflow_count = 0
+
+    @classmethod
+    def for_duration(cls, seconds: float, sample_rate: int = AUDIO_SAMPLE_RATE) -> "AudioRingBuffer":
+        return cls(int(round(seconds * sample_rate)))
+
+    def __len__(self) -> int:
+        """Campioni scritti e non ancora presi/scartati."""
+        return self._write_pos - self._read_pos
+
+    @property
+    def free_samples(self) -> int:
+        return self.capacity - (self._write_pos - self._release_pos)
+
+    def duration_s(self, sample_rate: int = AUDIO_SAMPLE_RATE) -> float:
+        return len(self) / sample_rate
+
+    def write(self, samples: np.ndarray) -> Optional[int]:
+        """
+        Copia i campioni in coda. Restituisce la posizione assoluta del primo campione,
+        oppure None se non c'è spazio (il blocco viene perso e conteggiato in overflow_count).
+        """
+        n = samples.shape[0]
+        with self._lock:
+            if n > self.capacity - (self._write_pos - self._release_pos):
+                self.overflow_count += 1
+                return None
+            start = self._write_pos
+        # La regione [start, start+n) è libera: solo questo thread può scriverci.
+        idx = start % self.capacity
+        first = min(n, self.capacity - idx)
+        self._buffer[idx:idx + first] = samples[:first]
+        if first < n:
+            self._buffer[:n - first] = samples[first:]
+        with self._lock:
+            self._write_pos = start + n
+        return start
+
+    def _region(self, start: int, n: int) -> np.ndarray:
+        idx = start % self.capacity
+        if idx + n <= self.capacity:
+            return self._buffer[idx:idx + n]
+        with metrics.timer("audio.concatenate_s"):
+            return np.concatenate((self._buffer[idx:], self._buffer[:n - (self.capacity - idx)]))
+
+    def peek(self, start: int, n: int) -> np.ndarray:
+        """Vista su una regione già scritta e non rilasciata (es. l'ultimo blocco, per il VAD)."""
+        return self._region(start, n)
+
+    def take(self, n: Optional[int] = None) -> Tuple[np.ndarray, int]:
+        """
+        Preleva i primi n campioni in attesa (tutti se n è None).
+        Restituisce (audio, token); l'audio resta valido fino a release(token).
+        """
+        with self._lock:
+            available = self._write_pos - self._read_pos
+            n = available if n is None else max(0, min(n, available))
+            start = self._read_pos
+            self._read_pos += n
+            self._reservations.append([self._read_pos, False])
+            token = self._read_pos
+        return self._region(start, n), token
+
+    def release(self, token: int):
+        with self._lock:
+            for reservation in self._reservations:
+                if reservation[0] == token and not reservation[1]:
+                    reservation[1] = True
+                    break
+            self._compact_locked()
+
+    def discard(self, n: int) -> int:
+        """Scarta i primi n campioni in attesa senza restituirli. Restituisce quanti ne ha scartati."""
+        with self._lock:
+            n = max(0, min(n, self._write_pos - self._read_pos))
+            self._read_pos += n
+            self._reservations.append([self._read_pos, True])
+            self._compact_locked()
+        return n
+
+    def clear(self):
+        """Scarta tutto l'audio in attesa (le regioni prese restano valide fino al loro rilascio)."""
+        self.discard(len(self))
+
+    def _compact_locked(self):
+        while self._reservations and self._reservations[0][1]:
+            self._release_pos = self._reservations.popleft()[0]
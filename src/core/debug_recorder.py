@@ -0,0 +1,133 @@
+# src/core/debug_recorder.py
+import time
+import wave
+from datetime import datetime
+from pathlib import Path
+from threading import Thread, Event
+from typing import Optional
+
+import numpy as np
+
+from src.config import (
+    AUDIO_SAMPLE_RATE, AUDIO_CHANNELS, DEBUG_RECORDING_BUFFER_S, DEBUG_RECORDING_FLUSH_INTERVAL_S
+)
+from src.utils.logger import app_logger
+from src.utils.metrics import metrics
+
+
+class DebugAudioRecorder:
+    """
+    Registrazione WAV di debug fuori dal thread real-time di PortAudio.
+
+    push() è chiamato dal callback audio: copia i campioni in un buffer circolare preallocato,
+    senza lock, allocazioni né I/O (un solo scrittore, il callback, e un solo lettore, il thread
+    del recorder: ciascuno aggiorna solo la propria posizione). Il thread si sveglia ogni
+    flush_interval_s, converte in int16 tutto l'audio accumulato e lo scrive con una sola writeframes().
+    Se il disco rallenta abbastanza da riempire il buffer, i blocchi in eccesso vengono scartati
+    e conteggiati in dropped_blocks.
+    """
+
+    def __init__(self, directory: Path, sample_rate: int = AUDIO_SAMPLE_RATE, channels: int = AUDIO_CHANNELS,
+                 buffer_s: float = DEBUG_RECORDING_BUFFER_S,
+                 flush_interval_s: float = DEBUG_RECORDING_FLUSH_INTERVAL_S):
+        self.directory = Path(directory)
+        self.sample_rate = sample_rate
+        self.channels = channels
+        self.flush_interval_s = flush_interval_s
+        self.capacity = max(1, int(round(buffer_s * sample_rate)))
+        self._buffer = np.zeros(self.capacity, dtype=np.float32)
+        self._write_pos = 0 # Scritta solo dal callback audio
+        self._read_pos = 0  # Scritta solo dal thread del recorder
+        self.dropped_blocks = 0 # Scritta solo dal callback audio
+        self._reported_dropped_blocks = 0
+        self.path: Optional[Path] = None
+        self._writer: Optional[wave.Wave_write] = None
+        self._stop_event = Event()
+        self._thread: Optional[Thread] = None
+
+        self._dropped_counter = metrics.counter("audio.debug_recording_dropped_blocks")
+        self._write_hist = metrics.histogram("audio.debug_recording_write_s")
+
+    @property
+    def is_recording(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self) -> bool:
+        try:
+            self.directory.mkdir(parents=True, exist_ok=True)
+            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S_%f")
+            self.path = self.directory / f"debug_audio_{timestamp}.wav"
+            self._writer = wave.open(str(self.path), 'wb')
+            self._writer.setnchannels(self.channels)
+            self._writer.setsampwidth(2)
+            self._writer.setframerate(self.sample_rate)
+        except Exception as e:
+            app_logger.error(f"Impossibile avviare registrazione audio di debug: {e}", exc_info=True)
+            self._writer = None
+            return False
+        self._stop_event.clear()
+        self._thread = Thread(target=self._run, name="DebugAudioRecorder", daemon=True)
+        self._thread.start()
+        app_logger.info(f"Avviata registrazione audio di debug su: {self.path}")
+        return True
+
+    def push(self, samples: np.ndarray):
+        """Chiamato dal callback audio: solo una copia nel buffer preallocato."""
+        n = samples.shape[0]
+        write_pos = self._write_pos
+        if n > self.capacity - (write_pos - self._read_pos):
+            self.dropped_blocks += 1
+            return
+        idx = write_pos % self.capacity
+        first = min(n, self.capacity - idx)
+        self._buffer[idx:idx + first] = samples[:first]
+        if first < n:
+            self._buffer[:n - first] = samples[first:]
+        # Pubblicata dopo la copia: il lettore non vede mai campioni a metà
+        self._write_pos = write_pos + n
+
+    def _run(self):
+        while not self._stop_event.wait(self.flush_interval_s):
+            self._flush()
+        self._flush()
+
+    def _flush(self):
+        write_pos = self._write_pos
+        n = write_pos - self._read_pos
+        if self.dropped_blocks != self._reported_dropped_blocks:
+            dropped = self.dropped_blocks - self._reported_dropped_blocks
+            self._reported_dropped_blocks = self.dropped_blocks
+            self._dropped_counter.inc(dropped)
+            app_logger.warning(f"Registrazione audio di debug: {dropped} blocchi persi (disco lento).")
+        if n <= 0 or self._writer is None:
+            return
+        idx = self._read_pos % self.capacity
+        first = min(n, self.capacity - idx)
+        if first < n:
+            samples = np.concatenate((self._buffer[idx:], self._buffer[:n - first]))
+        else:
+            samples = self._buffer[idx:idx + n]
+        audio_int16 = (np.clip(samples, -1.0, 1.0) * 32767).astype(np.int16)
+        # Campioni convertiti: la regione può essere riscritta dal callback
+        self._read_pos = write_pos
+        started_at = time.monotonic()
+        try:
+            self._writer.writeframes(audio_int16.tobytes())
+        except Exception as e:
+            app_logger.error(f"Errore scrittura WAV di debug: {e}")
+        self._write_hist.observe(time.monotonic() - started_at)
+
+    def stop(self):
+        """Scrive l'audio ancora nel buffer e chiude il file."""
+        if self._thread is not None:
+            self._stop_event.set()
+            self._thread.join()
+            self._thread = None
+        if self._writer is not None:
+            writer_to_close = self._writer
+            self._writer = None
+            try:
+                writer_to_close.close()
+                app_logger.info(f"Registrazione audio di debug fermata e file salvato ({self.dropped_blocks} blocchi persi).")
+            except Exception as e:
+                app_logger.error(f"Errore chiusura file WAV di debug: {e}", exc_info=True)
@@ -0,0 +1,75 @@
+# src/core/fake_whisper.py
+import time
+from threading import Lock
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+from src.config import (
+    AUDIO_SAMPLE_RATE, FAKE_WHISPER_BACKEND, FAKE_WHISPER_SCRIPT, FAKE_WHISPER_FIXED_DELAY_S, FAKE_WHISPER_RTF
+)
+from src.core.inference_backends import InferenceBackend, register_inference_backend
+from src.core.model_registry import register_model_loader, ModelLoader
+
+
+class FakeWhisperModel:
+    """
+    Sostituto deterministico di whisper.Whisper per misurare la pipeline senza l'inferenza.
+    transcribe() ha la stessa forma di quello di openai-whisper: attende un ritardo sintetico
+    (fixed_delay_s + rtf * durata dell'audio) e restituisce la frase successiva del copione, in ciclo.
+    Con un copione vuoto restituisce sempre testo vuoto (utile per provare le trascrizioni scartate).
+    """
+
+    def __init__(self, model_name: str = "fake", script: Optional[List[str]] = None,
+                 fixed_delay_s: float = FAKE_WHISPER_FIXED_DELAY_S, rtf: float = FAKE_WHISPER_RTF):
+        self.model_name = model_name
+        self.script = list(FAKE_WHISPER_SCRIPT if script is None else script)
+        self.fixed_delay_s = fixed_delay_s
+        self.rtf = rtf
+        self.calls = 0
+        self._lock = Lock()
+
+    def synthetic_delay_s(self, audio_s: float) -> float:
+        return max(0.0, self.fixed_delay_s + self.rtf * audio_s)
+
+    def reset(self):
+        """Riparte dalla prima frase del copione."""
+        with self._lock:
+            self.calls = 0
+
+    def transcribe(self, audio: np.ndarray, language: Optional[str] = None, **_options) -> Dict[str, Any]:
+        audio_s = len(audio) / AUDIO_SAMPLE_RATE
+        delay_s = self.synthetic_delay_s(audio_s)
+        if delay_s > 0:
+            time.sleep(delay_s)
+        with self._lock:
+            text = self.script[self.calls % len(self.script)] if self.script else ""
+            self.calls += 1
+        segments = [{"id": 0, "start": 0.0, "end": audio_s, "text": text}] if text else []
+        return {"text": text, "segments": segments, "language": language}
+
+
+register_model_loader(FAKE_WHISPER_BACKEND, ModelLoader(
+    load_fn=lambda model_name, device: FakeWhisperModel(model_name),
+    size_fn=lambda model, model_name: 0.0 # Nessun peso in memoria: non conta nel budget del registro
+))
+
+
+class FakeWhisperBackend(InferenceBackend):
+    """Motore finto basato su FakeWhisperModel: stesso percorso del Transcriber, latenza dell'inferenza nota."""
+    name = FAKE_WHISPER_BACKEND
+
+    def capabilities(self) -> Dict[str, Any]:
+        caps = super().capabilities()
+        caps.update({"initial_prompt": True})
+        return caps
+
+    def transcribe_segment(self, audio: np.ndarray, language: Optional[str],
+                           initial_prompt: Optional[str] = None) -> str:
+        with self.lock:
+            if self.model is None:
+                raise RuntimeError("Modello finto non caricato.")
+            return self.model.transcribe(audio, language=language, initial_prompt=initial_prompt)["text"].strip()
+
+
+register_inference_backend(FAKE_WHISPER_BACKEND, FakeWhisperBackend)
@@ -0,0 +1,213 @@
+# src/core/inference_backends.py
+from abc import ABC, abstractmethod
+from threading import RLock
+from typing import Any, Callable, Dict, Optional
+
+import numpy as np
+from whisper.tokenizer import LANGUAGES, TO_LANGUAGE_CODE
+
+from src.config import (
+    DEFAULT_INFERENCE_BACKEND, DEFAULT_WHISPER_TEMPERATURE, DEFAULT_SHORT_UTTERANCE_MODE,
+    AVAILABLE_SHORT_UTTERANCE_MODES, DEFAULT_WHISPER_QUANTIZATION, AVAILABLE_WHISPER_QUANTIZATIONS,
+    FASTER_WHISPER_COMPUTE_TYPE, FASTER_WHISPER_BEAM_SIZE, MODEL_WARMUP_AUDIO_S, AUDIO_SAMPLE_RATE,
+    FAKE_WHISPER_BACKEND
+)
+from src.utils.logger import app_logger
+from src.core.model_registry import model_registry, register_model_loader, ModelLoader
+from src.core.short_utterance import decode_short
+from src.core.quantization import QUANTIZED_BACKEND_KEY
+
+
+def language_code(language: Optional[str]) -> Optional[str]:
+    """'italian' -> 'it' (i nomi completi sono accettati da openai-whisper, non da faster-whisper)."""
+    if not language:
+        return None
+    language = language.lower()
+    return language if language in LANGUAGES else TO_LANGUAGE_CODE.get(language, language)
+
+
+class InferenceBackend(ABC):
+    """
+    Interfaccia tra il Transcriber e il motore di inferenza (le sottoclassi devono implementare transcribe_segment).
+    I modelli sono ottenuti dal registro condiviso, quindi due backend uguali condividono lo stesso modello.
+    """
+    name = "base"
+
+    def __init__(self):
+        self.model: Any = None
+        self.model_name: Optional[str] = None
+        self._loaded_registry_key: Optional[str] = None
+        # Ignorata dai motori senza la capacità "short_utterance"
+        self.short_utterance_mode = DEFAULT_SHORT_UTTERANCE_MODE
+        # Lo stesso modello decodifica un segmento alla volta; load/release attendono la decodifica in corso.
+        self.lock = RLock()
+
+    @property
+    def is_loaded(self) -> bool:
+        return self.model is not None
+
+    @property
+    def registry_key(self) -> str:
+        """Chiave del motore nel registro dei modelli (varianti dello stesso motore hanno chiavi diverse)."""
+        return self.name
+
+    @property
+    def needs_reload(self) -> bool:
+        """True se le impostazioni sono cambiate in modo da richiedere un modello diverso."""
+        return self.is_loaded and self._loaded_registry_key != self.registry_key
+
+    def apply_profile_settings(self, profile_manager: Any):
+        """Legge dal profilo le opzioni del motore. Le opzioni non supportate vengono ignorate."""
+        mode = profile_manager.get_profile_setting("short_utterance_mode", DEFAULT_SHORT_UTTERANCE_MODE)
+        if mode not in AVAILABLE_SHORT_UTTERANCE_MODES:
+            app_logger.warning(f"Modalità espressioni brevi '{mode}' non valida. Uso '{DEFAULT_SHORT_UTTERANCE_MODE}'.")
+            mode = DEFAULT_SHORT_UTTERANCE_MODE
+        self.short_utterance_mode = mode
+
+    def capabilities(self) -> Dict[str, Any]:
+        return {"name": self.name, "int8": False, "short_utterance": False, "initial_prompt": False}
+
+    def load(self, model_name: str):
+        """Carica (o riusa dal registro) il modello. Solleva eccezione se il caricamento fallisce."""
+        with self.lock:
+            self.release()
+            self.model = model_registry.acquire(model_name, backend=self.registry_key)
+            self.model_name = model_name
+            self._loaded_registry_key = self.registry_key
+
+    def preload(self, model_name: str, language: str):
+        """Carica e riscalda il modello nel registro senza trattenerlo (vedi ModelRegistry.preload)."""
+        model_registry.preload(model_name, language, backend=self.registry_key)
+
+    def release(self):
+        """Restituisce il modello al registro (resta in cache finché rientra nel budget di memoria)."""
+        with self.lock:
+            if self.model is not None:
+                model_registry.release(self.model)
+            self.model = None
+            self.model_name = None
+            self._loaded_registry_key = None
+
+    @abstractmethod
+    def transcribe_segment(self, audio: np.ndarray, language: Optional[str],
+                           initial_prompt: Optional[str] = None) -> str:
+        """Trascrive un segmento (float32 mono a 16 kHz) e restituisce il testo senza spazi esterni."""
+
+
+class OpenAIWhisperBackend(InferenceBackend):
+    """openai-whisper su PyTorch: fp32, oppure int8 con quantizzazione dinamica su CPU."""
+    name = "openai-whisper"
+
+    def __init__(self):
+        super().__init__()
+        self.quantization = DEFAULT_WHISPER_QUANTIZATION
+
+    @property
+    def registry_key(self) -> str:
+        return QUANTIZED_BACKEND_KEY if self.quantization == "int8" else self.name
+
+    def apply_profile_settings(self, profile_manager: Any):
+        super().apply_profile_settings(profile_manager)
+        quantization = profile_manager.get_profile_setting("whisper_quantization", DEFAULT_WHISPER_QUANTIZATION)
+        if quantization not in AVAILABLE_WHISPER_QUANTIZATIONS:
+            app_logger.warning(f"Quantizzazione '{quantization}' non valida. Uso '{DEFAULT_WHISPER_QUANTIZATION}'.")
+            quantization = DEFAULT_WHISPER_QUANTIZATION
+        self.quantization = quantization
+
+    def capabilities(self) -> Dict[str, Any]:
+        caps = super().capabilities()
+        caps.update({"short_utterance": True, "initial_prompt": True, "int8": self.quantization == "int8"})
+        return caps
+
+    def transcribe_segment(self, audio: np.ndarray, language: Optional[str],
+                           initial_prompt: Optional[str] = None) -> str:
+        with self.lock:
+            if self.model is None:
+                raise RuntimeError("Modello Whisper non caricato.")
+            # I segmenti brevi senza prompt passano dall'encoder a finestra ridotta; se non è applicabile
+            # o il risultato è poco affidabile si usa la finestra piena di model.transcribe().
+            if not initial_prompt:
+                text = decode_short(self.model, audio, language, self.short_utterance_mode)
+                if text is not None:
+                    return text
+            transcribe_options = {"language": language, "fp16": False, "temperature": DEFAULT_WHISPER_TEMPERATURE}
+            if initial_prompt: transcribe_options["initial_prompt"] = initial_prompt
+            return self.model.transcribe(audio, **transcribe_options)["text"].strip()
+
+
+# Dimensioni indicative (MB) dei modelli CTranslate2 quantizzati int8, per il budget del registro.
+_FASTER_WHISPER_INT8_SIZE_MB = {"tiny": 45, "base": 80, "small": 250, "medium": 780, "large": 1600}
+
+
+def _load_faster_whisper(model_name: str, device: str) -> Any:
+    from faster_whisper import WhisperModel  # Dipendenza opzionale: ImportError gestito da create_inference_backend
+    return WhisperModel(model_name, device=device, compute_type=FASTER_WHISPER_COMPUTE_TYPE)
+
+
+def _warm_up_faster_whisper(model: Any, language: str):
+    silence = np.zeros(int(MODEL_WARMUP_AUDIO_S * AUDIO_SAMPLE_RATE), dtype=np.float32)
+    segments, _ = model.transcribe(silence, language=language_code(language), beam_size=FASTER_WHISPER_BEAM_SIZE)
+    list(segments)  # La decodifica avviene solo quando si consumano i segmenti
+
+
+register_model_loader("faster-whisper", ModelLoader(
+    load_fn=_load_faster_whisper,
+    warm_up_fn=_warm_up_faster_whisper,
+    size_fn=lambda model, model_name: _FASTER_WHISPER_INT8_SIZE_MB.get(model_name, 500)
+))
+
+
+class FasterWhisperBackend(InferenceBackend):
+    """faster-whisper (CTranslate2) con pesi quantizzati int8 su CPU."""
+    name = "faster-whisper"
+
+    def __init__(self):
+        import faster_whisper  # noqa: F401 - verifica subito la disponibilità del pacchetto opzionale
+        super().__init__()
+
+    def capabilities(self) -> Dict[str, Any]:
+        caps = super().capabilities()
+        caps.update({"int8": FASTER_WHISPER_COMPUTE_TYPE.startswith("int8"), "initial_prompt": True})
+        return caps
+
+    def transcribe_segment(self, audio: np.ndarray, language: Optional[str],
+                           initial_prompt: Optional[str] = None) -> str:
+        with self.lock:
+            if self.model is None:
+                raise RuntimeError("Modello faster-whisper non caricato.")
+            segments, _ = self.model.transcribe(
+                audio, language=language_code(language), beam_size=FASTER_WHISPER_BEAM_SIZE,
+                temperature=DEFAULT_WHISPER_TEMPERATURE, initial_prompt=initial_prompt
+            )
+            return "".join(segment.text for segment in segments).strip()
+
+
+def _create_fake_whisper_backend() -> InferenceBackend:
+    # Import tardivo: il modulo registra il motore finto e il suo caricatore di modelli
+    from src.core.fake_whisper import FakeWhisperBackend
+    return FakeWhisperBackend()
+
+
+_INFERENCE_BACKEND_FACTORIES: Dict[str, Callable[[], InferenceBackend]] = {
+    OpenAIWhisperBackend.name: OpenAIWhisperBackend,
+    FasterWhisperBackend.name: FasterWhisperBackend,
+    FAKE_WHISPER_BACKEND: _create_fake_whisper_backend,
+}
+
+
+def register_inference_backend(name: str, factory: Callable[[], InferenceBackend]):
+    """Permette di aggiungere altri motori (es. whisper.cpp) senza toccare il Transcriber."""
+    _INFERENCE_BACKEND_FACTORIES[name] = factory
+
+
+def create_inference_backend(backend_name: Optional[str] = None) -> InferenceBackend:
+    backend_name = backend_name or DEFAULT_INFERENCE_BACKEND
+    factory = _INFERENCE_BACKEND_FACTORIES.get(backend_name)
+    if factory is None:
+        app_logger.warning(f"Motore di inferenza '{backend_name}' sconosciuto. Uso '{OpenAIWhisperBackend.name}'.")
+        return OpenAIWhisperBackend()
+    try:
+        return factory()
+    except ImportError as e:
+        app_logger.warning(f"Motore di inferenza '{backend_name}' non disponibile ({e}). Uso '{OpenAIWhisperBackend.name}'.")
+        return OpenAIWhisperBackend()
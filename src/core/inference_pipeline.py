@@ -0,0 +1,202 @@
+# src/core/inference_pipeline.py
+import time
+from collections import deque
+from threading import Thread, Condition, Lock
+from typing import Callable, Deque, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from src.config import (
+    AUDIO_SAMPLE_RATE, INFERENCE_QUEUE_MAX_SEGMENTS, INFERENCE_WORKERS, DEFAULT_BACKPRESSURE_POLICY,
+    AVAILABLE_BACKPRESSURE_POLICIES, BACKPRESSURE_DEGRADED_MAX_EXTRA_SEGMENTS
+)
+from src.utils.logger import app_logger
+from src.utils.metrics import metrics
+
+BACKPRESSURE_DROP = "drop"         # Coda piena: scarta il segmento più vecchio in attesa
+BACKPRESSURE_MERGE = "merge"       # Coda piena: unisci il nuovo segmento all'ultimo in attesa
+BACKPRESSURE_DEGRADE = "degrade"   # Coda piena: accoda comunque (fino a un limite), trascrivendo con il modello ridotto
+
+
+class AudioSegment:
+    __slots__ = ("seq", "audio", "ring_tokens", "enqueued_at", "speech_ended_at", "degraded")
+
+    def __init__(self, seq: int, audio: np.ndarray, ring_token: Optional[int], speech_ended_at: Optional[float] = None):
+        self.seq = seq
+        self.audio = audio
+        self.ring_tokens: List[int] = [] if ring_token is None else [ring_token]
+        self.enqueued_at = time.monotonic()
+        # Istante (monotonic) in cui è stato catturato l'ultimo audio vocale del segmento
+        self.speech_ended_at = speech_ended_at
+        self.degraded = False
+
+
+class InferencePipeline:
+    """
+    Separa la segmentazione dall'inferenza: il thread di segmentazione accoda i segmenti
+    (submit) in una coda limitata, uno o più worker li trascrivono e i risultati vengono
+    riconsegnati a on_result (testo, istante di fine parlato) nell'ordine di cattura.
+    """
+
+    def __init__(self, transcribe_fn: Callable[[np.ndarray, bool], str],
+                 on_result: Callable[[str, Optional[float]], None],
+                 release_fn: Optional[Callable[[int], None]] = None,
+                 num_workers: int = INFERENCE_WORKERS,
+                 max_queue: int = INFERENCE_QUEUE_MAX_SEGMENTS,
+                 backpressure_policy: str = DEFAULT_BACKPRESSURE_POLICY,
+                 max_degraded_extra: int = BACKPRESSURE_DEGRADED_MAX_EXTRA_SEGMENTS):
+        self.transcribe_fn = transcribe_fn
+        self.on_result = on_result
+        self.release_fn = release_fn
+        self.num_workers = max(1, num_workers)
+        self.max_queue = max(1, max_queue)
+        # Con "degrade" la coda può superare max_queue di al massimo questi segmenti
+        self.max_degraded_extra = max(0, max_degraded_extra)
+        self.backpressure_policy = DEFAULT_BACKPRESSURE_POLICY
+        self.set_backpressure_policy(backpressure_policy)
+
+        self._queue: Deque[AudioSegment] = deque()
+        self._cond = Condition()
+        self._workers: List[Thread] = []
+        self._closing = False
+        self._busy_workers = 0
+        self._next_seq = 0
+
+        # Riassemblaggio in ordine
+        self._emit_lock = Lock()
+        self._results: Dict[int, Tuple[Optional[str], Optional[float]]] = {}
+        self._next_seq_to_emit = 0
+
+        self._depth_gauge = metrics.gauge("inference.queue_depth")
+        self._wait_hist = metrics.histogram("inference.queue_wait_s")
+        self._duration_hist = metrics.histogram("inference.duration_s")
+        self._rtf_hist = metrics.histogram("inference.rtf")
+        self._empty_counter = metrics.counter("inference.empty_transcripts")
+
+    def set_backpressure_policy(self, policy: str):
+        if policy not in AVAILABLE_BACKPRESSURE_POLICIES:
+            app_logger.warning(f"Politica di backpressure '{policy}' non valida. Uso '{DEFAULT_BACKPRESSURE_POLICY}'.")
+            policy = DEFAULT_BACKPRESSURE_POLICY
+        self.backpressure_policy = policy
+
+    @property
+    def depth(self) -> int:
+        return len(self._queue)
+
+    def start(self):
+        with self._cond:
+            self._closing = False
+            self._workers = [w for w in self._workers if w.is_alive()]
+            for i in range(len(self._workers), self.num_workers):
+                worker = Thread(target=self._worker_loop, name=f"InferenceWorker-{i}", daemon=True)
+                self._workers.append(worker)
+                worker.start()
+        app_logger.info(f"Pipeline di inferenza avviata ({self.num_workers} worker, coda max {self.max_queue}, politica '{self.backpressure_policy}').")
+
+    def submit(self, audio: np.ndarray, ring_token: Optional[int] = None, speech_ended_at: Optional[float] = None):
+        """Accoda un segmento. Non blocca mai il chiamante: se la coda è piena applica la politica di backpressure."""
+        with self._cond:
+            if len(self._queue) >= self.max_queue:
+                # Anche "degrade" ha un tetto: oltre, la coda (e le riserve nel ring buffer) smette di crescere
+                degrade_full = (self.backpressure_policy == BACKPRESSURE_DEGRADE
+                                and len(self._queue) >= self.max_queue + self.max_degraded_extra)
+                if self.backpressure_policy == BACKPRESSURE_MERGE or degrade_full:
+                    self._merge_into_last_locked(audio, ring_token, speech_ended_at)
+                    return
+                if self.backpressure_policy == BACKPRESSURE_DROP:
+                    dropped = self._queue.popleft()
+                    metrics.counter("inference.segments_dropped").inc()
+                    app_logger.warning("Coda di inferenza piena: scartato segmento #%d (%d campioni).", dropped.seq, len(dropped.audio))
+                    self._release_segment(dropped)
+                    self._store_result(dropped.seq, None, None)
+            segment = AudioSegment(self._next_seq, audio, ring_token, speech_ended_at)
+            self._next_seq += 1
+            if self.backpressure_policy == BACKPRESSURE_DEGRADE and len(self._queue) >= self.max_queue:
+                segment.degraded = True
+                metrics.counter("inference.segments_degraded").inc()
+            self._queue.append(segment)
+            self._depth_gauge.set(len(self._queue))
+            self._cond.notify()
+
+    def _merge_into_last_locked(self, audio: np.ndarray, ring_token: Optional[int], speech_ended_at: Optional[float]):
+        last = self._queue[-1]
+        # L'unione richiede una copia: da qui in poi l'audio non dipende più dal ring buffer.
+        with metrics.timer("audio.concatenate_s"):
+            last.audio = np.concatenate((last.audio, audio))
+        if speech_ended_at is not None:
+            last.speech_ended_at = speech_ended_at
+        if ring_token is not None:
+            last.ring_tokens.append(ring_token)
+        self._release_segment(last)
+        metrics.counter("inference.segments_merged").inc()
+        app_logger.debug("Coda di inferenza piena: segmento unito al #%d (%d campioni).", last.seq, len(last.audio))
+
+    def _release_segment(self, segment: AudioSegment):
+        if self.release_fn:
+            for token in segment.ring_tokens:
+                self.release_fn(token)
+        segment.ring_tokens = []
+
+    def _worker_loop(self):
+        while True:
+            with self._cond:
+                while not self._queue and not self._closing:
+                    self._cond.wait()
+                if not self._queue:
+                    return
+                segment = self._queue.popleft()
+                self._busy_workers += 1
+                self._depth_gauge.set(len(self._queue))
+            self._wait_hist.observe(time.monotonic() - segment.enqueued_at)
+            text: Optional[str] = None
+            audio_s = len(segment.audio) / AUDIO_SAMPLE_RATE
+            started_at = time.monotonic()
+            try:
+                text = self.transcribe_fn(segment.audio, segment.degraded)
+            except Exception as e:
+                app_logger.error(f"Errore inferenza segmento #{segment.seq}: {e}", exc_info=True)
+            finally:
+                duration_s = time.monotonic() - started_at
+                self._duration_hist.observe(duration_s)
+                if audio_s > 0: self._rtf_hist.observe(duration_s / audio_s)
+                if not (text and text.strip()): self._empty_counter.inc()
+                self._release_segment(segment)
+                segment.audio = None
+                self._store_result(segment.seq, text, segment.speech_ended_at)
+                with self._cond:
+                    self._busy_workers -= 1
+                    self._cond.notify_all()
+
+    def _store_result(self, seq: int, text: Optional[str], speech_ended_at: Optional[float]):
+        with self._emit_lock:
+            self._results[seq] = (text, speech_ended_at)
+            while self._next_seq_to_emit in self._results:
+                ready_text, ready_speech_ended_at = self._results.pop(self._next_seq_to_emit)
+                self._next_seq_to_emit += 1
+                if ready_text:
+                    try:
+                        self.on_result(ready_text, ready_speech_ended_at)
+                    except Exception as e:
+                        app_logger.error(f"Errore nel callback dei risultati di trascrizione: {e}", exc_info=True)
+
+    def wait_idle(self, timeout: Optional[float] = None) -> bool:
+        """Attende che la coda sia vuota e nessun worker stia trascrivendo."""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._cond:
+            while self._queue or self._busy_workers:
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    return False
+                self._cond.wait(remaining)
+        return True
+
+    def stop(self, timeout: Optional[float] = None) -> bool:
+        """Trascrive i segmenti ancora in coda e ferma i worker."""
+        drained = self.wait_idle(timeout)
+        with self._cond:
+            self._closing = True
+            self._cond.notify_all()
+        for worker in self._workers:
+            worker.join(timeout=1.0)
+        self._workers = [w for w in self._workers if w.is_alive()]
+        return drained
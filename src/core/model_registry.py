@@ -0,0 +1,193 @@
+# src/core/model_registry.py
+import time
+from collections import OrderedDict
+from threading import Lock
+from typing import Any, Callable, Dict, Optional, Tuple
+
+import numpy as np
+import torch
+import whisper
+
+from src.config import (
+    MODEL_REGISTRY_MEMORY_BUDGET_MB, MODEL_WARMUP_AUDIO_S, AUDIO_SAMPLE_RATE, DEFAULT_LANGUAGE,
+    DEFAULT_INFERENCE_BACKEND
+)
+from src.utils.logger import app_logger
+
+ModelKey = Tuple[str, str, str]  # (motore di inferenza, nome modello, dispositivo)
+
+
+def resolve_device(device: Optional[str] = None) -> str:
+    """Stesso criterio di whisper.load_model: CUDA se disponibile, altrimenti CPU."""
+    if device:
+        return device
+    return "cuda" if torch.cuda.is_available() else "cpu"
+
+
+def estimate_model_size_mb(model: torch.nn.Module) -> float:
+    total_bytes = sum(t.numel() * t.element_size() for t in model.parameters())
+    total_bytes += sum(t.numel() * t.element_size() for t in model.buffers())
+    return total_bytes / (1024 * 1024)
+
+
+def warm_up_whisper(model: whisper.Whisper, language: str):
+    silence = np.zeros(int(MODEL_WARMUP_AUDIO_S * AUDIO_SAMPLE_RATE), dtype=np.float32)
+    model.transcribe(silence, language=language, fp16=False, temperature=0.0)
+
+
+class ModelLoader:
+    """Come caricare, riscaldare e stimare in memoria i modelli di un motore di inferenza."""
+
+    def __init__(self, load_fn: Callable[[str, str], Any],
+                 warm_up_fn: Optional[Callable[[Any, str], None]] = None,
+                 size_fn: Optional[Callable[[Any, str], float]] = None):
+        self.load_fn = load_fn
+        self.warm_up_fn = warm_up_fn
+        self.size_fn = size_fn or (lambda model, model_name: estimate_model_size_mb(model))
+
+
+_MODEL_LOADERS: Dict[str, ModelLoader] = {
+    DEFAULT_INFERENCE_BACKEND: ModelLoader(
+        # Riferimento tardivo a whisper.load_model: resta sostituibile (es. nei test).
+        load_fn=lambda model_name, device: whisper.load_model(model_name, device=device),
+        warm_up_fn=warm_up_whisper
+    ),
+}
+
+
+def register_model_loader(backend: str, loader: ModelLoader):
+    _MODEL_LOADERS[backend] = loader
+
+
+class _ModelEntry:
+    __slots__ = ("model", "refcount", "size_mb")
+
+    def __init__(self, model: Any, size_mb: float):
+        self.model = model
+        self.refcount = 0
+        self.size_mb = size_mb
+
+
+class ModelRegistry:
+    """
+    Registro dei modelli Whisper condiviso da tutto il processo.
+
+    Ogni Transcriber ottiene il modello con acquire() e lo restituisce con release():
+    la stessa istanza viene condivisa tra i Transcriber e un nuovo START non ricarica il modello.
+    I modelli senza riferimenti restano in cache finché la memoria totale non supera il budget,
+    poi vengono scaricati in ordine LRU. La lingua non fa parte della chiave: è un'opzione di
+    trascrizione, non del modello. I modelli di motori diversi (vedi register_model_loader)
+    hanno chiavi distinte.
+    """
+
+    def __init__(self, memory_budget_mb: float = MODEL_REGISTRY_MEMORY_BUDGET_MB):
+        self.memory_budget_mb = memory_budget_mb
+        self._entries: "OrderedDict[ModelKey, _ModelEntry]" = OrderedDict()  # dal meno al più recente
+        self._lock = Lock()
+        # Un lock per chiave: due thread che chiedono lo stesso modello lo caricano una volta sola,
+        # mentre modelli diversi possono caricarsi in parallelo.
+        self._load_locks: Dict[ModelKey, Lock] = {}
+
+    def acquire(self, model_name: str, device: Optional[str] = None,
+                warm_up_language: Optional[str] = None, backend: str = DEFAULT_INFERENCE_BACKEND) -> Any:
+        """
+        Restituisce il modello (caricandolo se necessario) e ne incrementa il conteggio dei riferimenti.
+        Se warm_up_language è indicata, un modello appena caricato decodifica un breve silenzio
+        prima di essere reso disponibile agli altri thread.
+        """
+        loader = _MODEL_LOADERS.get(backend)
+        if loader is None:
+            raise ValueError(f"Nessun caricatore di modelli registrato per il motore '{backend}'.")
+        key = (backend, model_name, resolve_device(device))
+        with self._lock:
+            load_lock = self._load_locks.setdefault(key, Lock())
+        with load_lock:
+            with self._lock:
+                entry = self._entries.get(key)
+                if entry is not None:
+                    entry.refcount += 1
+                    self._entries.move_to_end(key)
+                    app_logger.info(f"ModelRegistry: Modello '{model_name}' ({backend}, {key[2]}) già in memoria (riferimenti: {entry.refcount}).")
+                    return entry.model
+            app_logger.info(f"ModelRegistry: Caricamento modello '{model_name}' ({backend}) su {key[2]}...")
+            model = loader.load_fn(model_name, key[2])
+            if warm_up_language and loader.warm_up_fn:
+                self._warm_up(loader, model, model_name, warm_up_language)
+            entry = _ModelEntry(model, loader.size_fn(model, model_name))
+            entry.refcount = 1
+            with self._lock:
+                self._entries[key] = entry
+                app_logger.info(f"ModelRegistry: Modello '{model_name}' caricato ({entry.size_mb:.0f} MB, totale {self._total_mb_locked():.0f}/{self.memory_budget_mb} MB).")
+                self._evict_locked()
+            return model
+
+    def preload(self, model_name: str, language: str = DEFAULT_LANGUAGE, device: Optional[str] = None,
+                backend: str = DEFAULT_INFERENCE_BACKEND):
+        """Carica e riscalda il modello lasciandolo in cache, senza trattenerne un riferimento."""
+        self.release(self.acquire(model_name, device, warm_up_language=language, backend=backend))
+
+    def is_loaded(self, model_name: str, device: Optional[str] = None, backend: str = DEFAULT_INFERENCE_BACKEND) -> bool:
+        with self._lock:
+            return (backend, model_name, resolve_device(device)) in self._entries
+
+    def _warm_up(self, loader: ModelLoader, model: Any, model_name: str, language: str):
+        started_at = time.monotonic()
+        try:
+            loader.warm_up_fn(model, language)
+            app_logger.info(f"ModelRegistry: Warm-up modello '{model_name}' completato in {time.monotonic() - started_at:.2f}s.")
+        except Exception as e:
+            # Il warm-up è solo un'ottimizzazione: il modello resta utilizzabile.
+            app_logger.warning(f"ModelRegistry: Warm-up modello '{model_name}' fallito: {e}")
+
+    def release(self, model: Any):
+        """Restituisce un modello ottenuto con acquire(). Il modello resta in cache se rientra nel budget."""
+        if model is None:
+            return
+        with self._lock:
+            for key, entry in self._entries.items():
+                if entry.model is model:
+                    if entry.refcount > 0:
+                        entry.refcount -= 1
+                    app_logger.debug(f"ModelRegistry: Rilasciato '{key[1]}' ({key[0]}, {key[2]}), riferimenti rimasti: {entry.refcount}.")
+                    break
+            else:
+                app_logger.warning("ModelRegistry: release() di un modello non registrato.")
+                return
+            self._evict_locked()
+
+    def set_memory_budget(self, memory_budget_mb: float):
+        with self._lock:
+            self.memory_budget_mb = memory_budget_mb
+            self._evict_locked()
+
+    def loaded_models(self) -> Dict[ModelKey, int]:
+        """Chiavi dei modelli in memoria con il rispettivo numero di riferimenti."""
+        with self._lock:
+            return {key: entry.refcount for key, entry in self._entries.items()}
+
+    def clear(self):
+        """Scarica tutti i modelli non in uso."""
+        with self._lock:
+            for key in [k for k, e in self._entries.items() if e.refcount == 0]:
+                self._unload_locked(key)
+
+    def _total_mb_locked(self) -> float:
+        return sum(entry.size_mb for entry in self._entries.values())
+
+    def _evict_locked(self):
+        # I modelli in uso non vengono mai scaricati, anche a budget superato.
+        for key in [k for k, e in self._entries.items() if e.refcount == 0]:
+            if self._total_mb_locked() <= self.memory_budget_mb:
+                break
+            self._unload_locked(key)
+
+    def _unload_locked(self, key: ModelKey):
+        entry = self._entries.pop(key)
+        app_logger.info(f"ModelRegistry: Scaricato modello '{key[1]}' ({key[0]}, {key[2]}, {entry.size_mb:.0f} MB).")
+        if key[2].startswith("cuda"):
+            del entry
+            torch.cuda.empty_cache()
+
+
+# Istanza globale condivisa da tutti i Transcriber.
+model_registry = ModelRegistry()
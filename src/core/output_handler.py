@@ -1,16 +1,27 @@
 # src/core/output_handler.py
 import pyautogui
-import time # Per eventuali piccole pause, sebbene non usate attivamente ora
+import time
 from PyQt6.QtWidgets import QTextEdit
 from PyQt6.QtGui import QTextCursor # Importa QTextCursor per operazioni sul cursore
-from typing import Optional
+from typing import List, Optional
 
+from src.config import (
+    INTERNAL_EDITOR_LARGE_DOCUMENT_CHARS, DEFAULT_EXTERNAL_OUTPUT_MODE, AVAILABLE_EXTERNAL_OUTPUT_MODES, EXTERNAL_TYPE_INTERVAL_S,
+    EXTERNAL_PASTE_RESTORE_DELAY_S, EXTERNAL_PASTE_HOTKEY
+)
 from src.utils.logger import app_logger
+from src.utils.metrics import metrics
+
+try:
+    import pyperclip  # Dipendenza di pyautogui; senza appunti disponibili si torna alla digitazione
+except ImportError:
+    pyperclip = None
 
 class OutputHandler:
     def __init__(self, internal_editor_widget: Optional[QTextEdit] = None):
         self.internal_editor: Optional[QTextEdit] = internal_editor_widget
         self.use_internal_editor: bool = False
+        self.external_output_mode: str = DEFAULT_EXTERNAL_OUTPUT_MODE
         app_logger.info("OutputHandler inizializzato.")
 
     def set_output_mode(self, use_internal: bool, internal_editor_widget: Optional[QTextEdit] = None):
@@ -24,7 +35,13 @@ class OutputHandler:
             else:
                 app_logger.info("Output impostato su editor interno.")
         else:
-            app_logger.info("Output impostato su applicazione esterna (pyautogui).")
+            app_logger.info(f"Output impostato su applicazione esterna (modalità '{self.external_output_mode}').")
+
+    def set_external_output_mode(self, mode: str):
+        if mode not in AVAILABLE_EXTERNAL_OUTPUT_MODES:
+            app_logger.warning(f"Modalità di output esterno '{mode}' non valida. Uso '{DEFAULT_EXTERNAL_OUTPUT_MODE}'.")
+            mode = DEFAULT_EXTERNAL_OUTPUT_MODE
+        self.external_output_mode = mode
 
     def type_text(self, text: str):
         if text is None:
@@ -34,10 +51,53 @@ class OutputHandler:
             app_logger.debug("OutputHandler: type_text chiamato con testo vuoto (non newline).")
             return
 
+        started_at = time.perf_counter()
         if self.use_internal_editor and self.internal_editor:
+            mode = "internal"
             self._type_to_internal_editor(text)
         else:
-            self._type_to_external_app(text)
+            mode = self._type_to_external_app(text)
+        elapsed_s = time.perf_counter() - started_at
+        metrics.histogram(f"output.insert_s.{mode}").observe(elapsed_s)
+        app_logger.debug("OutputHandler: Inserimento di %d caratteri (%s) in %.0f ms.", len(text), mode, elapsed_s * 1000)
+
+    def type_batch(self, texts: List[str]):
+        """
+        Inserisce più testi consecutivi. Nell'editor interno il blocco diventa un solo inserimento
+        (stesse regole di spaziatura di type_text); per le app esterne i testi vengono concatenati.
+        """
+        texts = [text for text in texts if text]
+        if not texts:
+            return
+        if not (self.use_internal_editor and self.internal_editor):
+            self.type_text("".join(texts))
+            return
+        started_at = time.perf_counter()
+        self._type_batch_to_internal_editor(texts)
+        elapsed_s = time.perf_counter() - started_at
+        for _ in texts:
+            metrics.histogram("output.insert_s.internal").observe(elapsed_s / len(texts))
+        app_logger.debug("OutputHandler: Inserimento di %d testi (%d caratteri, internal) in %.0f ms.", len(texts), sum(map(len, texts)), elapsed_s * 1000)
+
+    def _last_editor_char(self) -> str:
+        """
+        Ultimo carattere del documento, letto direttamente da QTextDocument:
+        toPlainText() copierebbe l'intero documento a ogni inserimento (O(n²) su una sessione lunga).
+        """
+        document = self.internal_editor.document()
+        char_count = document.characterCount() # Include il separatore di paragrafo finale
+        if char_count <= 1:
+            return ""
+        last_char = document.characterAt(char_count - 2)
+        # QTextDocument rappresenta gli a capo come separatori di paragrafo/riga
+        return "\n" if last_char in ("\u2029", "\u2028") else last_char
+
+    @staticmethod
+    def _needs_leading_space(last_char: str, text: str) -> bool:
+        """Spazio tra il testo già presente e il nuovo, salvo editor vuoto, "\n" da solo o spazi/'(' già presenti."""
+        if not last_char or text == "\n":
+            return False
+        return not text.startswith((' ', '\n', '\t')) and last_char not in (' ', '\n', '\t', '(')
 
     def _type_to_internal_editor(self, text: str):
         if self.internal_editor is None:
@@ -47,62 +107,14 @@ class OutputHandler:
             cursor = self.internal_editor.textCursor()
             cursor.movePosition(QTextCursor.MoveOperation.End) # Vai alla fine del testo
 
-            current_doc_text = self.internal_editor.toPlainText()
-            needs_leading_space = False
-
-            # --- INIZIO LOGICA SPAZIATURA MIGLIORATA + LOGGING DETTAGLIATO ---
-            text_starts_with_space_like = text.startswith((' ', '\n', '\t'))
-            last_char_is_space_like_or_paren = False
-            last_char_val = "N/A (editor vuoto o primo inserimento)"
-
-            if current_doc_text: # Se c'è già del testo
-                last_char_val = current_doc_text[-1]
-                last_char_is_space_like_or_paren = last_char_val in (' ', '\n', '\t', '(')
-                
-                app_logger.debug(f"OutputHandler Check Spazio PRE-DECISIONE: text='{repr(text)}', "
-                                 f"text_starts_space_like={text_starts_with_space_like}, "
-                                 f"last_char_in_editor='{repr(last_char_val)}', "
-                                 f"last_char_is_space_like_or_paren={last_char_is_space_like_or_paren}")
-
-                if not text_starts_with_space_like and not last_char_is_space_like_or_paren:
-                    needs_leading_space = True
-            else: # Editor era vuoto prima di questo inserimento
-                app_logger.debug(f"OutputHandler Check Spazio PRE-DECISIONE (editor era vuoto): text='{repr(text)}', "
-                                 f"text_starts_space_like={text_starts_with_space_like}")
-            
-            # Log della decisione iniziale su needs_leading_space
-            app_logger.debug(f"OutputHandler Check Spazio DECISIONE INIZIALE: needs_leading_space={needs_leading_space} per text='{repr(text)}'")
-
-            # Se il testo da inserire è solo un newline, non aggiungere spazi iniziali.
-            if text == "\n":
-                if needs_leading_space: # Se era stato deciso di aggiungere uno spazio...
-                    app_logger.debug(f"OutputHandler: text è newline ('\\n'), needs_leading_space resettato da True a False.")
-                needs_leading_space = False # Sovrascrive la decisione precedente
-            
+            last_char = self._last_editor_char()
+            needs_leading_space = self._needs_leading_space(last_char, text)
+            app_logger.debug("OutputHandler Check Spazio: text=%r, last_char_in_editor=%r, needs_leading_space=%s", text, last_char, needs_leading_space)
             if needs_leading_space:
                 cursor.insertText(" ")
-                app_logger.info("OutputHandler: SPAZIO PRINCIPALE INSERITO.") # LOG MODIFICATO A INFO
-            else:
-                # Logghiamo perché lo spazio non è stato inserito, se non è un newline
-                if text != "\n":
-                    if not current_doc_text:
-                        app_logger.debug(f"OutputHandler: Spazio principale non inserito (editor era vuoto). Text: '{repr(text)}'")
-                    elif text_starts_with_space_like:
-                        app_logger.debug(f"OutputHandler: Spazio principale non inserito (testo inizia già con carattere tipo spazio). Text: '{repr(text)}'")
-                    elif last_char_is_space_like_or_paren:
-                        app_logger.debug(f"OutputHandler: Spazio principale non inserito (ultimo carattere editor era tipo spazio o '('). Last char: '{repr(last_char_val)}'. Text: '{repr(text)}'")
-                    else:
-                        # Questo caso indica che needs_leading_space è False ma nessuna delle condizioni sopra lo spiega.
-                        # Potrebbe essere perché text era "\n" e poi è cambiato, o un bug.
-                        app_logger.warning(f"OutputHandler: Spazio principale NON inserito, e le ragioni standard non sembrano applicarsi. "
-                                           f"needs_leading_space={needs_leading_space}, text='{repr(text)}', "
-                                           f"last_char_val='{repr(last_char_val)}', editor_vuoto={not bool(current_doc_text)}, "
-                                           f"text_starts_space_like={text_starts_with_space_like}, "
-                                           f"last_char_is_space_like_or_paren={last_char_is_space_like_or_paren}")
-            # --- FINE LOGICA SPAZIATURA MIGLIORATA + LOGGING DETTAGLIATO ---
 
             cursor.insertText(text) # Inserisce il testo così com'è
-            app_logger.info(f"Testo '{repr(text)}' inserito nell'editor interno.") # Questo log è già buono
+            app_logger.debug("Testo %r inserito nell'editor interno.", text)
 
             self.internal_editor.setTextCursor(cursor) # Applica il cursore
             self.internal_editor.ensureCursorVisible()
@@ -110,12 +122,81 @@ class OutputHandler:
         except Exception as e:
             app_logger.error(f"Errore scrittura su editor interno: {e}", exc_info=True)
 
-    def _type_to_external_app(self, text: str):
+    def _type_batch_to_internal_editor(self, texts: List[str]):
+        if self.internal_editor is None:
+            app_logger.error("Tentativo di scrivere su editor interno, ma il widget non è disponibile.")
+            return
+        try:
+            # Spaziatura calcolata in memoria, seguendo l'ultimo carattere di ogni testo del blocco.
+            last_char = self._last_editor_char()
+            parts: List[str] = []
+            for text in texts:
+                if self._needs_leading_space(last_char, text):
+                    parts.append(" ")
+                parts.append(text)
+                last_char = text[-1]
+
+            editor = self.internal_editor
+            large_document = editor.document().characterCount() > INTERNAL_EDITOR_LARGE_DOCUMENT_CHARS
+            if large_document:
+                # Documento grande: niente ridisegni intermedi, un solo aggiornamento a fine blocco.
+                editor.setUpdatesEnabled(False)
+            try:
+                cursor = editor.textCursor()
+                cursor.movePosition(QTextCursor.MoveOperation.End)
+                cursor.beginEditBlock() # Un solo passo di annulla e un solo aggiornamento del layout
+                cursor.insertText("".join(parts))
+                cursor.endEditBlock()
+                editor.setTextCursor(cursor)
+            finally:
+                if large_document:
+                    editor.setUpdatesEnabled(True)
+            editor.ensureCursorVisible()
+        except Exception as e:
+            app_logger.error(f"Errore scrittura su editor interno: {e}", exc_info=True)
+
+    def _type_to_external_app(self, text: str) -> str:
+        """Inserisce il testo nell'applicazione con il focus. Restituisce la modalità effettivamente usata."""
+        if self.external_output_mode == "paste" and self._paste_to_external_app(text):
+            return "paste"
         try:
-            pyautogui.typewrite(text, interval=0.01)
-            app_logger.info(f"Testo '{repr(text)}' digitato con pyautogui.")
+            pyautogui.typewrite(text, interval=EXTERNAL_TYPE_INTERVAL_S)
+            app_logger.debug("Testo %r digitato con pyautogui.", text)
         except Exception as e:
             app_logger.error(f"Errore durante la digitazione con pyautogui: {e}", exc_info=True)
+        return "type"
+
+    def _paste_to_external_app(self, text: str) -> bool:
+        """
+        Copia il testo negli appunti, invia la scorciatoia Incolla e ripristina il contenuto precedente.
+        Restituisce False se gli appunti non sono utilizzabili o l'incolla non è stato inviato:
+        il chiamante ripiega sulla digitazione. Vengono salvati e ripristinati solo appunti di tipo testo.
+        """
+        if pyperclip is None:
+            app_logger.warning("OutputHandler: pyperclip non disponibile, uso la digitazione.")
+            return False
+        try:
+            previous_clipboard = pyperclip.paste()
+            pyperclip.copy(text)
+        except Exception as e:
+            app_logger.warning("OutputHandler: Appunti non accessibili (%s), uso la digitazione.", e)
+            return False
+        pasted = False
+        try:
+            pyautogui.hotkey(*EXTERNAL_PASTE_HOTKEY)
+            pasted = True
+            app_logger.debug("Testo %r incollato dagli appunti.", text)
+        except Exception as e:
+            app_logger.error(f"Errore durante l'incolla con pyautogui: {e}. Uso la digitazione.", exc_info=True)
+        finally:
+            time.sleep(EXTERNAL_PASTE_RESTORE_DELAY_S)
+            try:
+                # Se nel frattempo l'utente ha copiato altro, non sovrascriverlo.
+                if pyperclip.paste() == text:
+                    pyperclip.copy(previous_clipboard)
+            except Exception as e:
+                app_logger.warning(f"OutputHandler: Impossibile ripristinare gli appunti: {e}")
+        return pasted
 
 
 if __name__ == '__main__':
@@ -152,9 +233,15 @@ if __name__ == '__main__':
     # Se necessario, si può decommentare e adattare questo per test isolati.
     
     # Esempio di simulazione logica senza GUI completa:
+    class MockQTextDocument:
+        def __init__(self, editor): self.editor = editor
+        def characterCount(self): return len(self.editor.text_content) + 1 # Separatore di paragrafo finale
+        def characterAt(self, pos): return self.editor.text_content[pos].replace("\n", "\u2029")
+
     class MockQTextEdit:
         def __init__(self): self.text_content = ""
         def toPlainText(self): return self.text_content
+        def document(self): return MockQTextDocument(self)
         def textCursor(self): return MockQTextCursor(self)
         def setTextCursor(self, cursor): pass
         def ensureCursorVisible(self): pass
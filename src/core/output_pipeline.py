@@ -0,0 +1,137 @@
+# src/core/output_pipeline.py
+import time
+from collections import deque
+from threading import Thread, Condition
+from typing import Callable, Deque, List, Optional, Tuple
+
+from src.utils.logger import app_logger
+from src.utils.metrics import metrics
+
+
+class OutputPipeline:
+    """
+    Coda seriale tra le trascrizioni e l'output: un worker dedicato applica process_fn
+    (TextProcessor) a ogni testo e consegna i risultati a sink_fn, sempre nell'ordine di arrivo.
+
+    Se il sink è lento e nel frattempo arrivano altri testi, il worker li preleva tutti insieme
+    e li consegna con una sola chiamata a sink_fn (lista di testi, in ordine): il sink decide
+    come unirli (concatenazione per le app esterne, inserimento a blocchi nell'editor interno).
+    Per i testi che riportano l'istante di fine parlato misura la latenza end-to-end fino al sink;
+    sink_fn riceve anche questi istanti e, se la consegna prosegue altrove (es. un segnale verso il
+    thread della GUI), restituisce False e chiama observe_delivered() quando il testo è davvero inserito.
+    """
+
+    def __init__(self, process_fn: Callable[[str], str],
+                 sink_fn: Callable[[List[str], List[float]], Optional[bool]]):
+        self.process_fn = process_fn
+        self.sink_fn = sink_fn
+        # (testo, già elaborato, istante di accodamento, istante di fine parlato)
+        self._queue: Deque[Tuple[str, bool, float, Optional[float]]] = deque()
+        self._cond = Condition()
+        self._worker: Optional[Thread] = None
+        self._closing = False
+        self._busy = False
+
+        self._depth_gauge = metrics.gauge("output.queue_depth")
+        self._wait_hist = metrics.histogram("output.queue_wait_s")
+        self._sink_hist = metrics.histogram("output.sink_s")
+        self._end_to_end_hist = metrics.histogram("latency.end_to_end_s")
+
+    @property
+    def depth(self) -> int:
+        return len(self._queue)
+
+    def start(self):
+        with self._cond:
+            self._closing = False
+            if self._worker is None or not self._worker.is_alive():
+                self._worker = Thread(target=self._worker_loop, name="OutputWorker", daemon=True)
+                self._worker.start()
+        app_logger.info("Pipeline di output avviata.")
+
+    def submit(self, text: str, processed: bool = False, speech_ended_at: Optional[float] = None):
+        """Accoda un testo. processed=True salta process_fn (es. un "\\n" già pronto)."""
+        with self._cond:
+            self._queue.append((text, processed, time.monotonic(), speech_ended_at))
+            self._depth_gauge.set(len(self._queue))
+            self._cond.notify()
+
+    def _worker_loop(self):
+        while True:
+            with self._cond:
+                while not self._queue and not self._closing:
+                    self._cond.wait()
+                if not self._queue:
+                    return
+                batch = list(self._queue)
+                self._queue.clear()
+                self._busy = True
+                self._depth_gauge.set(0)
+            try:
+                self._process_batch(batch)
+            finally:
+                with self._cond:
+                    self._busy = False
+                    self._cond.notify_all()
+
+    def _process_batch(self, batch: List[Tuple[str, bool, float, Optional[float]]]):
+        now = time.monotonic()
+        texts: List[str] = []
+        speech_ends: List[float] = []
+        for text, processed, enqueued_at, speech_ended_at in batch:
+            self._wait_hist.observe(now - enqueued_at)
+            try:
+                output_text = text if processed else self.process_fn(text)
+            except Exception as e:
+                app_logger.error(f"Errore elaborazione testo in uscita {repr(text)}: {e}", exc_info=True)
+                continue
+            if output_text:
+                texts.append(output_text)
+                if speech_ended_at is not None: speech_ends.append(speech_ended_at)
+            elif text.strip():
+                app_logger.warning("Pipeline di output: %r -> testo elaborato vuoto. Nessun output.", text)
+        if not texts:
+            return
+        if len(texts) > 1:
+            metrics.counter("output.items_coalesced").inc(len(texts) - 1)
+            app_logger.debug("Pipeline di output: %d testi consegnati insieme.", len(texts))
+        started_at = time.monotonic()
+        delivered = True
+        try:
+            delivered = self.sink_fn(texts, speech_ends) is not False
+        except Exception as e:
+            app_logger.error(f"Errore nel sink di output: {e}", exc_info=True)
+        finally:
+            sink_s = time.monotonic() - started_at
+            # Latenza per elemento: un blocco di N testi costa una sola chiamata al sink.
+            for _ in texts:
+                self._sink_hist.observe(sink_s / len(texts))
+            if delivered:
+                self.observe_delivered(speech_ends)
+
+    def observe_delivered(self, speech_ends: List[float]):
+        """Registra la latenza end-to-end (fine parlato -> testo consegnato) per un blocco appena inserito."""
+        delivered_at = time.monotonic()
+        for speech_ended_at in speech_ends:
+            self._end_to_end_hist.observe(delivered_at - speech_ended_at)
+
+    def wait_idle(self, timeout: Optional[float] = None) -> bool:
+        """Attende che la coda sia vuota e il worker abbia consegnato l'ultimo blocco."""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._cond:
+            while self._queue or self._busy:
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    return False
+                self._cond.wait(remaining)
+        return True
+
+    def stop(self, timeout: Optional[float] = None) -> bool:
+        """Consegna i testi ancora in coda e ferma il worker."""
+        drained = self.wait_idle(timeout)
+        with self._cond:
+            self._closing = True
+            self._cond.notify_all()
+        if self._worker is not None:
+            self._worker.join(timeout=1.0)
+        return drained
@@ -0,0 +1,199 @@
+# src/core/persistence.py
+import atexit
+import json
+import os
+import time
+from pathlib import Path
+from threading import Thread, Condition, Lock
+from typing import Any, Dict, Optional
+
+from src.config import PERSISTENCE_DEBOUNCE_S, PERSISTENCE_MAX_DELAY_S
+from src.utils.logger import app_logger
+from src.utils.metrics import metrics
+
+
+def serialize_json(data: Any) -> str:
+    """Formato unico dei file JSON dell'applicazione (stesso di json.dump con indent=4)."""
+    return json.dumps(data, indent=4, ensure_ascii=False)
+
+
+def atomic_write_text(path: Path, content: str):
+    """
+    Scrive su un file temporaneo nella stessa cartella, fsync e rename: in caso di crash
+    resta il file precedente oppure quello nuovo, mai un JSON troncato.
+    """
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    temp_path = path.with_name(f".{path.name}.{os.getpid()}.tmp")
+    try:
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            f.write(content)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temp_path, path)
+    except BaseException:
+        try: temp_path.unlink()
+        except OSError: pass
+        raise
+    if os.name == "posix":
+        # Rende persistente anche la voce della cartella (il rename)
+        try:
+            dir_fd = os.open(path.parent, os.O_RDONLY)
+            try: os.fsync(dir_fd)
+            finally: os.close(dir_fd)
+        except OSError:
+            pass
+
+
+class _PendingWrite:
+    __slots__ = ("content", "first_scheduled_at", "last_scheduled_at")
+
+    def __init__(self, content: str):
+        self.content = content
+        self.first_scheduled_at = self.last_scheduled_at = time.monotonic()
+
+    @property
+    def deadline(self) -> float:
+        # Debounce: attende una pausa nelle modifiche, ma non oltre PERSISTENCE_MAX_DELAY_S dalla prima.
+        return min(self.last_scheduled_at + PERSISTENCE_DEBOUNCE_S, self.first_scheduled_at + PERSISTENCE_MAX_DELAY_S)
+
+
+class WriteBehindStore:
+    """
+    Scritture differite dei file JSON. schedule() registra il nuovo contenuto e ritorna subito;
+    un thread in background scrive i file "sporchi" dopo PERSISTENCE_DEBOUNCE_S senza modifiche,
+    così più salvataggi ravvicinati dello stesso file diventano una sola scrittura.
+
+    Un file è sporco solo se il contenuto differisce dall'ultimo scritto o letto (note_persisted):
+    salvare dati invariati non produce scritture. Le letture devono passare da pending_content()
+    per vedere le modifiche non ancora su disco. flush() scrive tutto subito (es. in chiusura).
+    """
+
+    def __init__(self):
+        self._cond = Condition()
+        # Prelievo dalla coda e scrittura avvengono sotto questo lock: due versioni dello stesso file
+        # non possono essere scritte in ordine inverso (flusher in background contro flush()).
+        self._write_lock = Lock()
+        self._pending: Dict[Path, _PendingWrite] = {}
+        self._persisted: Dict[Path, str] = {}  # Ultimo contenuto noto su disco
+        self._flusher: Optional[Thread] = None
+        self._closing = False
+
+        self._dirty_gauge = metrics.gauge("persistence.dirty_files")
+        self._flush_hist = metrics.histogram("persistence.flush_s")
+        atexit.register(self.close)
+
+    def note_persisted(self, path: Path, content: str):
+        """Registra il contenuto attuale del file su disco (es. appena letto)."""
+        with self._cond:
+            self._persisted[Path(path)] = content
+
+    def pending_content(self, path: Path) -> Optional[str]:
+        with self._cond:
+            pending = self._pending.get(Path(path))
+            return pending.content if pending else None
+
+    def is_dirty(self, path: Path) -> bool:
+        with self._cond:
+            return Path(path) in self._pending
+
+    def schedule(self, path: Path, data: Any) -> bool:
+        """Accoda la scrittura di data (serializzato subito in JSON). Restituisce True se il file è sporco."""
+        path = Path(path)
+        content = serialize_json(data)
+        with self._cond:
+            pending = self._pending.get(path)
+            if pending is None:
+                if self._persisted.get(path) == content:
+                    return False  # Invariato rispetto al disco
+                self._pending[path] = _PendingWrite(content)
+            else:
+                metrics.counter("persistence.writes_coalesced").inc()
+                pending.content = content
+                pending.last_scheduled_at = time.monotonic()
+            self._dirty_gauge.set(len(self._pending))
+            self._ensure_flusher_locked()
+            self._cond.notify_all()
+        return True
+
+    def discard(self, directory: Path):
+        """Annulla le scritture in attesa sotto questa cartella (es. profilo eliminato)."""
+        directory = Path(directory)
+        with self._write_lock, self._cond:  # Attende l'eventuale scrittura in corso
+            for path in [p for p in self._pending if directory in p.parents]:
+                del self._pending[path]
+            for path in [p for p in self._persisted if directory in p.parents]:
+                del self._persisted[path]
+            self._dirty_gauge.set(len(self._pending))
+            self._cond.notify_all()
+
+    def _ensure_flusher_locked(self):
+        if self._flusher is None or not self._flusher.is_alive():
+            self._closing = False
+            self._flusher = Thread(target=self._flusher_loop, name="PersistenceFlusher", daemon=True)
+            self._flusher.start()
+
+    def _flusher_loop(self):
+        while True:
+            with self._cond:
+                while not self._closing:
+                    now = time.monotonic()
+                    next_deadline = min((p.deadline for p in self._pending.values()), default=None)
+                    if next_deadline is not None and next_deadline <= now:
+                        break
+                    self._cond.wait(None if next_deadline is None else next_deadline - now)
+                if self._closing:
+                    return
+            with self._write_lock:
+                with self._cond:
+                    now = time.monotonic()
+                    batch = {path: self._pending.pop(path).content
+                             for path in [p for p, pending in self._pending.items() if pending.deadline <= now]}
+                    self._dirty_gauge.set(len(self._pending))
+                self._write_batch(batch)
+
+    def _write_batch(self, batch: Dict[Path, str]) -> bool:
+        if not batch:
+            return True
+        started_at = time.monotonic()
+        success = True
+        for path, content in batch.items():
+            try:
+                atomic_write_text(path, content)
+                metrics.counter("persistence.writes").inc()
+                with self._cond:
+                    self._persisted[path] = content
+                app_logger.debug(f"Persistenza: scritto '{path}'.")
+            except Exception as e:
+                success = False
+                metrics.counter("persistence.write_errors").inc()
+                app_logger.error(f"Persistenza: errore scrittura '{path}': {e}", exc_info=True)
+                with self._cond:
+                    # Riprova più tardi, a meno che nel frattempo sia arrivato un contenuto più recente
+                    if path not in self._pending:
+                        retry = _PendingWrite(content)
+                        retry.first_scheduled_at = retry.last_scheduled_at = time.monotonic() + PERSISTENCE_MAX_DELAY_S
+                        self._pending[path] = retry
+                    self._dirty_gauge.set(len(self._pending))
+        self._flush_hist.observe(time.monotonic() - started_at)
+        return success
+
+    def flush(self) -> bool:
+        """Scrive subito tutti i file sporchi nel thread chiamante. Restituisce False se qualche scrittura fallisce."""
+        with self._write_lock:
+            with self._cond:
+                batch = {path: pending.content for path, pending in self._pending.items()}
+                self._pending.clear()
+                self._dirty_gauge.set(0)
+            if not batch:
+                return True
+            success = self._write_batch(batch)
+        app_logger.info(f"Persistenza: flush di {len(batch)} file completato.")
+        return success
+
+    def close(self):
+        """Scrive le modifiche in attesa e ferma il thread di scrittura."""
+        self.flush()
+        with self._cond:
+            self._closing = True
+            self._cond.notify_all()
@@ -0,0 +1,172 @@
+# src/core/profile_catalog.py
+import os
+import time
+from pathlib import Path
+from threading import Lock
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from src.config import PROFILE_SETTINGS_FILENAME, PROFILE_CATALOG_STAT_INTERVAL_S, PROFILE_CATALOG_WATCHER_ENABLED
+from src.utils.logger import app_logger
+
+
+def _mtime_ns(path: Path) -> Optional[int]:
+    try:
+        return path.stat().st_mtime_ns
+    except OSError:
+        return None
+
+
+class ProfileCatalog:
+    """
+    Indice in memoria dei profili: {safe_name: display_name} più un indice dei display_name
+    normalizzati con casefold(). Il settings.json di un profilo viene riletto solo quando cambia.
+
+    Validità dell'indice:
+    - la data di modifica della cartella dei profili rivela profili aggiunti, rinominati o eliminati;
+    - le date di modifica dei settings.json vengono ricontrollate al massimo ogni
+      PROFILE_CATALOG_STAT_INTERVAL_S secondi (modifiche fatte da altri processi);
+    - le scritture di questo processo chiamano invalidate() direttamente;
+    - con il pacchetto opzionale 'watchdog' (start_watching) le modifiche esterne invalidano subito l'indice.
+    """
+
+    def __init__(self, profiles_dir: Path, load_settings_fn: Callable[[Path], Dict[str, Any]]):
+        self.profiles_dir = profiles_dir
+        self.load_settings_fn = load_settings_fn
+        self._lock = Lock()
+        # safe_name -> (display_name o None se non valido, mtime_ns del settings.json)
+        self._entries: Dict[str, Tuple[Optional[str], Optional[int]]] = {}
+        self._by_casefold: Dict[str, str] = {}
+        self._sorted_display_names: List[str] = []
+        self._dir_mtime_ns: Optional[int] = None
+        self._stale_names: set = set()
+        self._needs_full_scan = True
+        self._last_stat_sweep = 0.0
+        self._observer: Any = None
+
+    def invalidate(self, safe_name: Optional[str] = None):
+        """Segna come da rileggere un profilo, oppure (senza argomenti) l'intero catalogo."""
+        with self._lock:
+            if safe_name is None:
+                self._needs_full_scan = True
+            else:
+                self._stale_names.add(safe_name)
+
+    def profiles(self) -> Dict[str, str]:
+        """Mappa {safe_name: display_name} dei profili validi."""
+        with self._lock:
+            self._refresh_locked()
+            return {safe_name: display_name for safe_name, (display_name, _) in self._entries.items() if display_name}
+
+    def display_names(self) -> List[str]:
+        """Nomi visualizzati unici, ordinati."""
+        with self._lock:
+            self._refresh_locked()
+            return list(self._sorted_display_names)
+
+    def find_safe_name(self, display_name: str) -> Optional[str]:
+        """safe_name del profilo con questo nome visualizzato (senza distinzione tra maiuscole e minuscole)."""
+        key = display_name.strip().casefold()
+        if not key:
+            return None
+        with self._lock:
+            self._refresh_locked()
+            return self._by_casefold.get(key)
+
+    def display_name(self, safe_name: str) -> Optional[str]:
+        with self._lock:
+            self._refresh_locked()
+            entry = self._entries.get(safe_name)
+            return entry[0] if entry else None
+
+    def _refresh_locked(self):
+        changed = False
+        dir_mtime_ns = _mtime_ns(self.profiles_dir)
+        if self._needs_full_scan or dir_mtime_ns != self._dir_mtime_ns:
+            changed |= self._scan_directory_locked()
+            self._dir_mtime_ns = dir_mtime_ns
+            self._needs_full_scan = False
+        elif self._observer is None and time.monotonic() - self._last_stat_sweep >= PROFILE_CATALOG_STAT_INTERVAL_S:
+            # Senza watcher: controlla se altri processi hanno modificato qualche settings.json.
+            self._stale_names.update(
+                safe_name for safe_name, (_, mtime_ns) in self._entries.items()
+                if _mtime_ns(self.profiles_dir / safe_name / PROFILE_SETTINGS_FILENAME) != mtime_ns
+            )
+            self._last_stat_sweep = time.monotonic()
+        for safe_name in self._stale_names:
+            if safe_name in self._entries or (self.profiles_dir / safe_name).is_dir():
+                self._entries[safe_name] = self._read_entry(safe_name)
+                changed = True
+        self._stale_names.clear()
+        if changed:
+            self._rebuild_index_locked()
+
+    def _scan_directory_locked(self) -> bool:
+        """Rilegge l'elenco delle cartelle; i settings.json invariati non vengono riletti."""
+        try:
+            folder_names = sorted(entry.name for entry in os.scandir(self.profiles_dir) if entry.is_dir())
+        except OSError:
+            folder_names = []
+        entries: Dict[str, Tuple[Optional[str], Optional[int]]] = {}
+        for safe_name in folder_names:
+            cached = self._entries.get(safe_name)
+            settings_mtime_ns = _mtime_ns(self.profiles_dir / safe_name / PROFILE_SETTINGS_FILENAME)
+            if cached is not None and cached[1] == settings_mtime_ns and safe_name not in self._stale_names:
+                entries[safe_name] = cached
+            else:
+                entries[safe_name] = self._read_entry(safe_name)
+        self._entries = entries
+        self._last_stat_sweep = time.monotonic()
+        return True
+
+    def _read_entry(self, safe_name: str) -> Tuple[Optional[str], Optional[int]]:
+        profile_path = self.profiles_dir / safe_name
+        settings_mtime_ns = _mtime_ns(profile_path / PROFILE_SETTINGS_FILENAME)
+        display_name = self.load_settings_fn(profile_path).get("display_name")
+        # Verifica minima di validità: deve avere un display_name
+        if display_name and isinstance(display_name, str) and display_name.strip():
+            return display_name.strip(), settings_mtime_ns
+        app_logger.warning(f"Cartella profilo '{safe_name}' ignorata: display_name mancante o non valido in '{PROFILE_SETTINGS_FILENAME}'.")
+        return None, settings_mtime_ns
+
+    def _rebuild_index_locked(self):
+        self._by_casefold = {}
+        for safe_name, (display_name, _) in self._entries.items():
+            if display_name:
+                # A parità di nome vince la prima cartella in ordine alfabetico
+                self._by_casefold.setdefault(display_name.casefold(), safe_name)
+        self._sorted_display_names = sorted({display_name for display_name, _ in self._entries.values() if display_name})
+        app_logger.debug(f"ProfileCatalog: {len(self._by_casefold)} profili indicizzati.")
+
+    def start_watching(self) -> bool:
+        """Attiva il watcher del filesystem (pacchetto opzionale 'watchdog'). Restituisce False se non disponibile."""
+        if not PROFILE_CATALOG_WATCHER_ENABLED or self._observer is not None:
+            return self._observer is not None
+        try:
+            from watchdog.observers import Observer
+            from watchdog.events import FileSystemEventHandler
+        except ImportError:
+            app_logger.debug("ProfileCatalog: 'watchdog' non installato, uso il controllo delle date di modifica.")
+            return False
+
+        catalog = self
+
+        class _InvalidateOnChange(FileSystemEventHandler):
+            def on_any_event(self, event):
+                catalog.invalidate()
+
+        try:
+            observer = Observer()
+            observer.daemon = True
+            observer.schedule(_InvalidateOnChange(), str(self.profiles_dir), recursive=True)
+            observer.start()
+        except Exception as e:
+            app_logger.warning(f"ProfileCatalog: Impossibile avviare il watcher su '{self.profiles_dir}': {e}")
+            return False
+        self._observer = observer
+        app_logger.info(f"ProfileCatalog: Watcher attivo su '{self.profiles_dir}'.")
+        return True
+
+    def stop_watching(self):
+        if self._observer is not None:
+            self._observer.stop()
+            self._observer = None
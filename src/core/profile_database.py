@@ -0,0 +1,237 @@
+# src/core/profile_database.py
+import json
+import sqlite3
+import time
+from pathlib import Path
+from threading import Lock
+from typing import Dict, Iterable, List, Optional
+
+from src.config import MACROS_FILENAME, VOCABULARY_FILENAME, PRONUNCIATION_RULES_FILENAME
+from src.core.persistence import serialize_json, atomic_write_text
+from src.utils.logger import app_logger
+
+# Sezioni "grandi" del profilo e relativi file JSON (layout classico, usato anche negli ZIP)
+SECTION_MACROS = "macros"
+SECTION_VOCABULARY = "vocabulary"
+SECTION_PRONUNCIATION_RULES = "pronunciation_rules"
+PROFILE_SECTION_FILES = {
+    SECTION_MACROS: MACROS_FILENAME,
+    SECTION_VOCABULARY: VOCABULARY_FILENAME,
+    SECTION_PRONUNCIATION_RULES: PRONUNCIATION_RULES_FILENAME,
+}
+# Sezioni chiave -> valore: (tabella, colonna chiave, colonna valore)
+_MAPPING_TABLES = {
+    SECTION_MACROS: ("macros", "trigger", "expansion"),
+    SECTION_PRONUNCIATION_RULES: ("pronunciation_rules", "spoken", "written"),
+}
+# Suffisso dei file JSON già importati nel database (restano come copia di sicurezza)
+MIGRATED_SUFFIX = ".migrated"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS profiles (
+    profile TEXT PRIMARY KEY,
+    created_at REAL NOT NULL,
+    source TEXT
+);
+CREATE TABLE IF NOT EXISTS macros (
+    profile TEXT NOT NULL,
+    trigger TEXT NOT NULL,
+    expansion TEXT NOT NULL,
+    PRIMARY KEY (profile, trigger)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS pronunciation_rules (
+    profile TEXT NOT NULL,
+    spoken TEXT NOT NULL,
+    written TEXT NOT NULL,
+    PRIMARY KEY (profile, spoken)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS vocabulary (
+    profile TEXT NOT NULL,
+    term TEXT NOT NULL,
+    PRIMARY KEY (profile, term)
+) WITHOUT ROWID;
+"""
+
+
+class ProfileDatabase:
+    """
+    Macro, vocabolario e regole di pronuncia dei profili in un database SQLite.
+    Ogni riga è indicizzata per (profilo, chiave): inserimenti, rimozioni e ricerche puntuali
+    non richiedono di leggere o riscrivere l'intera sezione. Lo stesso file può contenere
+    un solo profilo (database nella cartella del profilo) o tutti (database condiviso).
+
+    L'ordinamento BINARY di SQLite sulle stringhe UTF-8 coincide con sorted() di Python:
+    load_vocabulary() restituisce la stessa lista ordinata del file vocabulary.json.
+    """
+
+    def __init__(self, db_path: Path):
+        self.db_path = Path(db_path)
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        # Usato dal thread della GUI e dal worker di output (caricamento pigro delle regole)
+        self._lock = Lock()
+        self._conn = sqlite3.connect(str(self.db_path), check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        with self._conn:
+            self._conn.executescript(_SCHEMA)
+        app_logger.debug(f"ProfileDatabase: aperto '{self.db_path}'.")
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+    # --- Profili ---
+    def has_profile(self, profile: str) -> bool:
+        with self._lock:
+            return self._conn.execute("SELECT 1 FROM profiles WHERE profile = ?", (profile,)).fetchone() is not None
+
+    def register_profile(self, profile: str, source: Optional[str] = None):
+        with self._lock, self._conn:
+            self._conn.execute("INSERT OR IGNORE INTO profiles (profile, created_at, source) VALUES (?, ?, ?)",
+                               (profile, time.time(), source))
+
+    def delete_profile(self, profile: str):
+        with self._lock, self._conn:
+            for table in ("macros", "pronunciation_rules", "vocabulary", "profiles"):
+                self._conn.execute(f"DELETE FROM {table} WHERE profile = ?", (profile,))
+
+    # --- Macro e regole di pronuncia ---
+    def load_mapping(self, profile: str, section: str) -> Dict[str, str]:
+        table, key_col, value_col = _MAPPING_TABLES[section]
+        with self._lock:
+            return dict(self._conn.execute(f"SELECT {key_col}, {value_col} FROM {table} WHERE profile = ?", (profile,)))
+
+    def lookup(self, profile: str, section: str, key: str) -> Optional[str]:
+        table, key_col, value_col = _MAPPING_TABLES[section]
+        with self._lock:
+            row = self._conn.execute(f"SELECT {value_col} FROM {table} WHERE profile = ? AND {key_col} = ?",
+                                     (profile, key)).fetchone()
+        return row[0] if row else None
+
+    def upsert_items(self, profile: str, section: str, items: Dict[str, str]):
+        if not items: return
+        table, key_col, value_col = _MAPPING_TABLES[section]
+        with self._lock, self._conn:
+            self._conn.executemany(f"INSERT OR REPLACE INTO {table} (profile, {key_col}, {value_col}) VALUES (?, ?, ?)",
+                                   [(profile, key, value) for key, value in items.items()])
+
+    def delete_items(self, profile: str, section: str, keys: Iterable[str]):
+        table, key_col, _ = _MAPPING_TABLES[section]
+        with self._lock, self._conn:
+            self._conn.executemany(f"DELETE FROM {table} WHERE profile = ? AND {key_col} = ?",
+                                   [(profile, key) for key in keys])
+
+    # --- Vocabolario ---
+    def load_vocabulary(self, profile: str) -> List[str]:
+        with self._lock:
+            return [row[0] for row in self._conn.execute("SELECT term FROM vocabulary WHERE profile = ? ORDER BY term", (profile,))]
+
+    def has_term(self, profile: str, term: str) -> bool:
+        with self._lock:
+            return self._conn.execute("SELECT 1 FROM vocabulary WHERE profile = ? AND term = ?", (profile, term)).fetchone() is not None
+
+    def add_terms(self, profile: str, terms: Iterable[str]):
+        with self._lock, self._conn:
+            self._conn.executemany("INSERT OR IGNORE INTO vocabulary (profile, term) VALUES (?, ?)",
+                                   [(profile, term) for term in terms])
+
+    def remove_terms(self, profile: str, terms: Iterable[str]):
+        with self._lock, self._conn:
+            self._conn.executemany("DELETE FROM vocabulary WHERE profile = ? AND term = ?",
+                                   [(profile, term) for term in terms])
+
+    # --- Sezioni intere (migrazione, importazione, esportazione) ---
+    def load_section(self, profile: str, section: str):
+        if section == SECTION_VOCABULARY:
+            return self.load_vocabulary(profile)
+        return self.load_mapping(profile, section)
+
+    def count(self, profile: str, section: str) -> int:
+        table = "vocabulary" if section == SECTION_VOCABULARY else _MAPPING_TABLES[section][0]
+        with self._lock:
+            return self._conn.execute(f"SELECT COUNT(*) FROM {table} WHERE profile = ?", (profile,)).fetchone()[0]
+
+    def replace_profile(self, profile: str, sections: Dict[str, object], source: Optional[str] = None):
+        """Sostituisce tutte le sezioni del profilo in un'unica transazione."""
+        with self._lock, self._conn:
+            for table in ("macros", "pronunciation_rules", "vocabulary"):
+                self._conn.execute(f"DELETE FROM {table} WHERE profile = ?", (profile,))
+            for section, (table, key_col, value_col) in _MAPPING_TABLES.items():
+                self._conn.executemany(f"INSERT OR REPLACE INTO {table} (profile, {key_col}, {value_col}) VALUES (?, ?, ?)",
+                                       [(profile, str(k), str(v)) for k, v in (sections.get(section) or {}).items()])
+            self._conn.executemany("INSERT OR IGNORE INTO vocabulary (profile, term) VALUES (?, ?)",
+                                   [(profile, str(term)) for term in (sections.get(SECTION_VOCABULARY) or [])])
+            self._conn.execute("INSERT OR REPLACE INTO profiles (profile, created_at, source) VALUES (?, ?, ?)",
+                               (profile, time.time(), source))
+
+
+def _read_json_section(file_path: Path, default):
+    if not file_path.is_file():
+        return default
+    try:
+        content = file_path.read_text(encoding='utf-8').strip()
+        return json.loads(content) if content else default
+    except Exception as e:
+        app_logger.error(f"Migrazione profilo: impossibile leggere '{file_path}': {e}. Uso default.", exc_info=True)
+        return default
+
+
+def migrate_profile_from_json(database: ProfileDatabase, profile: str, profile_dir: Path) -> bool:
+    """
+    Importa una volta sola macros.json, vocabulary.json e pronunciation.json nel database.
+    I file JSON vengono rinominati con il suffisso '.migrated' (copia di sicurezza) così non vengono
+    reimportati. Restituisce False se il profilo era già nel database.
+    """
+    if database.has_profile(profile):
+        return False
+    started_at = time.monotonic()
+    sections = {
+        section: _read_json_section(profile_dir / filename, [] if section == SECTION_VOCABULARY else {})
+        for section, filename in PROFILE_SECTION_FILES.items()
+    }
+    database.replace_profile(profile, sections, source="json")
+    for filename in PROFILE_SECTION_FILES.values():
+        file_path = profile_dir / filename
+        if file_path.is_file():
+            try:
+                file_path.replace(file_path.with_name(filename + MIGRATED_SUFFIX))
+            except OSError as e:
+                app_logger.warning(f"Migrazione profilo: impossibile rinominare '{file_path}': {e}")
+    app_logger.info(f"Profilo '{profile}' migrato in SQLite: {len(sections[SECTION_MACROS])} macro, "
+                    f"{len(sections[SECTION_VOCABULARY])} termini, {len(sections[SECTION_PRONUNCIATION_RULES])} regole "
+                    f"({(time.monotonic() - started_at) * 1000:.0f} ms).")
+    return True
+
+
+def export_profile_to_json(database: ProfileDatabase, profile: str, target_dir: Path):
+    """Scrive le sezioni del profilo nel layout JSON classico (per gli archivi ZIP)."""
+    for section, filename in PROFILE_SECTION_FILES.items():
+        atomic_write_text(Path(target_dir) / filename, serialize_json(database.load_section(profile, section)))
+
+
+if __name__ == '__main__':
+    import shutil
+    import tempfile
+
+    app_logger.info("Avvio test ProfileDatabase...")
+    test_dir = Path(tempfile.mkdtemp(prefix="test_profile_db_"))
+    try:
+        profile_dir = test_dir / "medico"
+        profile_dir.mkdir()
+        (profile_dir / MACROS_FILENAME).write_text(json.dumps({"firma": "Dott. Rossi"}), encoding='utf-8')
+        (profile_dir / VOCABULARY_FILENAME).write_text(json.dumps(["Zeta", "anamnesi", "ECG"]), encoding='utf-8')
+
+        db = ProfileDatabase(profile_dir / "profile.sqlite3")
+        print(f"Migrazione: {migrate_profile_from_json(db, 'medico', profile_dir)}, ripetuta: {migrate_profile_from_json(db, 'medico', profile_dir)}")
+        print(f"Vocabolario: {db.load_vocabulary('medico')} (atteso {sorted(['Zeta', 'anamnesi', 'ECG'])})")
+        db.add_terms("medico", ["bradicardia"]); db.remove_terms("medico", ["Zeta"])
+        db.upsert_items("medico", SECTION_PRONUNCIATION_RULES, {"elle": "L"})
+        print(f"has_term('bradicardia'): {db.has_term('medico', 'bradicardia')}, lookup('elle'): {db.lookup('medico', SECTION_PRONUNCIATION_RULES, 'elle')}")
+        export_dir = test_dir / "export"
+        export_profile_to_json(db, "medico", export_dir)
+        print(f"Esportati: {sorted(p.name for p in export_dir.iterdir())}")
+        print(f"vocabulary.json esportato: {json.loads((export_dir / VOCABULARY_FILENAME).read_text(encoding='utf-8'))}")
+        db.close()
+    finally:
+        shutil.rmtree(test_dir, ignore_errors=True)
+    app_logger.info("Test ProfileDatabase completato.")
@@ -0,0 +1,57 @@
+# src/core/profile_events.py
+from typing import Any, FrozenSet, Iterable, Optional
+
+# Tipi di modifica notificati da ProfileManager.subscribe()
+CHANGE_PROFILE = "profile"            # Profilo caricato, cambiato o scaricato (implica tutte le altre)
+CHANGE_DISPLAY_NAME = "display_name"
+CHANGE_MODEL = "model"                # Modello, motore di inferenza o opzioni che richiedono di ricaricarlo
+CHANGE_LANGUAGE = "language"
+CHANGE_AUDIO = "audio"                # Opzioni della catena audio (VAD, backpressure, registrazione di debug)
+CHANGE_OUTPUT = "output"              # Destinazione e modalità dell'output
+CHANGE_RULES = "rules"                # Macro e regole di pronuncia
+CHANGE_VOCABULARY = "vocabulary"
+CHANGE_AUDIO_DEVICE = "audio_device"  # Preferenza globale del dispositivo di ingresso
+CHANGE_SETTINGS = "settings"          # Altre impostazioni del profilo
+
+# Impostazione del profilo -> tipo di modifica
+SETTING_CHANGE_KINDS = {
+    "display_name": CHANGE_DISPLAY_NAME,
+    "whisper_model": CHANGE_MODEL,
+    "inference_backend": CHANGE_MODEL,
+    "whisper_quantization": CHANGE_MODEL,
+    "short_utterance_mode": CHANGE_MODEL,
+    "language": CHANGE_LANGUAGE,
+    "vad_engine": CHANGE_AUDIO,
+    "backpressure_policy": CHANGE_AUDIO,
+    "enable_audio_debug_recording": CHANGE_AUDIO,
+    "output_to_internal_editor": CHANGE_OUTPUT,
+    "external_output_mode": CHANGE_OUTPUT,
+}
+# Preferenza globale -> tipo di modifica
+GLOBAL_PREFERENCE_CHANGE_KINDS = {
+    "selected_audio_device_id": CHANGE_AUDIO_DEVICE,
+}
+
+
+class ProfileChangeEvent:
+    """
+    Descrive una modifica (o un gruppo di modifiche fatte con batch_update) del profilo.
+    kinds contiene i tipi CHANGE_*, keys le impostazioni o preferenze modificate;
+    snapshot è la versione del profilo pubblicata con la modifica.
+    """
+    __slots__ = ("kinds", "keys", "snapshot")
+
+    def __init__(self, kinds: Iterable[str], keys: Iterable[str], snapshot: Any):
+        self.kinds: FrozenSet[str] = frozenset(kinds)
+        self.keys: FrozenSet[str] = frozenset(keys)
+        self.snapshot = snapshot
+
+    def __contains__(self, kind: str) -> bool:
+        # Un cambio di profilo vale come modifica di tutto
+        return kind in self.kinds or CHANGE_PROFILE in self.kinds
+
+    def affects(self, kinds: Optional[Iterable[str]]) -> bool:
+        return kinds is None or any(kind in self for kind in kinds)
+
+    def __repr__(self) -> str:
+        return f"ProfileChangeEvent({sorted(self.kinds)}, chiavi={sorted(self.keys)})"
@@ -1,21 +1,47 @@
 # src/core/profile_manager.py
+import bisect
 import json
 import os
 import shutil
+import tempfile
+from contextlib import contextmanager
 from pathlib import Path
-from typing import List, Dict, Optional, Any, Tuple
+from threading import Lock
+from typing import List, Dict, Optional, Any, Tuple, Callable, Iterable, FrozenSet, Iterator
 
 from src.config import (
     PROFILES_DIR, APP_PREFERENCES_FILE, LOG_LEVEL,
     MACROS_FILENAME, VOCABULARY_FILENAME, PRONUNCIATION_RULES_FILENAME, PROFILE_SETTINGS_FILENAME,
-    DEFAULT_WHISPER_MODEL, DEFAULT_LANGUAGE, INTERNAL_EDITOR_ENABLED_DEFAULT
+    DEFAULT_WHISPER_MODEL, DEFAULT_LANGUAGE, INTERNAL_EDITOR_ENABLED_DEFAULT, DEFAULT_VAD_ENGINE,
+    DEFAULT_BACKPRESSURE_POLICY, DEFAULT_SHORT_UTTERANCE_MODE, DEFAULT_INFERENCE_BACKEND,
+    DEFAULT_WHISPER_QUANTIZATION, DEFAULT_EXTERNAL_OUTPUT_MODE,
+    PROFILE_STORAGE_ENGINE, AVAILABLE_PROFILE_STORAGE_ENGINES, PROFILE_SQLITE_SHARED,
+    PROFILE_DB_FILENAME, PROFILES_SHARED_DB_FILENAME
 )
 from src.utils.logger import app_logger
+from src.core.profile_catalog import ProfileCatalog
+from src.core.persistence import WriteBehindStore
+from src.core.profile_snapshot import ProfileSnapshot
+from src.core.profile_events import (
+    ProfileChangeEvent, CHANGE_PROFILE, CHANGE_RULES, CHANGE_VOCABULARY, CHANGE_SETTINGS,
+    SETTING_CHANGE_KINDS, GLOBAL_PREFERENCE_CHANGE_KINDS
+)
+from src.core.profile_database import (
+    ProfileDatabase, PROFILE_SECTION_FILES, SECTION_MACROS, SECTION_VOCABULARY, SECTION_PRONUNCIATION_RULES,
+    migrate_profile_from_json, export_profile_to_json
+)
 
 class ProfileManager:
-    def __init__(self):
-        self.profiles_dir: Path = PROFILES_DIR
-        self.app_prefs_file: Path = APP_PREFERENCES_FILE
+    def __init__(self, profiles_dir: Optional[Path] = None, app_prefs_file: Optional[Path] = None,
+                 storage_engine: Optional[str] = None):
+        self.profiles_dir: Path = profiles_dir or PROFILES_DIR
+        self.app_prefs_file: Path = app_prefs_file or APP_PREFERENCES_FILE
+        self.storage_engine: str = storage_engine or PROFILE_STORAGE_ENGINE
+        if self.storage_engine not in AVAILABLE_PROFILE_STORAGE_ENGINES:
+            app_logger.warning(f"Motore di archiviazione profili '{self.storage_engine}' non valido. Uso 'json'.")
+            self.storage_engine = "json"
+        # Database SQLite aperti (per percorso), usati solo con storage_engine == "sqlite"
+        self._databases: Dict[Path, ProfileDatabase] = {}
 
         if not self.app_prefs_file.parent.exists():
             app_logger.warning(f"La directory base delle preferenze {self.app_prefs_file.parent} non esiste. Tentativo di crearla.")
@@ -31,34 +57,101 @@ class ProfileManager:
             except OSError as e:
                 app_logger.error(f"Impossibile creare la directory dei profili: {e}", exc_info=True)
 
+        # Le scritture dei file JSON sono differite e atomiche (vedi WriteBehindStore):
+        # i salvataggi non fanno I/O sul thread chiamante.
+        self.store = WriteBehindStore()
+
+        # Indice dei profili: evita di rileggere tutti i settings.json a ogni richiesta.
+        self.profile_catalog = ProfileCatalog(
+            self.profiles_dir, lambda profile_path: self._load_profile_file(profile_path, PROFILE_SETTINGS_FILENAME, {})
+        )
+        self.profile_catalog.start_watching()
+
         self.current_profile_safe_name: Optional[str] = None
         self.current_profile_data: Dict[str, Any] = {}
+        # Incrementato a ogni modifica di macro o regole di pronuncia (e a ogni cambio di profilo):
+        # le regole compilate (ProfileSnapshot) vengono ricostruite solo quando cambia.
+        self.rules_revision: int = 0
+        # Vista immutabile del profilo per gli altri thread (vedi ProfileSnapshot e snapshot)
+        self._snapshot: ProfileSnapshot = ProfileSnapshot.empty()
+        self._snapshot_lock = Lock() # Serializza solo le pubblicazioni; i lettori non lo usano
+        # Notifiche di modifica (vedi subscribe e batch_update)
+        self._subscribers: List[Tuple[Callable[[ProfileChangeEvent], None], Optional[FrozenSet[str]]]] = []
+        self._batch_depth = 0
+        self._batch_kinds: set = set()
+        self._batch_keys: set = set()
         self.global_app_preferences: Dict[str, Any] = {}
         self._load_app_preferences()
 
-    # --- INIZIO CORREZIONE: Aggiunta di _get_available_profiles_internal ---
+    @property
+    def snapshot(self) -> ProfileSnapshot:
+        """
+        Versione corrente (immutabile) del profilo attivo. La lettura è un singolo accesso
+        all'attributo: i thread audio e di elaborazione la usano senza lock.
+        """
+        return self._snapshot
+
+    def _publish_snapshot(self):
+        """Pubblica una nuova versione del profilo dopo una modifica (chiamato dal thread che modifica)."""
+        with self._snapshot_lock:
+            if not self.current_profile_safe_name or not self.current_profile_data:
+                self._snapshot = ProfileSnapshot.empty()
+            else:
+                self._snapshot = ProfileSnapshot(
+                    self.current_profile_safe_name, self.current_profile_data.get("settings", {}),
+                    self._section(SECTION_MACROS), self._section(SECTION_PRONUNCIATION_RULES),
+                    self.rules_revision, previous=self._snapshot
+                )
+            app_logger.debug(f"ProfileManager: pubblicata {self._snapshot}.")
+
+    def subscribe(self, callback: Callable[[ProfileChangeEvent], None], kinds: Optional[Iterable[str]] = None):
+        """
+        Registra callback per le modifiche al profilo. kinds limita la notifica ai tipi CHANGE_*
+        indicati (None = tutte). Il callback viene chiamato nel thread che ha fatto la modifica,
+        dopo la pubblicazione del nuovo snapshot.
+        """
+        self._subscribers.append((callback, frozenset(kinds) if kinds is not None else None))
+
+    def unsubscribe(self, callback: Callable[[ProfileChangeEvent], None]):
+        self._subscribers = [(cb, kinds) for cb, kinds in self._subscribers if cb != callback]
+
+    @contextmanager
+    def batch_update(self) -> Iterator["ProfileManager"]:
+        """
+        Raggruppa più modifiche (es. il salvataggio del dialogo impostazioni):
+        un solo snapshot pubblicato e una sola notifica alla fine del blocco.
+        """
+        self._batch_depth += 1
+        try:
+            yield self
+        finally:
+            self._batch_depth -= 1
+            if self._batch_depth == 0 and self._batch_kinds:
+                kinds, keys = set(self._batch_kinds), set(self._batch_keys)
+                self._batch_kinds.clear(); self._batch_keys.clear()
+                self._changed(kinds, keys)
+
+    def _changed(self, kinds: Iterable[str], keys: Iterable[str] = ()):
+        """Pubblica un nuovo snapshot e notifica gli iscritti (a fine blocco se dentro batch_update)."""
+        if self._batch_depth:
+            self._batch_kinds.update(kinds); self._batch_keys.update(keys)
+            return
+        self._publish_snapshot()
+        event = ProfileChangeEvent(kinds, keys, self._snapshot)
+        app_logger.debug(f"ProfileManager: {event}.")
+        for callback, subscribed_kinds in list(self._subscribers):
+            if event.affects(subscribed_kinds):
+                try:
+                    callback(event)
+                except Exception as e:
+                    app_logger.error(f"ProfileManager: errore nel gestore di modifica {callback}: {e}", exc_info=True)
+
     def _get_available_profiles_internal(self) -> Dict[str, str]:
         """
-        Scansiona la directory dei profili e restituisce una mappa {safe_name: display_name}.
+        Restituisce una mappa {safe_name: display_name} dei profili validi (dal catalogo in memoria).
         Questo è un metodo helper interno. Per l'uso esterno, get_available_profiles() restituisce List[str].
         """
-        profiles_map: Dict[str, str] = {}
-        if self.profiles_dir.exists() and self.profiles_dir.is_dir():
-            for item_path in self.profiles_dir.iterdir():
-                if item_path.is_dir():  # Ogni sottocartella è un potenziale profilo
-                    # Leggi il display_name dal file settings.json del profilo
-                    settings_data = self._load_profile_file(item_path, PROFILE_SETTINGS_FILENAME, {})
-                    display_name = settings_data.get("display_name")
-                    
-                    # Verifica minima di validità: deve avere un display_name
-                    if display_name and isinstance(display_name, str) and display_name.strip():
-                        profiles_map[item_path.name] = display_name.strip() # item_path.name è il safe_name (nome cartella)
-                    else:
-                        app_logger.warning(
-                            f"Cartella profilo '{item_path.name}' ignorata: display_name mancante o non valido in '{PROFILE_SETTINGS_FILENAME}'.")
-        app_logger.debug(f"_get_available_profiles_internal trovati: {profiles_map}")
-        return profiles_map
-    # --- FINE CORREZIONE ---
+        return self.profile_catalog.profiles()
 
     def _load_app_preferences(self):
         default_prefs = {
@@ -85,9 +178,8 @@ class ProfileManager:
         last_profile_safe_name = self.global_app_preferences.get("last_used_profile_safe_name")
         if last_profile_safe_name:
             app_logger.info(f"Tentativo di caricare l'ultimo profilo usato (safe_name): {last_profile_safe_name}")
-            # Usa _get_available_profiles_internal per ottenere il display_name
-            available_profiles_map = self._get_available_profiles_internal() # CORRETTO: ora esiste
-            display_name_to_load = available_profiles_map.get(last_profile_safe_name)
+            # Il catalogo fornisce il display_name senza rileggere i settings di tutti i profili
+            display_name_to_load = self.profile_catalog.display_name(last_profile_safe_name)
 
             if display_name_to_load:
                 if self.load_profile(display_name_to_load): # load_profile usa display_name
@@ -107,14 +199,12 @@ class ProfileManager:
             app_logger.error("Percorso file preferenze app non definito. Impossibile salvare.")
             return False
         try:
-            self.app_prefs_file.parent.mkdir(parents=True, exist_ok=True)
             if self.current_profile_safe_name:
                 self.global_app_preferences["last_used_profile_safe_name"] = self.current_profile_safe_name
             else:
                 self.global_app_preferences["last_used_profile_safe_name"] = None
-            with open(self.app_prefs_file, 'w', encoding='utf-8') as f:
-                json.dump(self.global_app_preferences, f, indent=4, ensure_ascii=False)
-            app_logger.info(f"Preferenze app salvate in {self.app_prefs_file}")
+            if self.store.schedule(self.app_prefs_file, self.global_app_preferences):
+                app_logger.debug(f"Preferenze app da salvare in {self.app_prefs_file}")
             return True
         except Exception as e:
             app_logger.error(f"Errore salvataggio preferenze app in {self.app_prefs_file}: {e}", exc_info=True)
@@ -124,8 +214,15 @@ class ProfileManager:
         return self.global_app_preferences.get(key, default)
 
     def save_global_preference(self, key: str, value: Any):
+        changed = self.global_app_preferences.get(key) != value
         self.global_app_preferences[key] = value
         self._save_app_preferences()
+        if changed and key in GLOBAL_PREFERENCE_CHANGE_KINDS:
+            self._changed({GLOBAL_PREFERENCE_CHANGE_KINDS[key]}, {key})
+
+    def flush_pending_writes(self) -> bool:
+        """Scrive subito su disco i file modificati e non ancora salvati (es. in chiusura o prima di un export)."""
+        return self.store.flush()
 
     def _sanitize_profile_name_for_folder(self, display_name: str) -> str:
         name = display_name.strip()
@@ -147,6 +244,9 @@ class ProfileManager:
             elif filename in [PROFILE_SETTINGS_FILENAME, MACROS_FILENAME, PRONUNCIATION_RULES_FILENAME]: actual_default = {}
             else: actual_default = {} 
         
+        pending_content = self.store.pending_content(file_path)
+        if pending_content is not None: # Modifica non ancora scritta su disco
+            return json.loads(pending_content)
         if file_path.exists() and file_path.is_file():
             try:
                 with open(file_path, 'r', encoding='utf-8') as f:
@@ -154,7 +254,9 @@ class ProfileManager:
                     if not content:
                         app_logger.warning(f"File profilo '{file_path}' è vuoto. Uso default: {actual_default}.")
                         return actual_default
-                    return json.loads(content)
+                    data = json.loads(content)
+                    self.store.note_persisted(file_path, content) # Salvare gli stessi dati non riscriverà il file
+                    return data
             except json.JSONDecodeError:
                 app_logger.error(f"Errore decodifica JSON per '{file_path}'. Uso default: {actual_default}.", exc_info=True)
                 return actual_default
@@ -175,36 +277,132 @@ class ProfileManager:
         
         file_path = profile_dir_path / filename
         try:
-            with open(file_path, 'w', encoding='utf-8') as f:
-                json.dump(data, f, indent=4, ensure_ascii=False)
-            app_logger.debug(f"File '{filename}' salvato per profilo '{profile_dir_path.name}'.")
+            if not self.store.schedule(file_path, data):
+                return True # Contenuto invariato: nessuna scrittura
+            if filename == PROFILE_SETTINGS_FILENAME:
+                self.profile_catalog.invalidate(profile_dir_path.name) # Il display_name potrebbe essere cambiato
+            app_logger.debug(f"File '{filename}' da salvare per profilo '{profile_dir_path.name}'.")
             return True
         except Exception as e:
             app_logger.error(f"Errore salvataggio file profilo '{file_path}': {e}", exc_info=True)
             return False
 
     def _get_display_name_from_safe_name(self, safe_name: str) -> Optional[str]:
-        # Questo metodo ora usa _get_available_profiles_internal per coerenza
-        profiles_map = self._get_available_profiles_internal()
-        return profiles_map.get(safe_name)
+        return self.profile_catalog.display_name(safe_name)
+
+    # --- Sezioni del profilo (macro, vocabolario, regole di pronuncia) ---
+    def _uses_database(self) -> bool:
+        return self.storage_engine == "sqlite"
+
+    def _get_database(self, safe_name: str) -> ProfileDatabase:
+        if PROFILE_SQLITE_SHARED:
+            db_path = self.profiles_dir.parent / PROFILES_SHARED_DB_FILENAME
+        else:
+            db_path = self._get_profile_path_from_safe_name(safe_name) / PROFILE_DB_FILENAME
+        database = self._databases.get(db_path)
+        if database is None:
+            database = self._databases[db_path] = ProfileDatabase(db_path)
+        return database
+
+    def _close_database(self, safe_name: str):
+        """Chiude il database nella cartella del profilo (prima di eliminarla)."""
+        db_path = self._get_profile_path_from_safe_name(safe_name) / PROFILE_DB_FILENAME
+        database = self._databases.pop(db_path, None)
+        if database is not None:
+            database.close()
+
+    def _read_section(self, safe_name: str, section: str) -> Any:
+        """Legge una sezione dall'archivio del profilo (database o file JSON)."""
+        if self._uses_database():
+            return self._get_database(safe_name).load_section(safe_name, section)
+        return self._load_profile_file(self._get_profile_path_from_safe_name(safe_name), PROFILE_SECTION_FILES[section])
+
+    def _section(self, section: str) -> Any:
+        """
+        Sezione del profilo corrente, letta al primo accesso: caricare un profilo legge solo
+        settings.json, e un vocabolario grande non viene letto finché qualcuno non lo usa.
+        """
+        if not self.current_profile_data or not self.current_profile_safe_name:
+            return [] if section == SECTION_VOCABULARY else {}
+        data = self.current_profile_data.get(section)
+        if data is None:
+            data = self._read_section(self.current_profile_safe_name, section)
+            self.current_profile_data[section] = data
+        return data
+
+    def _store_mapping_changes(self, section: str, upserts: Dict[str, str], deletes: List[str]):
+        """Con SQLite le modifiche a macro e regole vengono scritte subito, una riga per voce."""
+        if not self._uses_database(): return # Con JSON la sezione viene salvata da save_current_profile_data
+        database = self._get_database(self.current_profile_safe_name)
+        if deletes: database.delete_items(self.current_profile_safe_name, section, deletes)
+        if upserts: database.upsert_items(self.current_profile_safe_name, section, upserts)
+
+    def _update_mapping(self, section: str, new_items: Dict[str, str]):
+        normalized = {k.strip().lower(): v for k, v in new_items.items() if k.strip()}
+        current = self._section(section)
+        if normalized == current: return # Nessuna ricompilazione se le regole non cambiano
+        self._store_mapping_changes(section,
+                                    {k: v for k, v in normalized.items() if current.get(k) != v},
+                                    [k for k in current if k not in normalized])
+        self.current_profile_data[section] = normalized
+        self.rules_revision += 1
+        self._changed({CHANGE_RULES}, {section})
+
+    def _set_mapping_item(self, section: str, key: str, value: str):
+        current = self._section(section)
+        if current.get(key) == value: return
+        current[key] = value
+        self._store_mapping_changes(section, {key: value}, [])
+        self.rules_revision += 1
+        self._changed({CHANGE_RULES}, {section})
+
+    def _remove_mapping_item(self, section: str, key: str):
+        current = self._section(section)
+        if key in current:
+            del current[key]
+            self._store_mapping_changes(section, {}, [key])
+            self.rules_revision += 1
+            self._changed({CHANGE_RULES}, {section})
+
+    def import_profile_sections(self, safe_name: str):
+        """Dopo l'importazione di uno ZIP (layout JSON): con SQLite porta subito le sezioni nel database."""
+        if not self._uses_database(): return
+        database = self._get_database(safe_name)
+        database.delete_profile(safe_name) # Eventuali righe residue con lo stesso nome (database condiviso)
+        migrate_profile_from_json(database, safe_name, self._get_profile_path_from_safe_name(safe_name))
+
+    def export_profile_archive(self, display_name: str, archive_base_name: Path) -> str:
+        """
+        Crea lo ZIP del profilo nel layout JSON classico (anche con SQLite): l'archivio si importa
+        con entrambi i motori. Restituisce il percorso del file ZIP creato.
+        """
+        safe_name = self.profile_catalog.find_safe_name(display_name)
+        if not safe_name:
+            raise FileNotFoundError(f"Profilo '{display_name}' non trovato.")
+        profile_path = self._get_profile_path_from_safe_name(safe_name)
+        self.flush_pending_writes() # L'archivio deve contenere le ultime modifiche
+        with tempfile.TemporaryDirectory(prefix="export_profilo_") as temp_dir:
+            staging_path = Path(temp_dir) / safe_name
+            staging_path.mkdir()
+            shutil.copy2(profile_path / PROFILE_SETTINGS_FILENAME, staging_path / PROFILE_SETTINGS_FILENAME)
+            if self._uses_database():
+                export_profile_to_json(self._get_database(safe_name), safe_name, staging_path)
+            else:
+                for filename in PROFILE_SECTION_FILES.values():
+                    if (profile_path / filename).is_file():
+                        shutil.copy2(profile_path / filename, staging_path / filename)
+            # root_dir è la directory temporanea, base_dir la cartella del profilo al suo interno.
+            return shutil.make_archive(str(archive_base_name), 'zip', root_dir=temp_dir, base_dir=safe_name)
 
 
     def get_available_profiles(self) -> List[str]:
         """Restituisce una lista ordinata di nomi visualizzati unici dei profili validi."""
-        profiles_map = self._get_available_profiles_internal() # Usa il metodo helper
-        unique_display_names = sorted(list(set(profiles_map.values())))
+        unique_display_names = self.profile_catalog.display_names()
         app_logger.debug(f"Profili disponibili (display names): {unique_display_names}")
         return unique_display_names
 
     def profile_display_name_exists(self, display_name: str) -> bool:
-        normalized_display_name = display_name.strip().lower()
-        if not normalized_display_name: return False
-        # _get_available_profiles_internal() restituisce {safe_name: display_name}
-        # Dobbiamo controllare i valori (display_name)
-        for existing_display_name in self._get_available_profiles_internal().values():
-            if existing_display_name.lower() == normalized_display_name:
-                return True
-        return False
+        return self.profile_catalog.find_safe_name(display_name) is not None
 
     def create_profile(self, display_name: str) -> Tuple[bool, Optional[str]]:
         display_name = display_name.strip()
@@ -227,18 +425,31 @@ class ProfileManager:
                 "display_name": display_name,
                 "whisper_model": DEFAULT_WHISPER_MODEL, "language": DEFAULT_LANGUAGE,
                 "output_to_internal_editor": INTERNAL_EDITOR_ENABLED_DEFAULT,
-                "enable_audio_debug_recording": False
+                "external_output_mode": DEFAULT_EXTERNAL_OUTPUT_MODE,
+                "enable_audio_debug_recording": False,
+                "vad_engine": DEFAULT_VAD_ENGINE,
+                "backpressure_policy": DEFAULT_BACKPRESSURE_POLICY,
+                "short_utterance_mode": DEFAULT_SHORT_UTTERANCE_MODE,
+                "inference_backend": DEFAULT_INFERENCE_BACKEND,
+                "whisper_quantization": DEFAULT_WHISPER_QUANTIZATION
             }
             success = True
             success &= self._save_profile_file(profile_path, PROFILE_SETTINGS_FILENAME, default_settings)
-            success &= self._save_profile_file(profile_path, MACROS_FILENAME, {})
-            success &= self._save_profile_file(profile_path, VOCABULARY_FILENAME, [])
-            success &= self._save_profile_file(profile_path, PRONUNCIATION_RULES_FILENAME, {})
+            if self._uses_database():
+                self._get_database(safe_folder_name).register_profile(safe_folder_name, source="new")
+            else:
+                success &= self._save_profile_file(profile_path, MACROS_FILENAME, {})
+                success &= self._save_profile_file(profile_path, VOCABULARY_FILENAME, [])
+                success &= self._save_profile_file(profile_path, PRONUNCIATION_RULES_FILENAME, {})
+            success &= self.flush_pending_writes() # Un profilo nuovo va su disco subito e per intero
             if not success: raise OSError("Fallimento salvataggio uno o più file del profilo.")
             app_logger.info(f"Profilo '{display_name}' (cartella: {safe_folder_name}) creato."); return True, None
         except Exception as e:
             error_msg = f"Errore creazione profilo '{display_name}': {e}"
             app_logger.error(error_msg, exc_info=True)
+            if self._uses_database():
+                try: self._get_database(safe_folder_name).delete_profile(safe_folder_name); self._close_database(safe_folder_name)
+                except Exception as e_db: app_logger.error(f"Errore pulizia database profilo '{safe_folder_name}': {e_db}", exc_info=True)
             if profile_path.exists():
                 try: shutil.rmtree(profile_path); app_logger.info(f"Pulita cartella profilo '{profile_path}'.")
                 except Exception as e_del: app_logger.error(f"Errore pulizia cartella '{profile_path}': {e_del}", exc_info=True)
@@ -249,15 +460,9 @@ class ProfileManager:
         if not display_name: app_logger.warning("Tentativo caricamento profilo con nome vuoto."); return False
 
         actual_profile_path_to_load = None
-        actual_safe_name_to_load = None
-        
-        # CORRETTO: Usa _get_available_profiles_internal
-        available_profiles_map = self._get_available_profiles_internal()
-        for s_name, d_name_from_file in available_profiles_map.items():
-            if d_name_from_file.lower() == display_name.lower():
-                actual_profile_path_to_load = self._get_profile_path_from_safe_name(s_name)
-                actual_safe_name_to_load = s_name
-                break
+        actual_safe_name_to_load = self.profile_catalog.find_safe_name(display_name)
+        if actual_safe_name_to_load:
+            actual_profile_path_to_load = self._get_profile_path_from_safe_name(actual_safe_name_to_load)
         
         if not (actual_profile_path_to_load and actual_profile_path_to_load.exists() and actual_profile_path_to_load.is_dir()):
             app_logger.error(f"Profilo con nome visualizzato '{display_name}' non trovato o cartella non valida.")
@@ -269,21 +474,29 @@ class ProfileManager:
             settings.setdefault("whisper_model", DEFAULT_WHISPER_MODEL)
             settings.setdefault("language", DEFAULT_LANGUAGE)
             settings.setdefault("output_to_internal_editor", INTERNAL_EDITOR_ENABLED_DEFAULT)
+            settings.setdefault("external_output_mode", DEFAULT_EXTERNAL_OUTPUT_MODE)
             settings.setdefault("enable_audio_debug_recording", False)
-
-            self.current_profile_data = {
-                "settings": settings,
-                "macros": self._load_profile_file(actual_profile_path_to_load, MACROS_FILENAME, {}),
-                "vocabulary": self._load_profile_file(actual_profile_path_to_load, VOCABULARY_FILENAME, []),
-                "pronunciation_rules": self._load_profile_file(actual_profile_path_to_load, PRONUNCIATION_RULES_FILENAME, {})
-            }
+            settings.setdefault("vad_engine", DEFAULT_VAD_ENGINE)
+            settings.setdefault("backpressure_policy", DEFAULT_BACKPRESSURE_POLICY)
+            settings.setdefault("short_utterance_mode", DEFAULT_SHORT_UTTERANCE_MODE)
+            settings.setdefault("inference_backend", DEFAULT_INFERENCE_BACKEND)
+            settings.setdefault("whisper_quantization", DEFAULT_WHISPER_QUANTIZATION)
+
+            if self._uses_database():
+                # Migrazione una tantum dal layout JSON (profili esistenti o importati da ZIP)
+                migrate_profile_from_json(self._get_database(actual_safe_name_to_load), actual_safe_name_to_load, actual_profile_path_to_load)
+            # Macro, vocabolario e regole vengono letti al primo accesso (vedi _section)
+            self.current_profile_data = {"settings": settings}
             self.current_profile_safe_name = actual_safe_name_to_load
+            self.rules_revision += 1
+            self._changed({CHANGE_PROFILE})
             app_logger.info(f"Profilo '{settings['display_name']}' (cartella: {self.current_profile_safe_name}) caricato.")
             self.save_global_preference("last_used_profile_safe_name", self.current_profile_safe_name)
             return True
         except Exception as e:
             app_logger.error(f"Errore caricamento dati profilo '{display_name}': {e}", exc_info=True)
             self.current_profile_safe_name = None; self.current_profile_data = {}
+            self._changed({CHANGE_PROFILE})
             return False
 
     def get_current_profile_display_name(self) -> Optional[str]:
@@ -296,12 +509,7 @@ class ProfileManager:
         if not display_name_to_delete:
             msg = "Nome profilo da eliminare non può essere vuoto."; app_logger.warning(msg); return False, msg
 
-        safe_name_to_delete = None
-        # CORRETTO: Usa _get_available_profiles_internal
-        profiles_map = self._get_available_profiles_internal()
-        for s_name, d_name in profiles_map.items():
-            if d_name.lower() == display_name_to_delete.lower():
-                safe_name_to_delete = s_name; break
+        safe_name_to_delete = self.profile_catalog.find_safe_name(display_name_to_delete)
         
         if not safe_name_to_delete:
             msg = f"Profilo '{display_name_to_delete}' non trovato per eliminazione."; app_logger.warning(msg); return False, msg
@@ -309,10 +517,16 @@ class ProfileManager:
         profile_path_to_delete = self._get_profile_path_from_safe_name(safe_name_to_delete)
         try:
             if profile_path_to_delete.exists():
+                self.store.discard(profile_path_to_delete) # Le scritture in attesa ricreerebbero la cartella
+                if self._uses_database():
+                    self._get_database(safe_name_to_delete).delete_profile(safe_name_to_delete)
+                    self._close_database(safe_name_to_delete) # Il file del database va chiuso prima di rimuovere la cartella
                 shutil.rmtree(profile_path_to_delete)
+                self.profile_catalog.invalidate()
                 app_logger.info(f"Profilo '{display_name_to_delete}' (cartella: {safe_name_to_delete}) eliminato.")
                 if self.current_profile_safe_name == safe_name_to_delete:
                     self.current_profile_safe_name = None; self.current_profile_data = {}
+                    self._changed({CHANGE_PROFILE})
                     self.save_global_preference("last_used_profile_safe_name", None)
                 return True, None
             else:
@@ -332,9 +546,10 @@ class ProfileManager:
             self.current_profile_data["settings"]["display_name"] = display_name
             success = True
             success &= self._save_profile_file(profile_path, PROFILE_SETTINGS_FILENAME, self.current_profile_data.get("settings", {}))
-            success &= self._save_profile_file(profile_path, MACROS_FILENAME, self.get_macros())
-            success &= self._save_profile_file(profile_path, VOCABULARY_FILENAME, self.get_vocabulary())
-            success &= self._save_profile_file(profile_path, PRONUNCIATION_RULES_FILENAME, self.get_pronunciation_rules())
+            if not self._uses_database(): # Con SQLite le sezioni sono già state scritte a ogni modifica
+                for section, filename in PROFILE_SECTION_FILES.items():
+                    if section in self.current_profile_data: # Sezioni mai lette: invariate su disco
+                        success &= self._save_profile_file(profile_path, filename, self.current_profile_data[section])
             if success: app_logger.info(f"Dati profilo '{display_name}' salvati."); return True
             else: app_logger.error(f"Fallimento salvataggio uno o più file per profilo '{display_name}'."); return False
         except Exception as e:
@@ -347,57 +562,88 @@ class ProfileManager:
     def set_profile_setting(self, key: str, value: Any):
         if not self.current_profile_data: app_logger.warning("Set setting: nessun profilo caricato."); return
         if "settings" not in self.current_profile_data: self.current_profile_data["settings"] = {}
+        if key in self.current_profile_data["settings"] and self.current_profile_data["settings"][key] == value:
+            return # Invariata: nessuno snapshot né notifica
         self.current_profile_data["settings"][key] = value
+        self._changed({SETTING_CHANGE_KINDS.get(key, CHANGE_SETTINGS)}, {key})
 
     def get_macros(self) -> Dict[str, str]:
-        if not self.current_profile_data: return {}
-        return self.current_profile_data.get("macros", {})
+        return self._section(SECTION_MACROS)
 
     def update_macros(self, new_macros: Dict[str, str]):
         if not self.current_profile_data: app_logger.warning("Update macros: nessun profilo caricato."); return
-        self.current_profile_data["macros"] = {k.strip().lower(): v for k, v in new_macros.items() if k.strip()}
+        self._update_mapping(SECTION_MACROS, new_macros)
 
     def get_vocabulary(self) -> List[str]:
-        if not self.current_profile_data: return []
-        return self.current_profile_data.get("vocabulary", [])
+        return self._section(SECTION_VOCABULARY)
 
     def update_vocabulary(self, new_vocab_list: List[str]):
         if not self.current_profile_data: app_logger.warning("Update vocabulary: nessun profilo caricato."); return
-        self.current_profile_data["vocabulary"] = sorted(list(set(word.strip() for word in new_vocab_list if word.strip())))
+        new_terms = set(word.strip() for word in new_vocab_list if word.strip())
+        current_terms = set(self._section(SECTION_VOCABULARY))
+        if new_terms == current_terms: return # Nessun riordino né scrittura se il vocabolario non cambia
+        if self._uses_database():
+            database = self._get_database(self.current_profile_safe_name)
+            database.remove_terms(self.current_profile_safe_name, current_terms - new_terms)
+            database.add_terms(self.current_profile_safe_name, new_terms - current_terms)
+        self.current_profile_data[SECTION_VOCABULARY] = sorted(new_terms)
+        self._changed({CHANGE_VOCABULARY}, {SECTION_VOCABULARY})
+
+    def add_vocabulary_terms(self, terms: List[str]):
+        """Aggiunge termini mantenendo la lista ordinata, senza riordinare l'intero vocabolario."""
+        if not self.current_profile_safe_name: return
+        vocabulary = self._section(SECTION_VOCABULARY)
+        added = []
+        for term in (t.strip() for t in terms):
+            index = bisect.bisect_left(vocabulary, term)
+            if term and (index == len(vocabulary) or vocabulary[index] != term):
+                vocabulary.insert(index, term)
+                added.append(term)
+        if added and self._uses_database():
+            self._get_database(self.current_profile_safe_name).add_terms(self.current_profile_safe_name, added)
+        if added: self._changed({CHANGE_VOCABULARY}, {SECTION_VOCABULARY})
+
+    def remove_vocabulary_terms(self, terms: List[str]):
+        if not self.current_profile_safe_name: return
+        vocabulary = self._section(SECTION_VOCABULARY)
+        removed = []
+        for term in (t.strip() for t in terms):
+            index = bisect.bisect_left(vocabulary, term)
+            if index < len(vocabulary) and vocabulary[index] == term:
+                del vocabulary[index]
+                removed.append(term)
+        if removed and self._uses_database():
+            self._get_database(self.current_profile_safe_name).remove_terms(self.current_profile_safe_name, removed)
+        if removed: self._changed({CHANGE_VOCABULARY}, {SECTION_VOCABULARY})
 
     def get_pronunciation_rules(self) -> Dict[str, str]:
-        if not self.current_profile_data: return {}
-        return self.current_profile_data.get("pronunciation_rules", {})
+        return self._section(SECTION_PRONUNCIATION_RULES)
 
     def update_pronunciation_rules(self, new_rules: Dict[str, str]):
         if not self.current_profile_data: app_logger.warning("Update pron. rules: nessun profilo caricato."); return
-        self.current_profile_data["pronunciation_rules"] = {k.strip().lower(): v for k, v in new_rules.items() if k.strip()}
+        self._update_mapping(SECTION_PRONUNCIATION_RULES, new_rules)
 
     def add_macro(self, trigger: str, expansion: str):
         trigger = trigger.strip().lower();
-        if not trigger: return
-        if "macros" not in self.current_profile_data: self.current_profile_data["macros"] = {}
-        self.current_profile_data["macros"][trigger] = expansion
+        if not trigger or not self.current_profile_safe_name: return
+        self._set_mapping_item(SECTION_MACROS, trigger, expansion)
             
     def remove_macro(self, trigger: str):
-        trigger = trigger.strip().lower()
-        if "macros" in self.current_profile_data and trigger in self.current_profile_data["macros"]:
-            del self.current_profile_data["macros"][trigger]
+        if not self.current_profile_safe_name: return
+        self._remove_mapping_item(SECTION_MACROS, trigger.strip().lower())
 
     def add_pronunciation_rule(self, spoken: str, written: str):
         spoken = spoken.strip().lower()
-        if not spoken: return
-        if "pronunciation_rules" not in self.current_profile_data: self.current_profile_data["pronunciation_rules"] = {}
-        self.current_profile_data["pronunciation_rules"][spoken] = written
+        if not spoken or not self.current_profile_safe_name: return
+        self._set_mapping_item(SECTION_PRONUNCIATION_RULES, spoken, written)
 
     def remove_pronunciation_rule(self, spoken: str):
-        spoken = spoken.strip().lower()
-        if "pronunciation_rules" in self.current_profile_data and spoken in self.current_profile_data["pronunciation_rules"]:
-            del self.current_profile_data["pronunciation_rules"][spoken]
-
+        if not self.current_profile_safe_name: return
+        self._remove_mapping_item(SECTION_PRONUNCIATION_RULES, spoken.strip().lower())
 
 if __name__ == '__main__':
     app_logger.info("Avvio test dettagliato ProfileManager (versione riscritta)...")
+    from src.config import PROFILES_DIR_NAME, APP_PREFERENCES_FILENAME
     
     test_base_path = Path.cwd() / "test_app_data_pm_v2" # Nuova cartella per questo test
     test_profiles_dir = test_base_path / PROFILES_DIR_NAME
@@ -406,10 +652,7 @@ if __name__ == '__main__':
     if test_base_path.exists(): shutil.rmtree(test_base_path)
     test_base_path.mkdir(parents=True)
     
-    original_profiles_dir, PROFILES_DIR = PROFILES_DIR, test_profiles_dir
-    original_app_prefs_file, APP_PREFERENCES_FILE = APP_PREFERENCES_FILE, test_app_prefs_file
-    
-    pm = ProfileManager()
+    pm = ProfileManager(profiles_dir=test_profiles_dir, app_prefs_file=test_app_prefs_file)
     
     print(f"\n--- Test ProfileManager con path: {test_profiles_dir} ---")
     print(f"Prefs: {pm.global_app_preferences}, Curr Prof: {pm.get_current_profile_display_name()}, Avail: {pm.get_available_profiles()}")
@@ -434,5 +677,4 @@ if __name__ == '__main__':
     print(f"Curr Prof dopo delete: {pm.get_current_profile_display_name()}")
     print(f"Last used in prefs: {pm.get_global_preference('last_used_profile_safe_name')}")
 
-    PROFILES_DIR, APP_PREFERENCES_FILE = original_profiles_dir, original_app_prefs_file
     print(f"\n--- Test ProfileManager completati. Cartella test: {test_base_path} ---")
\ No newline at end of file
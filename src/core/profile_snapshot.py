@@ -0,0 +1,71 @@
+# src/core/profile_snapshot.py
+from itertools import count
+from types import MappingProxyType
+from typing import Any, Dict, Mapping, Optional
+
+from src.core.rule_matcher import CompiledRuleSet
+
+_EMPTY_MAPPING: Mapping[str, Any] = MappingProxyType({})
+_EMPTY_RULES = CompiledRuleSet({})
+_versions = count(1)
+
+
+class ProfileSnapshot:
+    """
+    Vista immutabile del profilo attivo: impostazioni, macro e regole di pronuncia (con le regex
+    già compilate). ProfileManager ne pubblica una nuova a ogni modifica (copy-on-write) con un
+    semplice assegnamento; i thread audio e di elaborazione ne prendono una per espressione
+    e la usano senza lock, senza vedere mai modifiche a metà.
+
+    version cresce a ogni pubblicazione, rules_version solo quando cambiano macro o regole:
+    chi deriva cache dal profilo confronta il numero e le ricostruisce solo se è cambiato.
+    """
+    __slots__ = ("version", "rules_version", "safe_name", "display_name", "settings",
+                 "macros", "pronunciation_rules", "compiled_macros", "compiled_pronunciation_rules")
+
+    def __init__(self, safe_name: Optional[str], settings: Dict[str, Any],
+                 macros: Dict[str, str], pronunciation_rules: Dict[str, str],
+                 rules_version: int, previous: Optional["ProfileSnapshot"] = None):
+        set_attr = object.__setattr__
+        set_attr(self, "version", next(_versions))
+        set_attr(self, "rules_version", rules_version)
+        set_attr(self, "safe_name", safe_name)
+        set_attr(self, "settings", MappingProxyType(dict(settings)))
+        set_attr(self, "display_name", self.settings.get("display_name") or safe_name)
+        if previous is not None and previous.safe_name == safe_name and previous.rules_version == rules_version:
+            # Regole invariate: la nuova versione condivide quelle (già compilate) della precedente
+            for name in ("macros", "pronunciation_rules", "compiled_macros", "compiled_pronunciation_rules"):
+                set_attr(self, name, getattr(previous, name))
+        else:
+            set_attr(self, "macros", MappingProxyType(dict(macros)))
+            set_attr(self, "pronunciation_rules", MappingProxyType(dict(pronunciation_rules)))
+            set_attr(self, "compiled_macros", CompiledRuleSet(self.macros))
+            set_attr(self, "compiled_pronunciation_rules", CompiledRuleSet(self.pronunciation_rules))
+
+    @classmethod
+    def empty(cls) -> "ProfileSnapshot":
+        """Nessun profilo attivo."""
+        snapshot = cls.__new__(cls)
+        for name, value in (("version", next(_versions)), ("rules_version", 0), ("safe_name", None), ("display_name", None),
+                            ("settings", _EMPTY_MAPPING), ("macros", _EMPTY_MAPPING), ("pronunciation_rules", _EMPTY_MAPPING),
+                            ("compiled_macros", _EMPTY_RULES), ("compiled_pronunciation_rules", _EMPTY_RULES)):
+            object.__setattr__(snapshot, name, value)
+        return snapshot
+
+    def __setattr__(self, name: str, value: Any):
+        raise AttributeError("ProfileSnapshot è immutabile.")
+
+    def __delattr__(self, name: str):
+        raise AttributeError("ProfileSnapshot è immutabile.")
+
+    @property
+    def is_empty(self) -> bool:
+        return self.safe_name is None
+
+    def get_profile_setting(self, key: str, default: Any = None) -> Any:
+        """Stessa firma di ProfileManager.get_profile_setting (es. per InferenceBackend.apply_profile_settings)."""
+        return self.settings.get(key, default)
+
+    def __repr__(self) -> str:
+        return (f"ProfileSnapshot(profilo={self.safe_name!r}, versione={self.version}, regole={self.rules_version}, "
+                f"{len(self.macros)} macro, {len(self.pronunciation_rules)} regole di pronuncia)")
@@ -0,0 +1,131 @@
+# src/core/quantization.py
+import os
+from pathlib import Path
+from typing import Any
+
+import torch
+import whisper
+import whisper.model
+
+from src.config import MODEL_CACHE_DIR
+from src.utils.logger import app_logger
+from src.core.model_registry import register_model_loader, ModelLoader, warm_up_whisper, estimate_model_size_mb
+
+QUANTIZED_BACKEND_KEY = "openai-whisper-int8"  # Chiave dei modelli quantizzati nel registro
+
+
+def _replace_whisper_linear(module: torch.nn.Module):
+    """
+    whisper.model.Linear è una sottoclasse di nn.Linear: quantize_dynamic riconosce solo il tipo esatto,
+    quindi i layer vengono sostituiti da nn.Linear con gli stessi pesi prima della conversione.
+    """
+    for child_name, child in module.named_children():
+        if isinstance(child, whisper.model.Linear):
+            linear = torch.nn.Linear(child.in_features, child.out_features, bias=child.bias is not None)
+            linear.weight = child.weight
+            if child.bias is not None:
+                linear.bias = child.bias
+            setattr(module, child_name, linear)
+        else:
+            _replace_whisper_linear(child)
+
+
+def quantize_whisper_int8(model: whisper.Whisper) -> whisper.Whisper:
+    """Quantizzazione dinamica int8 dei layer Linear (solo CPU). Modifica e restituisce il modello."""
+    model = model.cpu().eval()
+    _replace_whisper_linear(model)
+    return torch.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8, inplace=True)
+
+
+def quantized_cache_path(model_name: str) -> Path:
+    # Il formato serializzato dei moduli quantizzati dipende dalle versioni di torch e whisper.
+    torch_version = torch.__version__.split("+")[0]
+    return MODEL_CACHE_DIR / f"whisper-{model_name}-int8-torch{torch_version}-whisper{whisper.__version__}.pt"
+
+
+def load_quantized_whisper(model_name: str, device: str = "cpu") -> whisper.Whisper:
+    """Carica il modello quantizzato dalla cache su disco; se manca, lo converte e lo salva."""
+    if device != "cpu":
+        app_logger.warning(f"Quantizzazione int8 disponibile solo su CPU: '{model_name}' caricato su CPU invece che su {device}.")
+    cache_path = quantized_cache_path(model_name)
+    if cache_path.exists():
+        try:
+            # File generato da questa applicazione: serve il pickle completo del modulo quantizzato.
+            model = torch.load(cache_path, map_location="cpu", weights_only=False)
+            app_logger.info(f"Modello quantizzato '{model_name}' caricato dalla cache: {cache_path}")
+            return model
+        except Exception as e:
+            app_logger.warning(f"Cache del modello quantizzato '{model_name}' non leggibile ({e}). Riconverto.")
+    model = quantize_whisper_int8(whisper.load_model(model_name, device="cpu"))
+    try:
+        cache_path.parent.mkdir(parents=True, exist_ok=True)
+        temp_path = cache_path.with_suffix(".tmp")
+        torch.save(model, temp_path)
+        os.replace(temp_path, cache_path)
+        app_logger.info(f"Modello quantizzato '{model_name}' salvato in cache: {cache_path}")
+    except Exception as e:
+        app_logger.warning(f"Impossibile salvare in cache il modello quantizzato '{model_name}': {e}")
+    return model
+
+
+def estimate_quantized_size_mb(model: Any) -> float:
+    # I pesi dei Linear quantizzati non compaiono in parameters(): 1 byte per peso più il bias fp32.
+    packed_bytes = 0
+    for module in model.modules():
+        if isinstance(module, torch.ao.nn.quantized.dynamic.Linear):
+            weight, bias = module._weight_bias()
+            packed_bytes += weight.numel() + (bias.numel() * bias.element_size() if bias is not None else 0)
+    return estimate_model_size_mb(model) + packed_bytes / (1024 * 1024)
+
+
+register_model_loader(QUANTIZED_BACKEND_KEY, ModelLoader(
+    load_fn=load_quantized_whisper,
+    warm_up_fn=warm_up_whisper,
+    size_fn=lambda model, model_name: estimate_quantized_size_mb(model)
+))
+
+
+if __name__ == '__main__':
+    # Report: memoria residente e fattore tempo reale (RTF) del modello fp32 rispetto a quello int8.
+    import argparse
+    import gc
+    import time
+    import numpy as np
+    from src.config import AVAILABLE_WHISPER_MODELS, DEFAULT_LANGUAGE, AUDIO_SAMPLE_RATE, DEFAULT_WHISPER_TEMPERATURE
+    from src.utils.audio_files import read_wav_mono
+
+    def resident_memory_mb() -> float:
+        try:
+            import psutil
+            return psutil.Process().memory_info().rss / (1024 * 1024)
+        except ImportError:
+            with open("/proc/self/statm") as statm:  # Linux
+                return int(statm.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / (1024 * 1024)
+
+    parser = argparse.ArgumentParser(description="Confronta memoria e RTF dei modelli Whisper fp32 e int8 su CPU.")
+    parser.add_argument("--models", nargs="+", default=AVAILABLE_WHISPER_MODELS)
+    parser.add_argument("--wav", help="WAV di prova (default: 10 s di rumore sintetico)")
+    parser.add_argument("--language", default=DEFAULT_LANGUAGE)
+    args = parser.parse_args()
+
+    if args.wav:
+        test_audio, _ = read_wav_mono(args.wav)
+    else:
+        test_audio = (0.01 * np.random.default_rng(0).standard_normal(10 * AUDIO_SAMPLE_RATE)).astype(np.float32)
+    audio_duration_s = len(test_audio) / AUDIO_SAMPLE_RATE
+
+    print(f"{'modello':8s} {'tipo':5s} {'RSS (MB)':>9s} {'RTF':>6s}  testo")
+    for model_name in args.models:
+        for label, loader in (("fp32", lambda name: whisper.load_model(name, device="cpu")),
+                              ("int8", load_quantized_whisper)):
+            gc.collect()
+            rss_before = resident_memory_mb()
+            model = loader(model_name)
+            rss_model = resident_memory_mb() - rss_before
+            warm_up_whisper(model, args.language)
+            started_at = time.perf_counter()
+            text = model.transcribe(test_audio, language=args.language, fp16=False,
+                                    temperature=DEFAULT_WHISPER_TEMPERATURE)["text"].strip()
+            rtf = (time.perf_counter() - started_at) / audio_duration_s
+            print(f"{model_name:8s} {label:5s} {rss_model:9.0f} {rtf:6.2f}  {text[:60]!r}")
+            del model
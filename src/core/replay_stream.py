@@ -0,0 +1,121 @@
+# src/core/replay_stream.py
+import random
+import time
+from threading import Thread, Event
+from typing import Any, Callable, Optional
+
+import numpy as np
+
+from src.config import AUDIO_SAMPLE_RATE
+from src.utils.logger import app_logger
+
+
+class ReplayStatus:
+    """Flag di stato passati al callback, con gli stessi attributi di sounddevice.CallbackFlags."""
+    __slots__ = ("input_overflow", "input_underflow")
+
+    def __init__(self, input_overflow: bool = False, input_underflow: bool = False):
+        self.input_overflow = input_overflow
+        self.input_underflow = input_underflow
+
+    def __bool__(self) -> bool:
+        return self.input_overflow or self.input_underflow
+
+
+class ReplayInputStream:
+    """
+    Sostituto di sounddevice.InputStream che riproduce campioni già in memoria: un thread consegna
+    al callback un blocco di blocksize campioni alla volta, con il ritmo del tempo reale diviso per speed.
+
+    - jitter_s: ritardo casuale aggiuntivo (0..jitter_s) su ogni consegna, come uno scheduler carico;
+      i blocchi in ritardo arrivano poi ravvicinati, senza perdere il ritmo medio.
+    - dropout_rate: probabilità che un blocco vada perso; il blocco successivo riporta input_overflow,
+      come fa PortAudio quando il callback non riesce a stare al passo.
+    - tail_silence_s: silenzio accodato al file, perché la fine dell'ultima frase venga rilevata dal VAD.
+
+    Gli argomenti di sounddevice che non servono alla riproduzione (device, dtype, ...) vengono ignorati.
+    """
+
+    def __init__(self, samples: np.ndarray, callback: Callable[[np.ndarray, int, Any, Any], None],
+                 samplerate: int = AUDIO_SAMPLE_RATE, blocksize: int = 0, channels: int = 1,
+                 speed: float = 1.0, jitter_s: float = 0.0, dropout_rate: float = 0.0,
+                 tail_silence_s: float = 1.0, seed: Optional[int] = 0, device: Any = None, **_ignored):
+        if speed <= 0:
+            raise ValueError("La velocità di riproduzione deve essere positiva.")
+        self.samplerate = samplerate
+        self.blocksize = blocksize or int(samplerate * 0.1)
+        self.channels = channels
+        self.callback = callback
+        self.speed = speed
+        self.jitter_s = jitter_s
+        self.dropout_rate = dropout_rate
+        self.device = device if device is not None else "replay"
+        tail = np.zeros(int(round(tail_silence_s * samplerate)), dtype=np.float32)
+        self._samples = np.concatenate((np.asarray(samples, dtype=np.float32), tail))
+        self._random = random.Random(seed)
+        self._stop_event = Event()
+        self.finished = Event() # Impostato quando tutti i blocchi sono stati consegnati (o allo stop)
+        self._thread: Optional[Thread] = None
+        self.blocks_delivered = 0
+        self.blocks_dropped = 0
+
+    @classmethod
+    def factory(cls, samples: np.ndarray, **replay_options) -> Callable[..., "ReplayInputStream"]:
+        """Factory per Transcriber(stream_factory=...): riceve gli argomenti di InputStream."""
+        def create_stream(**stream_kwargs) -> "ReplayInputStream":
+            return cls(samples, **stream_kwargs, **replay_options)
+        return create_stream
+
+    @property
+    def duration_s(self) -> float:
+        return len(self._samples) / self.samplerate
+
+    @property
+    def active(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self):
+        if self.active: return
+        self._stop_event.clear()
+        self.finished.clear()
+        self._thread = Thread(target=self._run, name="ReplayInputStream", daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        block_interval_s = self.blocksize / self.samplerate / self.speed
+        started_at = time.monotonic()
+        overflow_pending = False
+        for block_index, offset in enumerate(range(0, len(self._samples), self.blocksize)):
+            delay = started_at + block_index * block_interval_s - time.monotonic()
+            if self.jitter_s > 0: delay += self._random.uniform(0.0, self.jitter_s)
+            if delay > 0 and self._stop_event.wait(delay): break
+            if self._stop_event.is_set(): break
+            if self.dropout_rate > 0 and self._random.random() < self.dropout_rate:
+                self.blocks_dropped += 1
+                overflow_pending = True
+                continue
+            block = self._samples[offset:offset + self.blocksize]
+            if len(block) < self.blocksize: # L'ultimo blocco viene completato con silenzio
+                block = np.concatenate((block, np.zeros(self.blocksize - len(block), dtype=np.float32)))
+            indata = np.repeat(block[:, None], self.channels, axis=1) if self.channels > 1 else block[:, None]
+            status = ReplayStatus(input_overflow=overflow_pending)
+            overflow_pending = False
+            try:
+                self.callback(indata, self.blocksize, None, status)
+            except Exception as e:
+                app_logger.error(f"ReplayInputStream: Errore nel callback audio: {e}", exc_info=True)
+                break
+            self.blocks_delivered += 1
+        self.finished.set()
+
+    def wait_finished(self, timeout: Optional[float] = None) -> bool:
+        return self.finished.wait(timeout)
+
+    def stop(self):
+        self._stop_event.set()
+        if self._thread is not None:
+            self._thread.join()
+
+    def close(self):
+        self.stop()
+        self._thread = None
@@ -0,0 +1,186 @@
+# src/core/rule_matcher.py
+import re
+from typing import Dict, List, Optional, Tuple
+
+# Parole e singoli segni di punteggiatura: l'unità con cui si confrontano chiavi e valori
+_TOKEN_PATTERN = re.compile(r"\w+|[^\w\s]")
+_WORD_EDGES_PATTERN = re.compile(r"^\w(?:.*\w)?$", re.DOTALL)
+
+
+def _tokens(text: str) -> Tuple[str, ...]:
+    return tuple(_TOKEN_PATTERN.findall(text.lower()))
+
+
+class CompiledRuleSet:
+    """
+    Insieme di regole "parola detta -> testo" (macro o correzioni di pronuncia) con la stessa semantica
+    delle sostituzioni in ordine di lunghezza decrescente (una re.sub per regola, chiave più lunga prima).
+
+    Se le regole non interagiscono tra loro vengono compilate in un'unica regex e il testo viene percorso
+    una volta sola, qualunque sia il numero di regole: le chiavi sono fuse in un trie (es. "otorino" e
+    "otorino laringo iatra" condividono il prefisso) e a parità di posizione vince la chiave più lunga.
+    Le regole interagiscono quando un valore contiene una chiave applicata dopo (macro a catena, es.
+    "buongiorno" -> "ciao dottore" e "ciao" -> "salve") o quando una chiave applicata dopo può iniziare
+    prima di una applicata prima e sovrapporsi a essa: in quei casi il passaggio unico darebbe un risultato
+    diverso, quindi si usano le sostituzioni in sequenza, con le regex compilate una volta sola.
+    Il confine di parola (\\b) e il matching case-insensitive sono gli stessi delle regex per singola regola.
+    """
+
+    def __init__(self, rules: Dict[str, str]):
+        self.rules = {key.lower(): value for key, value in rules.items() if key}
+        self.pattern: Optional[re.Pattern] = None
+        # Regole in ordine di applicazione, solo se il passaggio unico non è equivalente
+        self.sequential_rules: Optional[List[Tuple[re.Pattern, str]]] = None
+        if not self.rules:
+            return
+        original_keys = sorted((key for key in rules if key), key=len, reverse=True)
+        # Chiavi che differiscono solo per maiuscole/minuscole restano regole distinte, come nella sequenza
+        if len(original_keys) > len(self.rules) or self._rules_interact(sorted(self.rules, key=len, reverse=True)):
+            self.sequential_rules = [(re.compile(r'\b' + re.escape(key) + r'\b', re.IGNORECASE), rules[key])
+                                     for key in original_keys]
+            return
+        trie: Dict[str, dict] = {}
+        for key in self.rules:
+            node = trie
+            for char in key:
+                node = node.setdefault(char, {})
+            node[""] = {}  # Marcatore di fine chiave
+        self.pattern = re.compile(r'\b(?:' + self._trie_to_regex(trie) + r')\b', re.IGNORECASE)
+
+    def __bool__(self) -> bool:
+        return bool(self.rules)
+
+    @property
+    def is_single_pass(self) -> bool:
+        return self.pattern is not None
+
+    def _rules_interact(self, ordered_keys: List[str]) -> bool:
+        """
+        True se applicare le regole in un solo passaggio può dare un testo diverso dalle sostituzioni
+        in sequenza. Il controllo è prudente: nel dubbio sceglie la sequenza, che è sempre corretta.
+        """
+        key_tokens = [_tokens(key) for key in ordered_keys]
+        # Chiavi che non iniziano e finiscono con una lettera/cifra: \b si comporta in modo diverso, meglio non rischiare
+        if any(not _WORD_EDGES_PATTERN.match(key) for key in ordered_keys):
+            return True
+
+        # 1. Il valore di una regola, inserito nel testo, può formare (da solo o con le parole intorno)
+        # una chiave applicata dopo di lei. Per ogni sequenza di token: ultima regola (in ordine) che la
+        # contiene come chiave intera, come inizio, come fine o in qualunque posizione.
+        last_index_full: Dict[Tuple[str, ...], int] = {}
+        last_index_prefix: Dict[Tuple[str, ...], int] = {}
+        last_index_suffix: Dict[Tuple[str, ...], int] = {}
+        last_index_infix: Dict[Tuple[str, ...], int] = {}
+        last_index_with_space = -1
+        for index, (key, tokens) in enumerate(zip(ordered_keys, key_tokens)):
+            last_index_full[tokens] = index
+            for start in range(len(tokens)):
+                for end in range(start + 1, len(tokens) + 1):
+                    last_index_infix[tokens[start:end]] = index
+                last_index_prefix[tokens[:start + 1]] = index
+                last_index_suffix[tokens[start:]] = index
+            if any(char.isspace() for char in key):
+                last_index_with_space = index
+        max_key_tokens = max(len(tokens) for tokens in key_tokens)
+        for index, key in enumerate(ordered_keys):
+            value = self.rules[key]
+            if "\\" in value:
+                # Modello di sostituzione: si valuta il testo che produce (\g<0> reinserisce la chiave)
+                try:
+                    value = re.fullmatch(r'(?s).*', key).expand(value)
+                except (re.error, IndexError):
+                    return True
+            value_tokens = _tokens(value)
+            if not value_tokens:
+                # Un valore vuoto o di soli spazi avvicina le parole intorno: può formare una chiave con spazi
+                if last_index_with_space > index:
+                    return True
+                continue
+            if last_index_infix.get(value_tokens, -1) > index:
+                return True
+            for length in range(1, min(len(value_tokens), max_key_tokens) + 1):
+                if (last_index_prefix.get(value_tokens[-length:], -1) > index
+                        or last_index_suffix.get(value_tokens[:length], -1) > index):
+                    return True
+                for start in range(len(value_tokens) - length + 1):
+                    if last_index_full.get(value_tokens[start:start + length], -1) > index:
+                        return True
+
+        # 2. Una chiave applicata dopo può iniziare prima di una applicata prima e sovrapporsi a essa:
+        # il passaggio unico sceglierebbe quella più a sinistra, la sequenza quella più lunga.
+        first_index_with_prefix: Dict[Tuple[str, ...], int] = {}
+        for index, tokens in enumerate(key_tokens):
+            for length in range(1, len(tokens) + 1):
+                first_index_with_prefix.setdefault(tokens[:length], index)
+        for index, tokens in enumerate(key_tokens):
+            for start in range(1, len(tokens)):
+                if first_index_with_prefix.get(tokens[start:], index) < index:
+                    return True
+        return False
+
+    @classmethod
+    def _trie_to_regex(cls, node: Dict[str, dict]) -> str:
+        is_terminal = "" in node
+        children = [(char, child) for char, child in node.items() if char]
+        if not children:
+            return ""
+        # Catene senza diramazioni diventano un unico letterale (meno gruppi annidati).
+        if len(children) == 1 and not is_terminal:
+            char, child = children[0]
+            return re.escape(char) + cls._trie_to_regex(child)
+        alternatives = "|".join(re.escape(char) + cls._trie_to_regex(child) for char, child in children)
+        # Il gruppo opzionale è greedy: prima prova la chiave più lunga, poi (backtracking) quella che finisce qui.
+        return "(?:" + alternatives + (")?" if is_terminal else ")")
+
+    def _replacement(self, match: "re.Match") -> str:
+        matched_text = match.group(0)
+        value = self.rules.get(matched_text.lower())
+        if value is None:
+            # Casi rari in cui lower() del testo non coincide con la chiave (es. maiuscole speciali Unicode)
+            value = next(v for k, v in self.rules.items() if re.fullmatch(re.escape(k), matched_text, re.IGNORECASE))
+        # Come con pattern.sub(valore, testo): il valore è un modello di sostituzione (es. "\\n" diventa un a capo)
+        return match.expand(value) if "\\" in value else value
+
+    def apply(self, text: str) -> str:
+        if self.pattern is not None:
+            return self.pattern.sub(self._replacement, text)
+        if self.sequential_rules is not None:
+            for pattern, value in self.sequential_rules:
+                text = pattern.sub(value, text)
+        return text
+
+
+if __name__ == '__main__':
+    # Verifica: stesso risultato delle sostituzioni in sequenza (chiave più lunga prima) del vecchio TextProcessor.
+    def apply_sequentially(rules: Dict[str, str], text: str) -> str:
+        for key in sorted(rules, key=len, reverse=True):
+            text = re.compile(r'\b' + re.escape(key) + r'\b', re.IGNORECASE).sub(rules[key], text)
+        return text
+
+    cases = [
+        # (regole, testo, passaggio unico atteso)
+        ({"firma dottore": "Dr. Mario Rossi\\nSpecialista", "otorino": "ORL", "otorino laringo iatra": "otorinolaringoiatra"},
+         "firma dottore e visita otorino laringo iatra, poi otorino", True),
+        ({"a capo": "\\n", "virgola": ","}, "uno virgola due a capo tre", True),
+        # Macro a catena: l'espansione contiene una chiave più corta
+        ({"buongiorno": "ciao dottore", "ciao": "salve"}, "buongiorno a tutti", False),
+        # Chiavi sovrapposte: la più corta inizia prima della più lunga
+        ({"pressione arteriosa sistolica": "PAS", "della pressione": "della press."},
+         "valore della pressione arteriosa sistolica", False),
+        # Sovrapposizione nell'altro verso: la più lunga inizia prima, il passaggio unico è equivalente
+        ({"pressione arteriosa sistolica": "PAS", "sistolica alta": "ipertensione"},
+         "pressione arteriosa sistolica alta", True),
+        # Il valore reinserisce il testo riconosciuto con \g<0>
+        ({"dottore rossi": "\\g<0> (cardiologo)", "rossi": "Rossi"}, "chiamare il dottore rossi", False),
+        # Un valore vuoto avvicina le parole intorno: escluso in modo prudente se ci sono chiavi con spazi applicate dopo
+        ({"quattro": "", "a b": "X"}, "a quattro b", False),
+    ]
+    all_passed = True
+    for rules, text, expected_single_pass in cases:
+        rule_set = CompiledRuleSet(rules)
+        result, expected = rule_set.apply(text), apply_sequentially(rules, text)
+        ok = result == expected and rule_set.is_single_pass == expected_single_pass
+        all_passed &= ok
+        mode = "passaggio unico" if rule_set.is_single_pass else "sequenza"
+        print(f"{'OK ' if ok else 'ERR'} [{mode}] {text!r} -> {result!r} (atteso {expected!r})")
+    print("\nSUCCESS: Tutti i casi equivalenti." if all_passed else "\nFAILURE: Alcuni casi differiscono.")
@@ -0,0 +1,150 @@
+# src/core/short_utterance.py
+import math
+import zlib
+from typing import Any, Optional
+
+import numpy as np
+import torch
+import torch.nn.functional as F
+import whisper
+from whisper.audio import HOP_LENGTH, N_FRAMES
+
+from src.config import (
+    AUDIO_SAMPLE_RATE, DEFAULT_WHISPER_TEMPERATURE,
+    SHORT_UTTERANCE_MAX_S, SHORT_UTTERANCE_BUCKETS_S, SHORT_UTTERANCE_TAIL_PAD_S,
+    SHORT_UTTERANCE_LOGPROB_THRESHOLD, SHORT_UTTERANCE_COMPRESSION_RATIO_THRESHOLD
+)
+from src.utils.logger import app_logger
+
+SHORT_MODE_OFF = "off"
+SHORT_MODE_TRIMMED = "trimmed"
+SHORT_MODE_BUCKETED = "bucketed"
+
+
+def window_frames(duration_s: float, mode: str) -> Optional[int]:
+    """
+    Numero di frame mel della finestra dell'encoder per un segmento di questa durata,
+    oppure None se il segmento deve usare la finestra piena di 30 s.
+    """
+    if mode == SHORT_MODE_OFF or duration_s > SHORT_UTTERANCE_MAX_S:
+        return None
+    window_s = duration_s + SHORT_UTTERANCE_TAIL_PAD_S
+    if mode == SHORT_MODE_BUCKETED:
+        window_s = next((bucket for bucket in SHORT_UTTERANCE_BUCKETS_S if bucket >= window_s), None)
+        if window_s is None:
+            return None
+    frames = math.ceil(window_s * AUDIO_SAMPLE_RATE / HOP_LENGTH)
+    frames += frames % 2  # conv2 ha stride 2: serve un numero pari di frame
+    return frames if frames < N_FRAMES else None
+
+
+class TrimmedAudioEncoder:
+    """
+    Come whisper.model.AudioEncoder.forward, ma accetta finestre più corte di 30 s
+    sommando solo le prime posizioni dell'embedding posizionale.
+    """
+
+    def __init__(self, encoder: torch.nn.Module):
+        self.encoder = encoder
+
+    def __call__(self, mel: torch.Tensor) -> torch.Tensor:
+        encoder = self.encoder
+        x = F.gelu(encoder.conv1(mel))
+        x = F.gelu(encoder.conv2(x))
+        x = x.permute(0, 2, 1)
+        x = (x + encoder.positional_embedding[:x.shape[1]]).to(x.dtype)
+        for block in encoder.blocks:
+            x = block(x)
+        return encoder.ln_post(x)
+
+
+class _TrimmedEncoderModel:
+    """
+    Vista sul modello Whisper con l'encoder sostituito, da passare a whisper.decode():
+    il decoder, la cache KV e il tokenizer restano quelli del modello originale.
+    """
+
+    def __init__(self, model: whisper.Whisper):
+        self._model = model
+        self.encoder = TrimmedAudioEncoder(model.encoder)
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self._model, name)
+
+
+def _compression_ratio(text: str) -> float:
+    text_bytes = text.encode("utf-8")
+    return len(text_bytes) / len(zlib.compress(text_bytes)) if text_bytes else 0.0
+
+
+def decode_short(model: whisper.Whisper, audio: np.ndarray, language: Optional[str],
+                 mode: str) -> Optional[str]:
+    """
+    Trascrive un segmento breve con la finestra ridotta dell'encoder.
+    Restituisce None se il segmento non è adatto (troppo lungo, modalità "off") o se il
+    risultato non supera i controlli di affidabilità: in quel caso va usato model.transcribe().
+    """
+    frames = window_frames(len(audio) / AUDIO_SAMPLE_RATE, mode)
+    if frames is None:
+        return None
+    padding = frames * HOP_LENGTH - len(audio)
+    mel = whisper.log_mel_spectrogram(audio, model.dims.n_mels, padding=max(0, padding), device=model.device)
+    mel = mel[:, :frames]
+    options = whisper.DecodingOptions(
+        language=language, temperature=DEFAULT_WHISPER_TEMPERATURE, fp16=False, without_timestamps=True
+    )
+    result = whisper.decode(_TrimmedEncoderModel(model), mel, options)
+    text = result.text.strip()
+    compression_ratio = _compression_ratio(text)
+    if result.avg_logprob < SHORT_UTTERANCE_LOGPROB_THRESHOLD or compression_ratio > SHORT_UTTERANCE_COMPRESSION_RATIO_THRESHOLD:
+        app_logger.debug(f"Percorso breve scartato (logprob {result.avg_logprob:.2f}, compressione {compression_ratio:.2f}): uso la finestra piena.")
+        return None
+    return text
+
+
+if __name__ == '__main__':
+    # Validazione: confronta il percorso breve con la finestra piena su un corpus di file WAV.
+    import argparse
+    import time
+    from pathlib import Path
+    from src.utils.audio_files import read_wav_mono, word_error_rate
+    from src.config import DEFAULT_WHISPER_MODEL, DEFAULT_LANGUAGE
+
+    parser = argparse.ArgumentParser(description="Confronta trascrizione a finestra piena e finestra ridotta su file WAV.")
+    parser.add_argument("paths", nargs="+", help="File WAV o cartelle che li contengono")
+    parser.add_argument("--model", default=DEFAULT_WHISPER_MODEL)
+    parser.add_argument("--language", default=DEFAULT_LANGUAGE)
+    args = parser.parse_args()
+
+    wav_files = []
+    for path in map(Path, args.paths):
+        wav_files.extend(sorted(path.glob("*.wav")) if path.is_dir() else [path])
+    whisper_model = whisper.load_model(args.model)
+    modes = [SHORT_MODE_TRIMMED, SHORT_MODE_BUCKETED]
+    totals = {mode: {"time": 0.0, "wer": 0.0, "fallback": 0} for mode in modes}
+    full_time = 0.0
+    for wav_file in wav_files:
+        samples, _ = read_wav_mono(str(wav_file))
+        started_at = time.perf_counter()
+        full_text = whisper_model.transcribe(samples, language=args.language, fp16=False,
+                                             temperature=DEFAULT_WHISPER_TEMPERATURE)["text"].strip()
+        full_time += time.perf_counter() - started_at
+        print(f"{wav_file.name} ({len(samples) / AUDIO_SAMPLE_RATE:.1f}s) finestra piena: {full_text!r}")
+        for mode in modes:
+            started_at = time.perf_counter()
+            short_text = decode_short(whisper_model, samples, args.language, mode)
+            totals[mode]["time"] += time.perf_counter() - started_at
+            if short_text is None:
+                totals[mode]["fallback"] += 1
+                print(f"    {mode:9s}: (finestra piena)")
+                continue
+            wer = word_error_rate(full_text, short_text)
+            totals[mode]["wer"] += wer
+            print(f"    {mode:9s}: {short_text!r} (WER vs piena {wer:.2f})")
+    if wav_files:
+        print(f"\nFinestra piena: {full_time / len(wav_files):.3f}s medi per file")
+        for mode in modes:
+            evaluated = len(wav_files) - totals[mode]["fallback"]
+            mean_wer = totals[mode]["wer"] / evaluated if evaluated else float("nan")
+            print(f"{mode:9s}: {totals[mode]['time'] / len(wav_files):.3f}s medi per file, "
+                  f"WER medio {mean_wer:.3f}, {totals[mode]['fallback']} file su finestra piena")
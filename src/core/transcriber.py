@@ -1,49 +1,109 @@
 # src/core/transcriber.py
-import whisper
-import sounddevice as sd
 import numpy as np
 import time
 import queue
 from threading import Thread, Lock
-import wave 
-from datetime import datetime
 
 from src.config import (
     DEFAULT_WHISPER_MODEL, DEFAULT_LANGUAGE, AVAILABLE_WHISPER_MODELS, LOGS_DIR,
-    DEFAULT_WHISPER_TEMPERATURE,
+    DEFAULT_INFERENCE_BACKEND,
     AUDIO_SAMPLE_RATE, AUDIO_CHANNELS, AUDIO_BLOCK_DURATION_S,
     AUDIO_SILENCE_THRESHOLD_S, AUDIO_MAX_BUFFER_S_INTERIM,
-    AUDIO_MIN_SPEECH_FOR_SILENCE_S, AUDIO_MIN_CHUNK_FOR_FINAL_S
+    AUDIO_MIN_SPEECH_FOR_SILENCE_S, AUDIO_MIN_CHUNK_FOR_FINAL_S, DEFAULT_VAD_ENGINE,
+    AUDIO_RING_BUFFER_HEADROOM, DEFAULT_BACKPRESSURE_POLICY, BACKPRESSURE_DEGRADED_MODEL,
+    DEFAULT_WHISPER_QUANTIZATION
 )
 from src.utils.logger import app_logger
+from src.utils.metrics import metrics
 from src.core.profile_manager import ProfileManager
-from typing import Optional, Callable, Any, List
+from src.core.audio_buffer import AudioRingBuffer
+from src.core.debug_recorder import DebugAudioRecorder
+from src.core.vad import (
+    SpeechDetector, UtteranceEndpointer, create_speech_detector,
+    ENDPOINT_SILENCE, ENDPOINT_MAX_BUFFER, ENDPOINT_DISCARD
+)
+from src.core.inference_pipeline import InferencePipeline, BACKPRESSURE_DEGRADE
+from src.core.inference_backends import InferenceBackend, create_inference_backend
+from typing import Optional, Callable, Any, List, Tuple
+
+try:
+    import sounddevice as sd  # Senza PortAudio (es. server headless) resta possibile la riproduzione da file
+except (ImportError, OSError):
+    sd = None
+
+# Restituito al segmentatore quando scade il timer del parlato senza che arrivino blocchi
+_DEADLINE_EXPIRED = object()
+
+
+def _open_input_stream(**stream_kwargs) -> Any:
+    if sd is None:
+        raise RuntimeError("sounddevice/PortAudio non disponibile: impossibile aprire il microfono.")
+    return sd.InputStream(**stream_kwargs)
 
 
 class Transcriber:
     def __init__(self, profile_manager: ProfileManager,
-                 on_transcription_callback: Optional[Callable[[str], None]] = None,
-                 on_status_update_callback: Optional[Callable[[str], None]] = None):
+                 on_transcription_callback: Optional[Callable[[str, Optional[float]], None]] = None,
+                 on_status_update_callback: Optional[Callable[[str], None]] = None,
+                 stream_factory: Optional[Callable[..., Any]] = None):
         self.profile_manager = profile_manager
         self.on_transcription_callback = on_transcription_callback
         self.on_status_update_callback = on_status_update_callback
+        # Crea lo stream di ingresso con gli stessi argomenti di sounddevice.InputStream
+        # (default: il microfono; es. ReplayInputStream per riprodurre file audio)
+        self.stream_factory = stream_factory or _open_input_stream
 
         self.is_listening = False
-        self.audio_queue: queue.Queue[np.ndarray] = queue.Queue()
-        self.model: Optional[whisper.Whisper] = None
-        self.stream: Optional[sd.InputStream] = None
-        self.model_lock = Lock()
+        # Il callback scrive l'audio nel ring buffer e accoda solo (posizione, n. campioni, istante di cattura) del blocco.
+        self.audio_ring = AudioRingBuffer.for_duration(AUDIO_MAX_BUFFER_S_INTERIM * AUDIO_RING_BUFFER_HEADROOM)
+        # None è la sentinella con cui stop_listening sveglia il segmentatore a stream chiuso.
+        self.audio_queue: queue.Queue[Optional[Tuple[int, int, float]]] = queue.Queue()
+        self._wakeups_counter = metrics.counter("audio.segmenter_wakeups")
+        self._deadline_wakeups_counter = metrics.counter("audio.segmenter_deadline_wakeups")
+        self._wakeups_rate_gauge = metrics.gauge("audio.segmenter_wakeups_per_s")
+        self._block_wait_hist = metrics.histogram("audio.block_queue_wait_s")
+        self._segmentation_delay_hist = metrics.histogram("audio.segmentation_delay_s")
+        self.stream: Optional[Any] = None
+        self.model_lock = Lock() # Serializza i ricaricamenti di modello e impostazioni
         self.processing_thread: Optional[Thread] = None
         self.current_model_name: Optional[str] = None
         self.current_language: Optional[str] = None
+        # Versione del profilo (ProfileSnapshot.version) da cui sono state lette le impostazioni
+        self.settings_version: int = 0
         self.selected_audio_device_id: Optional[int] = None
 
         self.enable_audio_debug_recording = False
-        self.debug_audio_writer: Optional[wave.Wave_write] = None
+        self.debug_recorder: Optional[DebugAudioRecorder] = None
+        # Flag di stato dello stream, contati nel callback e riportati dal segmentatore
+        self.input_overflow_count = 0
+        self.input_underflow_count = 0
+        self._reported_input_overflows = 0
+        self._reported_input_underflows = 0
+        self._input_overflow_counter = metrics.counter("audio.input_overflows")
+        self._input_underflow_counter = metrics.counter("audio.input_underflows")
+        self.vad_engine_name: Optional[str] = None
+        self.speech_detector: SpeechDetector = create_speech_detector(DEFAULT_VAD_ENGINE)
+        # Motore di inferenza (openai-whisper, faster-whisper, ...) scelto dal profilo
+        self.inference_backend_name: Optional[str] = None
+        self.backend: InferenceBackend = create_inference_backend(DEFAULT_INFERENCE_BACKEND)
+        # Modello ridotto per la politica di backpressure "degrade" (caricato alla prima necessità)
+        self.degraded_backend: Optional[InferenceBackend] = None
+        self.degraded_backend_lock = Lock()
+        # Il thread di segmentazione accoda i segmenti; i worker li trascrivono e consegnano i testi in ordine.
+        self.inference_pipeline = InferencePipeline(
+            transcribe_fn=self._transcribe_segment,
+            on_result=self._emit_transcription,
+            release_fn=self.audio_ring.release
+        )
 
         self._load_global_audio_device_preference()
         self.reload_model_and_settings() 
 
+    @property
+    def model(self) -> Any:
+        """Modello caricato dal motore di inferenza corrente (None se non disponibile)."""
+        return self.backend.model
+
     def _load_global_audio_device_preference(self):
         device_id = self.profile_manager.get_global_preference("selected_audio_device_id")
         if device_id is not None:
@@ -64,21 +124,44 @@ class Transcriber:
 
     def reload_model_and_settings(self):
         with self.model_lock:
-            new_model_name = self.profile_manager.get_profile_setting("whisper_model", DEFAULT_WHISPER_MODEL)
-            new_language = self.profile_manager.get_profile_setting("language", DEFAULT_LANGUAGE)
-            self.enable_audio_debug_recording = self.profile_manager.get_profile_setting("enable_audio_debug_recording", False)
+            # Tutte le impostazioni dalla stessa versione del profilo (la GUI può modificarlo nel frattempo)
+            snapshot = self.profile_manager.snapshot
+            self.settings_version = snapshot.version
+            new_model_name = snapshot.get_profile_setting("whisper_model", DEFAULT_WHISPER_MODEL)
+            new_language = snapshot.get_profile_setting("language", DEFAULT_LANGUAGE)
+            self.enable_audio_debug_recording = snapshot.get_profile_setting("enable_audio_debug_recording", False)
+            new_vad_engine = snapshot.get_profile_setting("vad_engine", DEFAULT_VAD_ENGINE)
+            backpressure_policy = snapshot.get_profile_setting("backpressure_policy", DEFAULT_BACKPRESSURE_POLICY)
+            new_backend_name = snapshot.get_profile_setting("inference_backend", DEFAULT_INFERENCE_BACKEND)
+            quantization = snapshot.get_profile_setting("whisper_quantization", DEFAULT_WHISPER_QUANTIZATION)
             
-            app_logger.info(f"Transcriber: Ricarica impostazioni: Modello='{new_model_name}', Lingua='{new_language}', DebugAudio={self.enable_audio_debug_recording}")
+            app_logger.info(f"Transcriber: Ricarica impostazioni: Modello='{new_model_name}', Lingua='{new_language}', DebugAudio={self.enable_audio_debug_recording}, VAD='{new_vad_engine}', Backpressure='{backpressure_policy}', Motore='{new_backend_name}', Quantizzazione='{quantization}'")
+            self.inference_pipeline.set_backpressure_policy(backpressure_policy)
+
+            if new_backend_name != self.inference_backend_name:
+                self.backend.release()
+                self._release_degraded_backend()
+                self.backend = create_inference_backend(new_backend_name)
+                self.inference_backend_name = new_backend_name
+                self.current_model_name = None
+                app_logger.info(f"Transcriber: Motore di inferenza '{self.backend.name}' ({self.backend.capabilities()}).")
+            self.backend.apply_profile_settings(snapshot)
+
+            if new_vad_engine != self.vad_engine_name:
+                self.speech_detector = create_speech_detector(new_vad_engine)
+                self.vad_engine_name = new_vad_engine
 
             if new_model_name not in AVAILABLE_WHISPER_MODELS:
                 app_logger.warning(f"Modello Whisper '{new_model_name}' non valido. Uso default '{DEFAULT_WHISPER_MODEL}'.")
                 new_model_name = DEFAULT_WHISPER_MODEL
 
-            if self.model is None or self.current_model_name != new_model_name or self.current_language != new_language:
+            if self.backend.needs_reload: self._release_degraded_backend() # Anche il modello ridotto va riconvertito
+            # La lingua è solo un'opzione di transcribe(): cambiarla non richiede di ricaricare il modello.
+            if not self.backend.is_loaded or self.current_model_name != new_model_name or self.backend.needs_reload:
                 self._update_status(f"Caricamento modello Whisper '{new_model_name}' (lingua: {new_language})...")
-                app_logger.info(f"Transcriber: Inizio caricamento effettivo del modello '{new_model_name}' (da cache o download).") # <--- LOG AGGIUNTO QUI
+                app_logger.info(f"Transcriber: Richiesta modello '{new_model_name}' ({self.backend.name}) al registro dei modelli.")
                 try:
-                    self.model = whisper.load_model(new_model_name)
+                    self.backend.load(new_model_name)
                     self.current_model_name = new_model_name
                     self.current_language = new_language
                     app_logger.info(f"Transcriber: Modello '{self.current_model_name}' (lingua: {self.current_language}) caricato.")
@@ -86,104 +169,205 @@ class Transcriber:
                 except Exception as e:
                     app_logger.error(f"Transcriber: Fallimento caricamento modello '{new_model_name}': {e}", exc_info=True)
                     self._update_status(f"Errore caricamento modello: {str(e)[:100]}...")
-                    self.model = None
+                    self.backend.release()
                     self.current_model_name = None
                     self.current_language = None
+            elif self.current_language != new_language:
+                self.current_language = new_language
+                app_logger.info(f"Transcriber: Lingua cambiata in '{new_language}', modello '{self.current_model_name}' invariato.")
+                self._update_status(f"Modello '{self.current_model_name}' pronto.")
             else:
                 app_logger.info(f"Transcriber: Modello '{self.current_model_name}' (lingua: {self.current_language}) è già configurato.")
                 self._update_status(f"Modello '{self.current_model_name}' pronto.")
+
+            # Con "degrade" il modello ridotto serve proprio quando la coda è piena: va caricato ora,
+            # non sul worker di inferenza a coda già in ritardo. Con le altre politiche non serve tenerlo.
+            if self.inference_pipeline.backpressure_policy == BACKPRESSURE_DEGRADE:
+                if self.backend.is_loaded and self.current_model_name != BACKPRESSURE_DEGRADED_MODEL:
+                    self._get_degraded_backend()
+            else:
+                self._release_degraded_backend()
     
     # ... (TUTTO IL RESTO DEL CODICE DI TRANSCRIBER.PY RIMANE IDENTICO ALLA VERSIONE CHE TI HO FORNITO PRIMA - File 13 / ID 9r6vwm8k4cm93)
     # _start_debug_recording, _stop_debug_recording, _audio_callback, _process_audio_queue, start_listening, stop_listening, if __name__ == '__main__'
 
     def _start_debug_recording(self):
-        if self.enable_audio_debug_recording and not self.debug_audio_writer:
-            try:
-                debug_audio_dir = LOGS_DIR / "audio_debugs"
-                debug_audio_dir.mkdir(parents=True, exist_ok=True)
-                timestamp = datetime.now().strftime("%Y%m%d_%H%M%S_%f")
-                filename = debug_audio_dir / f"debug_audio_{timestamp}.wav"
-                self.debug_audio_writer = wave.open(str(filename), 'wb')
-                self.debug_audio_writer.setnchannels(AUDIO_CHANNELS)
-                self.debug_audio_writer.setsampwidth(2)
-                self.debug_audio_writer.setframerate(AUDIO_SAMPLE_RATE)
-                app_logger.info(f"Avviata registrazione audio di debug su: {filename}")
-            except Exception as e:
-                app_logger.error(f"Impossibile avviare registrazione audio di debug: {e}", exc_info=True)
-                self.debug_audio_writer = None
+        if self.enable_audio_debug_recording and not self.debug_recorder:
+            recorder = DebugAudioRecorder(LOGS_DIR / "audio_debugs")
+            if recorder.start(): self.debug_recorder = recorder
 
     def _stop_debug_recording(self):
-        if self.debug_audio_writer:
-            writer_to_close = self.debug_audio_writer
-            self.debug_audio_writer = None
-            try:
-                writer_to_close.close()
-                app_logger.info("Registrazione audio di debug fermata e file salvato.")
-            except Exception as e:
-                app_logger.error(f"Errore chiusura file WAV di debug: {e}", exc_info=True)
+        if self.debug_recorder:
+            recorder_to_stop = self.debug_recorder
+            self.debug_recorder = None # Il callback smette di passargli blocchi
+            recorder_to_stop.stop()
 
-    def _audio_callback(self, indata: np.ndarray, frames: int, time_info: Any, status: sd.CallbackFlags):
-        if status: app_logger.warning(f"Stato stream audio (callback): {status}")
+    def _audio_callback(self, indata: np.ndarray, frames: int, time_info: Any, status: Any):
+        # Thread real-time di PortAudio: solo copie in buffer preallocati e contatori, niente log né I/O.
+        if status:
+            if status.input_overflow: self.input_overflow_count += 1
+            if status.input_underflow: self.input_underflow_count += 1
         if self.is_listening:
-            self.audio_queue.put(indata.copy())
-            if self.enable_audio_debug_recording and self.debug_audio_writer:
-                try:
-                    audio_int16 = (indata.flatten() * 32767).astype(np.int16)
-                    self.debug_audio_writer.writeframes(audio_int16.tobytes())
-                except Exception as e:
-                    app_logger.error(f"Errore scrittura WAV di debug: {e}")
+            block_start = self.audio_ring.write(indata[:, 0])
+            if block_start is not None:
+                self.audio_queue.put((block_start, frames, time.monotonic()))
+            recorder = self.debug_recorder
+            if recorder is not None: recorder.push(indata[:, 0])
+
+    def _report_stream_status(self):
+        """Riporta (dal segmentatore) i flag di overflow/underflow contati dal callback."""
+        overflows = self.input_overflow_count - self._reported_input_overflows
+        underflows = self.input_underflow_count - self._reported_input_underflows
+        if not overflows and not underflows: return
+        self._reported_input_overflows += overflows; self._reported_input_underflows += underflows
+        if overflows: self._input_overflow_counter.inc(overflows)
+        if underflows: self._input_underflow_counter.inc(underflows)
+        app_logger.warning("Stream audio: %d overflow e %d underflow in ingresso (totale sessione: %d overflow).", overflows, underflows, self.input_overflow_count)
 
     def _process_audio_queue(self):
-        recorded_audio_chunks: List[np.ndarray] = []
-        last_speech_time = time.monotonic()
-        currently_processing_transcription = False
-        accumulated_audio_duration_for_interim = 0.0
-        app_logger.info("Thread di processamento audio avviato.")
-        while self.is_listening or not self.audio_queue.empty():
-            process_now = False; is_final_chunk_due_to_stop = False
+        """
+        Segmentatore: si sveglia solo all'arrivo di un blocco, allo stop (sentinella in coda) o alla
+        scadenza di un unico timer, attivo solo mentre c'è parlato nel buffer. Il timer scatta se dopo
+        l'ultimo blocco vocale non arriva audio per la soglia di silenzio (es. stream bloccato):
+        normalmente la fine dell'espressione è decisa dall'endpointer, in tempo audio, all'arrivo dei blocchi.
+        """
+        pending_samples = 0 # Campioni del segmento corrente già analizzati dal VAD (in testa al ring buffer)
+        endpointer = UtteranceEndpointer()
+        self.speech_detector.reset()
+        reported_overflows = self.audio_ring.overflow_count
+        speech_deadline: Optional[float] = None # Istante (monotonic) oltre il quale il parlato in attesa va chiuso
+        last_voiced_at: Optional[float] = None # Istante di cattura dell'ultimo blocco vocale del segmento
+        wakeups = 0; deadline_wakeups = 0
+        session_started_at = rate_window_started_at = time.monotonic(); rate_window_wakeups = 0
+        app_logger.info(f"Thread di processamento audio avviato (VAD: {self.speech_detector.name}).")
+        while True:
+            timeout = None if speech_deadline is None else max(0.0, speech_deadline - time.monotonic())
             try:
-                audio_chunk = self.audio_queue.get(block=True, timeout=0.05)
-                recorded_audio_chunks.append(audio_chunk)
-                current_chunk_duration = len(audio_chunk) / AUDIO_SAMPLE_RATE
-                accumulated_audio_duration_for_interim += current_chunk_duration
-                last_speech_time = time.monotonic()
-                self.audio_queue.task_done()
+                item = self.audio_queue.get(block=True, timeout=timeout)
             except queue.Empty:
-                if not self.is_listening and not recorded_audio_chunks: break
-                current_time = time.monotonic(); time_since_last_speech = current_time - last_speech_time
-                if self.is_listening and recorded_audio_chunks and not currently_processing_transcription:
-                    total_buffered_s = sum(len(chk) for chk in recorded_audio_chunks) / AUDIO_SAMPLE_RATE
-                    if time_since_last_speech > AUDIO_SILENCE_THRESHOLD_S and total_buffered_s >= AUDIO_MIN_SPEECH_FOR_SILENCE_S:
-                        process_now = True; app_logger.debug(f"Processo SILENZIO ({time_since_last_speech:.2f}s). Buffer: {total_buffered_s:.2f}s")
-                    elif accumulated_audio_duration_for_interim >= AUDIO_MAX_BUFFER_S_INTERIM:
-                        process_now = True; app_logger.debug(f"Processo BUFFER INTERMEDIO ({accumulated_audio_duration_for_interim:.2f}s).")
-                elif not self.is_listening and recorded_audio_chunks and not currently_processing_transcription:
-                    total_buffered_s = sum(len(chk) for chk in recorded_audio_chunks) / AUDIO_SAMPLE_RATE
-                    if total_buffered_s >= AUDIO_MIN_CHUNK_FOR_FINAL_S:
-                        process_now = True; is_final_chunk_due_to_stop = True; app_logger.debug(f"Processo STOP (residuo: {total_buffered_s:.2f}s).")
-                    else:
-                        recorded_audio_chunks = []; accumulated_audio_duration_for_interim = 0.0
+                item = _DEADLINE_EXPIRED
+            wakeups += 1; rate_window_wakeups += 1
+            self._wakeups_counter.inc()
+            now = time.monotonic()
+            if now - rate_window_started_at >= 1.0:
+                self._wakeups_rate_gauge.set(rate_window_wakeups / (now - rate_window_started_at))
+                rate_window_started_at = now; rate_window_wakeups = 0
+
+            process_now = False
+            if item is None: # Sentinella di stop_listening: lo stream è chiuso, non arriveranno altri blocchi
+                self.audio_queue.task_done()
+                if pending_samples and endpointer.has_speech and endpointer.buffered_s >= AUDIO_MIN_CHUNK_FOR_FINAL_S:
+                    app_logger.debug("Processo STOP (residuo: %.2fs).", endpointer.buffered_s)
+                    self._submit_pending(pending_samples, last_voiced_at)
+                elif pending_samples:
+                    self.audio_ring.discard(pending_samples)
+                break
+            if item is _DEADLINE_EXPIRED:
+                deadline_wakeups += 1; speech_deadline = None
+                self._deadline_wakeups_counter.inc()
+                if endpointer.voiced_s >= AUDIO_MIN_SPEECH_FOR_SILENCE_S:
+                    process_now = True; app_logger.debug("Processo SCADENZA: nessun audio per %.1fs dopo il parlato (%.2fs).", AUDIO_SILENCE_THRESHOLD_S, endpointer.buffered_s)
+                else:
+                    app_logger.debug("Scadenza senza parlato utile: scarto %.2fs.", endpointer.buffered_s)
+                    self.audio_ring.discard(pending_samples); pending_samples = 0; endpointer.reset(); last_voiced_at = None
+            else:
+                block_start, block_frames, captured_at = item
+                self.audio_queue.task_done()
+                self._block_wait_hist.observe(now - captured_at)
+                pending_samples += block_frames
+                # Solo i blocchi vocali azzerano il conteggio del silenzio (tempo audio, non orologio).
+                is_voiced = self.speech_detector.process(self.audio_ring.peek(block_start, block_frames))
+                if is_voiced:
+                    last_voiced_at = captured_at
+                    # Il blocco è appena arrivato: la sua fine è ~adesso. Il margine di un blocco evita di anticipare l'endpointer.
+                    speech_deadline = now + AUDIO_SILENCE_THRESHOLD_S + AUDIO_BLOCK_DURATION_S
+                decision = endpointer.push(block_frames / AUDIO_SAMPLE_RATE, is_voiced)
+                if decision == ENDPOINT_SILENCE:
+                    process_now = True; app_logger.debug("Processo SILENZIO (%.2fs). Buffer: %.2fs, parlato: %.2fs", endpointer.silence_run_s, endpointer.buffered_s, endpointer.voiced_s)
+                elif decision == ENDPOINT_MAX_BUFFER:
+                    process_now = True; app_logger.debug("Processo BUFFER INTERMEDIO (%.2fs).", endpointer.buffered_s)
+                elif decision == ENDPOINT_DISCARD:
+                    app_logger.debug("Scarto buffer senza parlato utile (%.2fs, parlato: %.2fs).", endpointer.buffered_s, endpointer.voiced_s)
+                    self.audio_ring.discard(pending_samples); pending_samples = 0; endpointer.reset(); speech_deadline = None; last_voiced_at = None
+                else:
+                    # Prima che inizi il parlato mantieni solo il pre-roll di silenzio.
+                    excess_samples = int(endpointer.leading_silence_excess_s() * AUDIO_SAMPLE_RATE)
+                    if excess_samples > 0:
+                        excess_samples = self.audio_ring.discard(min(excess_samples, pending_samples))
+                        pending_samples -= excess_samples; endpointer.discard_leading(excess_samples / AUDIO_SAMPLE_RATE)
+                if self.audio_ring.overflow_count != reported_overflows:
+                    app_logger.warning("Ring buffer audio pieno: %d blocchi persi.", self.audio_ring.overflow_count - reported_overflows)
+                    reported_overflows = self.audio_ring.overflow_count
+                self._report_stream_status()
             if process_now:
-                currently_processing_transcription = True
-                audio_np = np.concatenate(recorded_audio_chunks).astype(np.float32).flatten()
-                recorded_audio_chunks = []; accumulated_audio_duration_for_interim = 0.0
-                app_logger.info(f"Invio a Whisper: {len(audio_np)/AUDIO_SAMPLE_RATE:.2f}s di audio.")
-                initial_prompt_str = None
-                transcribe_options = {"language": self.current_language, "fp16": False, "temperature": DEFAULT_WHISPER_TEMPERATURE}
-                if initial_prompt_str: transcribe_options["initial_prompt"] = initial_prompt_str
+                self._submit_pending(pending_samples, last_voiced_at)
+                pending_samples = 0; endpointer.reset(); speech_deadline = None; last_voiced_at = None
+        self._report_stream_status()
+        session_s = time.monotonic() - session_started_at
+        if session_s > 0: self._wakeups_rate_gauge.set(wakeups / session_s)
+        app_logger.info(f"Thread di processamento audio (_process_audio_queue) terminato: {wakeups} risvegli in {session_s:.1f}s ({deadline_wakeups} per scadenza).")
+
+    def _submit_pending(self, pending_samples: int, speech_ended_at: Optional[float] = None):
+        # Vista contigua sul ring buffer (una sola copia solo se la regione fa il giro del buffer).
+        # La regione resta riservata finché la pipeline non la rilascia a trascrizione avvenuta.
+        audio_np, ring_token = self.audio_ring.take(pending_samples)
+        if speech_ended_at is not None:
+            # Dalla cattura dell'ultimo blocco vocale alla decisione di chiudere il segmento
+            self._segmentation_delay_hist.observe(time.monotonic() - speech_ended_at)
+        app_logger.info("Segmento in coda di inferenza: %.2fs di audio (in attesa: %d).", len(audio_np) / AUDIO_SAMPLE_RATE, self.inference_pipeline.depth)
+        self.inference_pipeline.submit(audio_np, ring_token, speech_ended_at)
+
+    def _get_degraded_backend(self) -> Optional[InferenceBackend]:
+        with self.degraded_backend_lock:
+            if self.degraded_backend is None:
+                app_logger.info(f"Caricamento modello ridotto '{BACKPRESSURE_DEGRADED_MODEL}' per la backpressure.")
+                degraded_backend = create_inference_backend(self.backend.name)
+                degraded_backend.apply_profile_settings(self.profile_manager.snapshot)
                 try:
-                    with self.model_lock:
-                        if not self.model:
-                            app_logger.error("Modello Whisper non disponibile in _process_audio_queue."); self._update_status("Errore: Modello non pronto."); currently_processing_transcription = False; continue
-                        result = self.model.transcribe(audio_np, **transcribe_options)
-                    transcribed_text = result["text"].strip()
-                    app_logger.info(f"Whisper ha trascritto: {repr(transcribed_text)}")
-                    if transcribed_text and self.on_transcription_callback: self.on_transcription_callback(transcribed_text)
-                except Exception as e: app_logger.error(f"Errore trascrizione Whisper: {e}", exc_info=True); self._update_status(f"Errore trascrizione: {str(e)[:70]}...")
-                finally: currently_processing_transcription = False
-            if is_final_chunk_due_to_stop and not recorded_audio_chunks: break
-            if not self.is_listening and self.audio_queue.empty() and not recorded_audio_chunks: break
-        app_logger.info("Thread di processamento audio (_process_audio_queue) terminato.")
+                    degraded_backend.load(BACKPRESSURE_DEGRADED_MODEL)
+                    self.degraded_backend = degraded_backend
+                except Exception as e: app_logger.error(f"Fallimento caricamento modello ridotto: {e}", exc_info=True)
+            return self.degraded_backend
+
+    def _release_degraded_backend(self):
+        with self.degraded_backend_lock:
+            if self.degraded_backend: self.degraded_backend.release()
+            self.degraded_backend = None
+
+    def _language_for_segment(self) -> Optional[str]:
+        """
+        Lingua per il prossimo segmento. Se il profilo è cambiato durante l'ascolto basta confrontare
+        il numero di versione: la lingua si aggiorna subito, il resto al prossimo ricaricamento.
+        """
+        snapshot = self.profile_manager.snapshot
+        if snapshot.version != self.settings_version and not snapshot.is_empty:
+            new_language = snapshot.get_profile_setting("language", DEFAULT_LANGUAGE)
+            if new_language != self.current_language:
+                app_logger.info(f"Transcriber: Lingua cambiata in '{new_language}' durante l'ascolto.")
+                self.current_language = new_language
+            self.settings_version = snapshot.version
+        return self.current_language
+
+    def _transcribe_segment(self, audio_np: np.ndarray, degraded: bool = False) -> str:
+        """Eseguito dai worker della pipeline di inferenza."""
+        initial_prompt_str = None
+        language = self._language_for_segment()
+        app_logger.debug("Invio a Whisper: %.2fs di audio%s.", len(audio_np) / AUDIO_SAMPLE_RATE, " (modello ridotto)" if degraded else "")
+        try:
+            backend = self._get_degraded_backend() if degraded and self.current_model_name != BACKPRESSURE_DEGRADED_MODEL else None
+            if backend is None:
+                backend = self.backend
+                if not backend.is_loaded:
+                    app_logger.error("Modello Whisper non disponibile in _transcribe_segment."); self._update_status("Errore: Modello non pronto."); return ""
+            transcribed_text = backend.transcribe_segment(audio_np, language, initial_prompt_str)
+            app_logger.debug("Whisper ha trascritto: %r", transcribed_text)
+            return transcribed_text
+        except Exception as e:
+            app_logger.error(f"Errore trascrizione Whisper: {e}", exc_info=True); self._update_status(f"Errore trascrizione: {str(e)[:70]}...")
+            return ""
+
+    def _emit_transcription(self, text: str, speech_ended_at: Optional[float] = None):
+        if self.on_transcription_callback: self.on_transcription_callback(text, speech_ended_at)
 
     def start_listening(self) -> bool:
         if self.is_listening: app_logger.warning("Ascolto già attivo."); return True
@@ -198,9 +382,15 @@ class Transcriber:
                 try: self.audio_queue.get_nowait()
                 except queue.Empty: break
                 self.audio_queue.task_done()
+            self.audio_ring.clear()
+            self.input_overflow_count = self.input_underflow_count = 0
+            self._reported_input_overflows = self._reported_input_underflows = 0
+            self.inference_pipeline.start()
             app_logger.info(f"Avvio stream audio su dispositivo ID: {self.selected_audio_device_id if self.selected_audio_device_id is not None else 'Default'}")
-            self.stream = sd.InputStream(device=self.selected_audio_device_id, samplerate=AUDIO_SAMPLE_RATE, channels=AUDIO_CHANNELS, dtype='float32', blocksize=int(AUDIO_SAMPLE_RATE * AUDIO_BLOCK_DURATION_S), callback=self._audio_callback)
+            stream_started_at = time.monotonic()
+            self.stream = self.stream_factory(device=self.selected_audio_device_id, samplerate=AUDIO_SAMPLE_RATE, channels=AUDIO_CHANNELS, dtype='float32', blocksize=int(AUDIO_SAMPLE_RATE * AUDIO_BLOCK_DURATION_S), callback=self._audio_callback)
             self.stream.start()
+            metrics.histogram("audio.stream_open_s").observe(time.monotonic() - stream_started_at)
             app_logger.info(f"Stream avviato su: {self.stream.device_name if hasattr(self.stream, 'device_name') else self.stream.device}")
             if not self.processing_thread or not self.processing_thread.is_alive():
                 app_logger.info("Avvio nuovo thread processamento audio.")
@@ -223,31 +413,47 @@ class Transcriber:
     def stop_listening(self):
         if not self.is_listening and not (hasattr(self, 'stream') and self.stream and self.stream.active):
             app_logger.info("Trascrittore non in ascolto o stream già fermo.")
-            if self.enable_audio_debug_recording: self._stop_debug_recording()
+            self._stop_debug_recording()
             if self.is_listening: self.is_listening = False
             return
         app_logger.info("Richiesta stop ascolto per Transcriber.")
         self._update_status("Arresto in corso...")
         self.is_listening = False
-        if self.enable_audio_debug_recording: self._stop_debug_recording()
+        self._stop_debug_recording()
         if hasattr(self, 'stream') and self.stream:
             stream_to_close = self.stream; self.stream = None
             try:
+                stream_closing_at = time.monotonic()
                 if stream_to_close.active: stream_to_close.stop(); app_logger.debug("Stream audio (sounddevice) stoppato.")
                 stream_to_close.close(); app_logger.info("Stream audio (sounddevice) chiuso.")
+                metrics.histogram("audio.stream_close_s").observe(time.monotonic() - stream_closing_at)
             except Exception as e: app_logger.error(f"Errore stop/chiusura stream: {e}", exc_info=True)
         if hasattr(self, 'processing_thread') and self.processing_thread and self.processing_thread.is_alive():
             app_logger.info("Attesa terminazione thread processamento audio...")
+            self.audio_queue.put(None) # Stream chiuso: la sentinella segue l'ultimo blocco in coda
             timeout_join = AUDIO_MAX_BUFFER_S_INTERIM + AUDIO_SILENCE_THRESHOLD_S + 2.0
             self.processing_thread.join(timeout=timeout_join)
             if self.processing_thread.is_alive(): app_logger.warning(f"Thread processamento audio non terminato (timeout {timeout_join}s).")
             else: app_logger.info("Thread processamento audio terminato.")
             self.processing_thread = None
+        # Il segmentatore ha accodato l'ultimo segmento: attendi che i worker trascrivano quelli in coda.
+        app_logger.info(f"Attesa trascrizione dei segmenti in coda ({self.inference_pipeline.depth})...")
+        if not self.inference_pipeline.stop(timeout=(self.inference_pipeline.depth + 1) * (AUDIO_MAX_BUFFER_S_INTERIM + 2.0)):
+            app_logger.warning("Pipeline di inferenza non svuotata entro il timeout.")
         self._update_status("Trascrizione Stoppata.")
         app_logger.info("Processo di stop_listening completato.")
 
+    def close(self):
+        """Ferma l'ascolto e restituisce i modelli al registro (restano in cache per il prossimo START)."""
+        if self.is_listening: self.stop_listening()
+        with self.model_lock:
+            self.backend.release()
+            self.current_model_name = None; self.current_language = None
+        self._release_degraded_backend()
+
 if __name__ == '__main__':
     app_logger.info("Avvio test Transcriber standalone (versione riscritta)...")
+    from src.core.profile_snapshot import ProfileSnapshot
     class MockProfileManager:
         def __init__(self):
             self.current_profile_data = {
@@ -255,13 +461,14 @@ if __name__ == '__main__':
                 "vocabulary": ["TrascriviPro", "PyQt6", "Supercalifragilistichespiralidoso"], "macros": {}, "pronunciation_rules": {}
             }
             self.global_app_preferences = {"selected_audio_device_id": None}
+            self.snapshot = ProfileSnapshot("profilo_test_standalone", self.current_profile_data["settings"], {}, {}, 0)
         def get_profile_setting(self, key, default): return self.current_profile_data["settings"].get(key, default)
         def get_vocabulary(self): return self.current_profile_data["vocabulary"]
         def get_current_profile_display_name(self): return self.current_profile_data["settings"].get("display_name")
         def get_global_preference(self, key, default=None): return self.global_app_preferences.get(key, default)
     mock_pm = MockProfileManager()
     all_transcriptions: List[str] = []
-    def transcription_received_callback(text: str): print(f"\n>>> TRASCRIZIONE RICEVUTA (TEST): {repr(text)}\n"); all_transcriptions.append(text)
+    def transcription_received_callback(text: str, speech_ended_at: Optional[float] = None): print(f"\n>>> TRASCRIZIONE RICEVUTA (TEST): {repr(text)}\n"); all_transcriptions.append(text)
     def status_update_callback(status: str): print(f"--- STATO TRASCRITTORE (TEST): {status} ---")
     try:
         if not LOGS_DIR.exists(): LOGS_DIR.mkdir(parents=True, exist_ok=True)
@@ -0,0 +1,179 @@
+# src/core/transcription_engine.py
+import queue
+import time
+from threading import Thread
+from typing import Callable, Optional, Tuple
+
+from src.utils.logger import app_logger
+from src.utils.metrics import metrics
+from src.core.profile_manager import ProfileManager
+from src.core.transcriber import Transcriber
+
+# Comandi accettati dal worker
+COMMAND_START = "start"
+COMMAND_STOP = "stop"
+COMMAND_RECONFIGURE = "reconfigure"  # Ricarica modello e impostazioni dal profilo (se non in ascolto)
+COMMAND_SHUTDOWN = "shutdown"
+
+
+class TranscriptionEngine:
+    """
+    Worker persistente della dettatura: possiede il Transcriber (modello, stream audio, pipeline
+    di inferenza) per tutta la vita dell'applicazione ed esegue i comandi ricevuti in coda, uno alla
+    volta e nell'ordine di invio. Tra un comando e l'altro resta bloccato sulla coda, senza polling.
+
+    Il modello resta caricato tra una sessione e l'altra: START e STOP costano l'apertura e la
+    chiusura dello stream audio (più, allo STOP, la trascrizione dei segmenti ancora in coda).
+    I callback vengono chiamati dal thread del worker.
+    """
+
+    def __init__(self, profile_manager: ProfileManager,
+                 on_transcription: Optional[Callable[[str, Optional[float]], None]] = None,
+                 on_status: Optional[Callable[[str], None]] = None,
+                 on_started: Optional[Callable[[bool, str], None]] = None,
+                 on_stopped: Optional[Callable[[], None]] = None,
+                 on_error: Optional[Callable[[str], None]] = None):
+        self.profile_manager = profile_manager
+        self.on_transcription = on_transcription
+        self.on_status = on_status
+        self.on_started = on_started
+        self.on_stopped = on_stopped
+        self.on_error = on_error
+
+        # (comando, istante di invio)
+        self._commands: queue.Queue[Tuple[str, float]] = queue.Queue()
+        self._worker: Optional[Thread] = None
+        self.transcriber: Optional[Transcriber] = None
+        self._active = False # Sessione richiesta o in corso (da request_start a on_stopped)
+
+        self._start_latency_hist = metrics.histogram("engine.start_latency_s")
+        self._stop_latency_hist = metrics.histogram("engine.stop_latency_s")
+
+    @property
+    def is_active(self) -> bool:
+        return self._active
+
+    @property
+    def is_running(self) -> bool:
+        return self._worker is not None and self._worker.is_alive()
+
+    def start(self):
+        if self.is_running: return
+        self._worker = Thread(target=self._run, name="TranscriptionEngine", daemon=True)
+        self._worker.start()
+
+    def request_start(self):
+        self._active = True
+        self._send(COMMAND_START)
+
+    def request_stop(self):
+        self._send(COMMAND_STOP)
+
+    def request_reconfigure(self):
+        self._send(COMMAND_RECONFIGURE)
+
+    def shutdown(self, timeout: Optional[float] = None) -> bool:
+        """Ferma l'ascolto, rilascia il modello e termina il worker. True se il worker è terminato."""
+        if not self.is_running: return True
+        self._send(COMMAND_SHUTDOWN)
+        self._worker.join(timeout)
+        return not self._worker.is_alive()
+
+    def _send(self, command: str):
+        app_logger.debug(f"TranscriptionEngine: Comando '{command}' in coda.")
+        self._commands.put((command, time.monotonic()))
+
+    def _run(self):
+        app_logger.info("TranscriptionEngine: Worker avviato.")
+        while True:
+            command, sent_at = self._commands.get()
+            try:
+                if command == COMMAND_START: self._handle_start(sent_at)
+                elif command == COMMAND_STOP: self._handle_stop(sent_at)
+                elif command == COMMAND_RECONFIGURE: self._handle_reconfigure()
+                elif command == COMMAND_SHUTDOWN:
+                    self._handle_shutdown()
+                    break
+                else: app_logger.warning(f"TranscriptionEngine: Comando sconosciuto '{command}'.")
+            except Exception as e:
+                error_msg = f"Errore critico nel motore di trascrizione: {e}"
+                app_logger.critical(f"TranscriptionEngine: {error_msg}", exc_info=True)
+                if self.on_error: self.on_error(error_msg)
+                self._abort_session()
+        app_logger.info("TranscriptionEngine: Worker terminato.")
+
+    def _ensure_transcriber(self) -> Transcriber:
+        # Creato dal worker al primo comando: il caricamento del modello non blocca chi invia i comandi
+        if self.transcriber is None:
+            self.transcriber = Transcriber(
+                profile_manager=self.profile_manager,
+                on_transcription_callback=self._emit_transcription,
+                on_status_update_callback=self._emit_status
+            )
+        return self.transcriber
+
+    def _handle_start(self, sent_at: float):
+        if self.transcriber is not None and self.transcriber.is_listening:
+            app_logger.warning("TranscriptionEngine: START ignorato, ascolto già attivo.")
+            return
+        transcriber = self._ensure_transcriber()
+        if not transcriber.start_listening():
+            if not transcriber.model:
+                profile_name = self.profile_manager.get_current_profile_display_name() or "Sconosciuto"
+                error_msg = f"Modello Whisper non caricato per profilo '{profile_name}'. Trascrizione impossibile."
+            else:
+                error_msg = "Fallimento avvio ascolto microfono. Controlla permessi e dispositivo audio."
+            app_logger.error(f"TranscriptionEngine: {error_msg}")
+            self._active = False
+            if self.on_started: self.on_started(False, error_msg)
+            if self.on_stopped: self.on_stopped()
+            return
+        start_latency = time.monotonic() - sent_at
+        self._start_latency_hist.observe(start_latency)
+        app_logger.info(f"TranscriptionEngine: Ascolto avviato in {start_latency * 1000:.1f} ms.")
+        if self.on_started: self.on_started(True, "Ascolto avviato...")
+
+    def _handle_stop(self, sent_at: float):
+        if self.transcriber is None or not self.transcriber.is_listening:
+            app_logger.info("TranscriptionEngine: STOP ignorato, nessun ascolto attivo.")
+            return
+        self.transcriber.stop_listening()
+        stop_latency = time.monotonic() - sent_at
+        self._stop_latency_hist.observe(stop_latency)
+        app_logger.info(f"TranscriptionEngine: Ascolto fermato in {stop_latency * 1000:.1f} ms.")
+        self._active = False
+        if self.on_stopped: self.on_stopped()
+
+    def _handle_reconfigure(self):
+        if self.transcriber is None:
+            self._ensure_transcriber() # Il costruttore carica già modello e impostazioni
+        elif self.transcriber.is_listening:
+            # Modello e opzioni audio si applicano al prossimo START (la lingua segue già lo snapshot)
+            app_logger.info("TranscriptionEngine: Riconfigurazione rimandata al prossimo START.")
+        else:
+            self.transcriber.reload_model_and_settings()
+
+    def _handle_shutdown(self):
+        if self.transcriber is not None:
+            if self.transcriber.is_listening:
+                self.transcriber.stop_listening()
+            # Il modello torna al registro condiviso
+            self.transcriber.close()
+        if self._active:
+            self._active = False
+            if self.on_stopped: self.on_stopped()
+
+    def _abort_session(self):
+        """Dopo un errore imprevisto: chiude lo stream e notifica la fine della sessione."""
+        if self.transcriber is not None and self.transcriber.is_listening:
+            try: self.transcriber.stop_listening()
+            except Exception as e: app_logger.error(f"TranscriptionEngine: Errore arresto dopo errore: {e}", exc_info=True)
+        if self._active:
+            self._active = False
+            if self.on_stopped: self.on_stopped()
+
+    def _emit_transcription(self, text: str, speech_ended_at: Optional[float] = None):
+        if self.on_transcription: self.on_transcription(text, speech_ended_at)
+
+    def _emit_status(self, message: str):
+        if self.on_status: self.on_status(message)
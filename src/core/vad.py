@@ -0,0 +1,273 @@
+# src/core/vad.py
+from abc import ABC, abstractmethod
+
+import numpy as np
+from typing import Optional, Callable, Dict
+
+from src.config import (
+    AUDIO_SAMPLE_RATE, AUDIO_BLOCK_DURATION_S,
+    AUDIO_SILENCE_THRESHOLD_S, AUDIO_MAX_BUFFER_S_INTERIM, AUDIO_MIN_SPEECH_FOR_SILENCE_S,
+    DEFAULT_VAD_ENGINE, AUDIO_VAD_FRAME_S, AUDIO_VAD_ENERGY_RATIO, AUDIO_VAD_MIN_ENERGY,
+    AUDIO_VAD_NOISE_FLOOR_INIT, AUDIO_VAD_NOISE_RISE_RATE, AUDIO_VAD_NOISE_FALL_RATE,
+    AUDIO_VAD_MIN_VOICED_RATIO, AUDIO_VAD_HANGOVER_S, AUDIO_VAD_PREROLL_S,
+    AUDIO_VAD_WEBRTC_AGGRESSIVENESS
+)
+from src.utils.logger import app_logger
+
+# Decisioni restituite da UtteranceEndpointer.push()
+ENDPOINT_SILENCE = "silenzio"      # Fine espressione: silenzio dopo parlato sufficiente
+ENDPOINT_MAX_BUFFER = "buffer"     # Buffer intermedio pieno: trascrivi anche senza pausa
+ENDPOINT_DISCARD = "scarta"        # Solo rumore/parlato troppo breve seguito da silenzio
+
+
+class SpeechDetector(ABC):
+    """
+    Interfaccia comune dei rilevatori di voce.
+    Le sottoclassi devono implementare _classify(); process() aggiunge l'hangover comune.
+    """
+    name = "base"
+
+    def __init__(self, sample_rate: int = AUDIO_SAMPLE_RATE, hangover_s: float = AUDIO_VAD_HANGOVER_S):
+        self.sample_rate = sample_rate
+        self.hangover_s = hangover_s
+        self._hangover_left_s = 0.0
+        self.last_block_was_raw_voiced = False
+
+    def reset(self):
+        self._hangover_left_s = 0.0
+        self.last_block_was_raw_voiced = False
+
+    @abstractmethod
+    def _classify(self, samples: np.ndarray) -> bool:
+        """True se il blocco (senza hangover) contiene parlato."""
+
+    def process(self, block: np.ndarray) -> bool:
+        """Classifica un blocco audio (mono, float32). True se il blocco va considerato parlato."""
+        samples = np.asarray(block, dtype=np.float32).reshape(-1)
+        if samples.size == 0:
+            return self._hangover_left_s > 0
+        is_voiced = self._classify(samples)
+        self.last_block_was_raw_voiced = is_voiced
+        if is_voiced:
+            self._hangover_left_s = self.hangover_s
+            return True
+        if self._hangover_left_s > 0:
+            self._hangover_left_s -= samples.size / self.sample_rate
+            return True
+        return False
+
+
+class EnergyVAD(SpeechDetector):
+    """
+    VAD basato sull'energia RMS per frame, calcolata in modo vettoriale sull'intero blocco,
+    con rumore di fondo adattivo (minimo per blocco, salita lenta e discesa rapida).
+    """
+    name = "energy"
+
+    def __init__(self, sample_rate: int = AUDIO_SAMPLE_RATE, frame_s: float = AUDIO_VAD_FRAME_S,
+                 energy_ratio: float = AUDIO_VAD_ENERGY_RATIO, min_energy: float = AUDIO_VAD_MIN_ENERGY,
+                 min_voiced_ratio: float = AUDIO_VAD_MIN_VOICED_RATIO,
+                 hangover_s: float = AUDIO_VAD_HANGOVER_S):
+        super().__init__(sample_rate, hangover_s)
+        self.frame_len = max(1, int(sample_rate * frame_s))
+        self.energy_ratio = energy_ratio
+        self.min_energy = min_energy
+        self.min_voiced_ratio = min_voiced_ratio
+        self.noise_floor = AUDIO_VAD_NOISE_FLOOR_INIT
+        self.last_block_rms = 0.0
+
+    def reset(self):
+        super().reset()
+        self.noise_floor = AUDIO_VAD_NOISE_FLOOR_INIT
+        self.last_block_rms = 0.0
+
+    def frame_rms(self, samples: np.ndarray) -> np.ndarray:
+        n_frames = samples.size // self.frame_len
+        if n_frames == 0:
+            frames = samples.reshape(1, -1)
+        else:
+            frames = samples[:n_frames * self.frame_len].reshape(n_frames, self.frame_len)
+        # einsum evita di allocare il quadrato dell'intero blocco
+        energy = np.einsum('ij,ij->i', frames, frames) / frames.shape[1]
+        return np.sqrt(energy)
+
+    def _classify(self, samples: np.ndarray) -> bool:
+        rms = self.frame_rms(samples)
+        self.last_block_rms = float(np.sqrt(np.mean(np.square(rms))))
+        threshold = max(self.noise_floor * self.energy_ratio, self.min_energy)
+        voiced_ratio = np.count_nonzero(rms > threshold) / rms.size
+
+        # Il minimo per blocco segue il rumore anche durante il parlato continuo
+        # (pause tra sillabe); con rumore costante più alto il livello sale lentamente.
+        block_floor = float(rms.min())
+        rate = AUDIO_VAD_NOISE_RISE_RATE if block_floor > self.noise_floor else AUDIO_VAD_NOISE_FALL_RATE
+        self.noise_floor += rate * (block_floor - self.noise_floor)
+        return voiced_ratio >= self.min_voiced_ratio
+
+
+class WebRtcVAD(SpeechDetector):
+    """Rilevatore basato sul modello di WebRTC (pacchetto opzionale 'webrtcvad')."""
+    name = "webrtc"
+
+    def __init__(self, sample_rate: int = AUDIO_SAMPLE_RATE, frame_s: float = AUDIO_VAD_FRAME_S,
+                 aggressiveness: int = AUDIO_VAD_WEBRTC_AGGRESSIVENESS,
+                 min_voiced_ratio: float = AUDIO_VAD_MIN_VOICED_RATIO,
+                 hangover_s: float = AUDIO_VAD_HANGOVER_S):
+        import webrtcvad  # Dipendenza opzionale: ImportError gestito da create_speech_detector
+        super().__init__(sample_rate, hangover_s)
+        self._vad = webrtcvad.Vad(aggressiveness)
+        self.frame_len = int(sample_rate * frame_s)
+        self.min_voiced_ratio = min_voiced_ratio
+
+    def _classify(self, samples: np.ndarray) -> bool:
+        n_frames = samples.size // self.frame_len
+        if n_frames == 0:
+            return False
+        pcm = (np.clip(samples[:n_frames * self.frame_len], -1.0, 1.0) * 32767).astype('<i2')
+        frames = pcm.reshape(n_frames, self.frame_len)
+        voiced = sum(1 for frame in frames if self._vad.is_speech(frame.tobytes(), self.sample_rate))
+        return voiced / n_frames >= self.min_voiced_ratio
+
+
+_SPEECH_DETECTOR_FACTORIES: Dict[str, Callable[[], SpeechDetector]] = {
+    EnergyVAD.name: EnergyVAD,
+    WebRtcVAD.name: WebRtcVAD,
+}
+
+
+def register_speech_detector(name: str, factory: Callable[[], SpeechDetector]):
+    """Permette di aggiungere rilevatori basati su altri modelli (es. Silero) senza toccare il Transcriber."""
+    _SPEECH_DETECTOR_FACTORIES[name] = factory
+
+
+def create_speech_detector(engine_name: Optional[str] = None) -> SpeechDetector:
+    engine_name = engine_name or DEFAULT_VAD_ENGINE
+    factory = _SPEECH_DETECTOR_FACTORIES.get(engine_name)
+    if factory is None:
+        app_logger.warning(f"Motore VAD '{engine_name}' sconosciuto. Uso '{EnergyVAD.name}'.")
+        return EnergyVAD()
+    try:
+        return factory()
+    except ImportError as e:
+        app_logger.warning(f"Motore VAD '{engine_name}' non disponibile ({e}). Uso '{EnergyVAD.name}'.")
+        return EnergyVAD()
+
+
+class UtteranceEndpointer:
+    """
+    Tiene il conto (in tempo audio, non in tempo di orologio) di quanto audio, parlato e
+    silenzio sono nel buffer corrente e decide quando un'espressione è conclusa.
+    Lavorare in tempo audio rende le decisioni identiche in tempo reale e in replay accelerato.
+    """
+
+    def __init__(self, silence_threshold_s: float = AUDIO_SILENCE_THRESHOLD_S,
+                 max_buffer_s: float = AUDIO_MAX_BUFFER_S_INTERIM,
+                 min_speech_s: float = AUDIO_MIN_SPEECH_FOR_SILENCE_S,
+                 preroll_s: float = AUDIO_VAD_PREROLL_S):
+        self.silence_threshold_s = silence_threshold_s
+        self.max_buffer_s = max_buffer_s
+        self.min_speech_s = min_speech_s
+        self.preroll_s = preroll_s
+        self.reset()
+
+    def reset(self):
+        self.buffered_s = 0.0
+        self.voiced_s = 0.0
+        self.silence_run_s = 0.0
+
+    @property
+    def has_speech(self) -> bool:
+        return self.voiced_s > 0
+
+    def push(self, duration_s: float, is_voiced: bool) -> Optional[str]:
+        self.buffered_s += duration_s
+        if is_voiced:
+            self.voiced_s += duration_s
+            self.silence_run_s = 0.0
+        else:
+            self.silence_run_s += duration_s
+
+        if self.has_speech and self.silence_run_s >= self.silence_threshold_s:
+            return ENDPOINT_SILENCE if self.voiced_s >= self.min_speech_s else ENDPOINT_DISCARD
+        if self.buffered_s >= self.max_buffer_s:
+            return ENDPOINT_MAX_BUFFER if self.has_speech else ENDPOINT_DISCARD
+        return None
+
+    def leading_silence_excess_s(self) -> float:
+        """Secondi di silenzio iniziale oltre il pre-roll, scartabili prima che inizi il parlato."""
+        if self.has_speech:
+            return 0.0
+        return max(0.0, self.buffered_s - self.preroll_s)
+
+    def discard_leading(self, duration_s: float):
+        self.buffered_s = max(0.0, self.buffered_s - duration_s)
+        if not self.has_speech:
+            self.silence_run_s = min(self.silence_run_s, self.buffered_s)
+
+
+def measure_endpoint_latency(audio: np.ndarray, engine_name: Optional[str] = None,
+                             block_duration_s: float = AUDIO_BLOCK_DURATION_S) -> Dict[str, list]:
+    """
+    Riproduce l'audio (mono float32 a AUDIO_SAMPLE_RATE, come quello del microfono) a blocchi
+    attraverso VAD + endpointer e misura, per ogni espressione, il ritardo tra la fine del parlato
+    e la decisione di fine espressione.
+    Per confronto calcola anche il ritardo della vecchia logica (taglio solo a buffer pieno).
+    """
+    detector = create_speech_detector(engine_name)
+    sample_rate = detector.sample_rate # Frame e hangover del rilevatore sono calcolati su questa frequenza
+    endpointer = UtteranceEndpointer()
+    block_len = int(sample_rate * block_duration_s)
+    stream_pos_s = 0.0
+    last_raw_voiced_end_s: Optional[float] = None
+    buffer_start_s = 0.0
+    results: Dict[str, list] = {"vad_latency_s": [], "legacy_latency_s": [], "decisions": []}
+
+    for start in range(0, len(audio) - block_len + 1, block_len):
+        block = audio[start:start + block_len]
+        is_voiced = detector.process(block)
+        stream_pos_s += block_len / sample_rate
+        if detector.last_block_was_raw_voiced:
+            last_raw_voiced_end_s = stream_pos_s
+        decision = endpointer.push(block_len / sample_rate, is_voiced)
+        if decision is None:
+            excess = endpointer.leading_silence_excess_s()
+            if excess >= block_duration_s:
+                endpointer.discard_leading(excess)
+                buffer_start_s += excess
+            continue
+        results["decisions"].append((round(stream_pos_s, 2), decision))
+        if decision == ENDPOINT_SILENCE and last_raw_voiced_end_s is not None:
+            results["vad_latency_s"].append(stream_pos_s - last_raw_voiced_end_s)
+            # Vecchia logica: ogni blocco azzerava il timer, si aspettava sempre il buffer pieno.
+            legacy_cut_s = buffer_start_s + AUDIO_MAX_BUFFER_S_INTERIM
+            while legacy_cut_s < last_raw_voiced_end_s:
+                legacy_cut_s += AUDIO_MAX_BUFFER_S_INTERIM
+            results["legacy_latency_s"].append(legacy_cut_s - last_raw_voiced_end_s)
+        endpointer.reset()
+        buffer_start_s = stream_pos_s
+    return results
+
+
+if __name__ == '__main__':
+    import argparse
+    from src.utils.audio_files import read_wav_mono
+
+    parser = argparse.ArgumentParser(description="Misura la latenza di fine espressione del VAD su un file WAV.")
+    parser.add_argument("wav_file", help="File WAV 16 bit (ricampionato a 16 kHz, primo canale)")
+    parser.add_argument("--engine", default=DEFAULT_VAD_ENGINE, help="Motore VAD (energy, webrtc)")
+    args = parser.parse_args()
+
+    try:
+        samples_f32, _ = read_wav_mono(args.wav_file)
+    except ValueError as e:
+        raise SystemExit(str(e))
+
+    report = measure_endpoint_latency(samples_f32, args.engine)
+    print(f"Decisioni (istante, tipo): {report['decisions']}")
+    if report["vad_latency_s"]:
+        print(f"Latenza fine espressione VAD:   media {np.mean(report['vad_latency_s']):.2f}s, "
+              f"max {np.max(report['vad_latency_s']):.2f}s su {len(report['vad_latency_s'])} espressioni")
+        print(f"Latenza vecchia logica (buffer): media {np.mean(report['legacy_latency_s']):.2f}s, "
+              f"max {np.max(report['legacy_latency_s']):.2f}s")
+    else:
+        print("Nessuna fine espressione per silenzio rilevata.")
@@ -1,104 +1,84 @@
 # src/gui/main_window.py
 import sys
-import logging
+import time
 from PyQt6.QtWidgets import (
     QApplication, QMainWindow, QWidget, QVBoxLayout, QHBoxLayout, QPushButton,
     QLabel, QTextEdit, QComboBox, QStatusBar, QMenuBar, QMessageBox,
     QFileDialog, QGroupBox
 )
 from PyQt6.QtGui import QAction, QFont, QCloseEvent
-from PyQt6.QtCore import Qt, QThread, pyqtSignal, QTimer, QObject, QDateTime # Aggiunto QObject
+from PyQt6.QtCore import Qt, pyqtSignal, QTimer, QObject, QDateTime
 
 from src.config import (
     APP_NAME, VERSION,
     COMMAND_STOP_RECORDING,
-    INTERNAL_EDITOR_ENABLED_DEFAULT, LOG_LEVEL
+    INTERNAL_EDITOR_ENABLED_DEFAULT, DEFAULT_EXTERNAL_OUTPUT_MODE, LOG_LEVEL,
+    LOGS_DIR, METRICS_DUMP_FILENAME, METRICS_STATUS_REFRESH_MS
 )
-from src.utils.logger import app_logger
+from src.utils.logger import app_logger, set_log_level
 from src.core.profile_manager import ProfileManager
-from src.core.transcriber import Transcriber
+from src.core.profile_events import (
+    ProfileChangeEvent, CHANGE_PROFILE, CHANGE_DISPLAY_NAME, CHANGE_MODEL, CHANGE_LANGUAGE,
+    CHANGE_AUDIO, CHANGE_OUTPUT, CHANGE_RULES, CHANGE_VOCABULARY, CHANGE_AUDIO_DEVICE
+)
+from src.core.transcription_engine import TranscriptionEngine
 from src.core.text_processor import TextProcessor
 from src.core.output_handler import OutputHandler
+from src.core.output_pipeline import OutputPipeline
 from src.gui.profile_dialogs import ProfileManagementDialog, ProfileSettingsDialog, AppSettingsDialog
-
-from typing import Optional
-
-# --- Thread di Trascrizione ---
-class TranscriptionThread(QThread):
-    new_transcription = pyqtSignal(str)
+from src.utils.metrics import metrics, MetricsDumper
+
+from typing import List, Optional
+
+# --- Worker di Trascrizione ---
+class TranscriptionWorker(QObject):
+    """
+    Ponte Qt verso TranscriptionEngine, il worker persistente che possiede modello, stream e
+    pipeline: i comandi vanno in coda al worker, i suoi callback diventano segnali consegnati
+    al thread della GUI.
+    """
+    new_transcription = pyqtSignal(str, object) # (testo, istante di fine parlato o None)
     status_update = pyqtSignal(str)
     error_signal = pyqtSignal(str)
     initialization_complete = pyqtSignal(bool, str)
-    # finished = pyqtSignal() # Standard di QThread, non serve dichiararlo qui se non per type hinting
+    listening_stopped = pyqtSignal()
 
-    def __init__(self, profile_manager: ProfileManager, parent: Optional[QObject] = None): # QObject per parent
+    def __init__(self, profile_manager: ProfileManager, parent: Optional[QObject] = None):
         super().__init__(parent)
-        self.profile_manager = profile_manager
-        self.is_running_flag = False 
-        self.transcriber_instance: Optional[Transcriber] = None
-        self._initialization_has_failed = False # Flag per tracciare fallimento init
-
-    def run(self):
-        self.is_running_flag = True
-        self._initialization_has_failed = False # Resetta all'inizio di run
-        app_logger.info("TranscriptionThread: run() avviato. Inizializzazione Transcriber...")
-        try:
-            app_logger.debug("TranscriptionThread: Creazione nuova istanza Transcriber.")
-            self.transcriber_instance = Transcriber(
-                profile_manager=self.profile_manager,
-                on_transcription_callback=self.new_transcription.emit,
-                on_status_update_callback=self.status_update.emit
-            )
-            
-            if not self.transcriber_instance.model:
-                profile_name = self.profile_manager.get_current_profile_display_name() or "Sconosciuto"
-                error_msg = f"Modello Whisper non caricato per profilo '{profile_name}'. Trascrizione impossibile."
-                app_logger.error(f"TranscriptionThread: {error_msg}")
-                self.initialization_complete.emit(False, error_msg)
-                self._initialization_has_failed = True # Segna fallimento
-                return 
-
-            app_logger.info("TranscriptionThread: Transcriber inizializzato e modello pronto.")
-            if not self.transcriber_instance.start_listening():
-                mic_error_msg = "Fallimento avvio ascolto microfono. Controlla permessi e dispositivo audio."
-                app_logger.error(f"TranscriptionThread: {mic_error_msg}")
-                self.initialization_complete.emit(False, mic_error_msg) 
-                self._initialization_has_failed = True # Segna fallimento
-                return
-            
-            self.initialization_complete.emit(True, "Ascolto avviato...")
-            
-            while self.is_running_flag:
-                self.msleep(100) # Loop principale del thread, controlla is_running_flag
-
-        except RuntimeError as e: # Es. problemi specifici di librerie come sounddevice
-            error_msg = f"Errore di runtime in TranscriptionThread: {e}"
-            app_logger.critical(f"TranscriptionThread: {error_msg}", exc_info=True)
-            self.initialization_complete.emit(False, error_msg) # Notifica fallimento init
-            self._initialization_has_failed = True
-        except Exception as e: # Qualsiasi altra eccezione
-            error_msg = f"Errore critico in TranscriptionThread: {e}"
-            app_logger.critical(f"TranscriptionThread: {error_msg}", exc_info=True)
-            # Se l'init era già passata, emetti error_signal, altrimenti initialization_complete(False)
-            if not self._initialization_has_failed: # Se l'errore avviene dopo un'inizializzazione ok
-                self.error_signal.emit(error_msg)
-            else: # Se l'errore avviene durante l'inizializzazione (o dopo un fallimento già emesso)
-                 self.initialization_complete.emit(False, error_msg)
-            self._initialization_has_failed = True
-        finally:
-            if self.transcriber_instance and self.transcriber_instance.is_listening:
-                app_logger.info("TranscriptionThread: Finally - Assicuro stop di Transcriber.")
-                self.transcriber_instance.stop_listening()
-            self.is_running_flag = False # Assicura che il flag sia Falso all'uscita
-            app_logger.info("TranscriptionThread: Metodo run() concluso.")
-            # Il segnale 'finished' viene emesso automaticamente da QThread quando run() termina.
+        self.engine = TranscriptionEngine(
+            profile_manager,
+            on_transcription=self.new_transcription.emit,
+            on_status=self.status_update.emit,
+            on_started=self.initialization_complete.emit,
+            on_stopped=self.listening_stopped.emit,
+            on_error=self.error_signal.emit
+        )
+        self.engine.start()
+
+    def is_listening(self) -> bool:
+        """True da START fino alla fine della sessione (anche durante avvio e arresto)."""
+        return self.engine.is_active
+
+    def start_listening(self):
+        self.engine.request_start()
 
     def request_stop(self):
-        app_logger.info("TranscriptionThread: Ricevuta richiesta di stop (imposto is_running_flag = False).")
-        self.is_running_flag = False # Il loop in run() rileverà questo
+        app_logger.info("TranscriptionWorker: Richiesta di stop inviata al motore.")
+        self.engine.request_stop()
+
+    def reconfigure(self):
+        """Carica in background modello e impostazioni del profilo attivo, così START non attende."""
+        self.engine.request_reconfigure()
+
+    def shutdown(self, timeout: Optional[float] = None) -> bool:
+        return self.engine.shutdown(timeout)
 
 # --- Finestra Principale ---
 class MainWindow(QMainWindow):
+    # Emesso dal worker di output: (testi elaborati, da inserire nell'editor interno, istante di emissione,
+    # istanti di fine parlato per la latenza end-to-end, misurata qui dopo l'inserimento nell'editor)
+    output_batch_ready = pyqtSignal(list, bool, float, list)
+
     def __init__(self, profile_manager: ProfileManager):
         super().__init__()
         self.setWindowTitle(f"{APP_NAME} - v{VERSION}")
@@ -108,9 +88,17 @@ class MainWindow(QMainWindow):
         self.text_processor = TextProcessor(self.profile_manager)
         self.internal_editor_widget = QTextEdit()
         self.output_handler = OutputHandler(internal_editor_widget=self.internal_editor_widget)
+        # TextProcessor e OutputHandler girano sul worker di output, non sul thread della GUI:
+        # solo l'inserimento nell'editor interno torna alla GUI (a blocchi) tramite output_batch_ready.
+        self.output_batch_ready.connect(self._insert_output_batch)
+        self.output_pipeline = OutputPipeline(self.text_processor.process_text, self._deliver_output_batch)
+        self.output_pipeline.start()
         
-        self.transcription_thread: Optional[TranscriptionThread] = None
+        # Un solo worker per tutta la vita della finestra: START/STOP sono comandi, non nuovi thread.
+        self.transcription_worker = TranscriptionWorker(profile_manager=self.profile_manager, parent=self)
         self._is_operation_in_progress = False # Flag per prevenire operazioni UI sovrapposte
+        self._start_requested_at: Optional[float] = None # Per misurare il tempo al primo testo dopo START
+        self._restart_after_stop = False # Riavvio automatico dell'ascolto (es. dispositivo audio cambiato)
 
         self.loading_spinner_timer = QTimer(self)
         self.loading_spinner_timer.timeout.connect(self._update_loading_spinner)
@@ -120,10 +108,23 @@ class MainWindow(QMainWindow):
 
         self.status_bar = QStatusBar()
         self.setStatusBar(self.status_bar)
+        # Riepilogo compatto delle metriche della pipeline, a destra nella barra di stato
+        self.metrics_label = QLabel()
+        self.metrics_label.setToolTip("Fine parlato -> testo (p50), fattore tempo reale dell'inferenza (p50), segmenti in coda, segmenti persi, overflow audio")
+        self.status_bar.addPermanentWidget(self.metrics_label)
+        self.metrics_label.setVisible(metrics.enabled)
+        self.metrics_refresh_timer = QTimer(self)
+        self.metrics_refresh_timer.timeout.connect(self._update_metrics_readout)
+        self.metrics_dumper = MetricsDumper(LOGS_DIR / METRICS_DUMP_FILENAME)
+        if metrics.enabled:
+            self.metrics_refresh_timer.start(METRICS_STATUS_REFRESH_MS)
+            self.metrics_dumper.start()
 
         self.init_ui()
         self.create_menu()
         self.connect_signals()
+        # Reazioni mirate alle modifiche del profilo (regole, lingua, output, dispositivo...)
+        self.profile_manager.subscribe(self._on_profile_change)
         
         self.load_profiles_into_combo() # Questo caricherà anche il profilo di default o il primo
 
@@ -143,54 +144,6 @@ class MainWindow(QMainWindow):
                                     "Clicca 'OK' per aprire la gestione profili.")
             self.open_profile_manager_dialog() # Apre il dialogo per creare/importare
 
-    def _prepare_transcription_thread(self):
-        app_logger.debug("MainWindow: Inizio _prepare_transcription_thread.")
-        if self.transcription_thread:
-            app_logger.info("MainWindow: _prepare_transcription_thread - Trovato thread esistente.")
-            
-            # Disconnetti i segnali dal vecchio thread PRIMA di tentare di fermarlo o dereferenziarlo.
-            # Questo previene che i suoi segnali (specialmente 'finished') vengano gestiti
-            # dopo che self.transcription_thread potrebbe essere stato riassegnato.
-            try:
-                app_logger.debug("MainWindow: _prepare_transcription_thread - Tentativo disconnessione segnali thread precedente.")
-                self.transcription_thread.new_transcription.disconnect(self.handle_new_transcription_from_thread)
-                self.transcription_thread.status_update.disconnect(self.update_status_from_thread)
-                self.transcription_thread.error_signal.disconnect(self.show_error_message_from_thread)
-                self.transcription_thread.initialization_complete.disconnect(self._handle_thread_initialization_complete)
-                self.transcription_thread.finished.disconnect(self._on_transcription_thread_finished) # Cruciale
-                app_logger.debug("MainWindow: _prepare_transcription_thread - Segnali disconnessi.")
-            except TypeError:
-                app_logger.debug("MainWindow: _prepare_transcription_thread - Nessun segnale da disconnettere (o errore tipo).")
-            except Exception as e:
-                app_logger.error(f"MainWindow: _prepare_transcription_thread - Eccezione durante disconnessione segnali: {e}")
-
-            if self.transcription_thread.isRunning():
-                app_logger.info("MainWindow: _prepare_transcription_thread - Thread esistente in esecuzione. Richiedo stop.")
-                self.transcription_thread.request_stop()
-                if not self.transcription_thread.wait(2500): # Timeout leggermente aumentato
-                    app_logger.warning("MainWindow: _prepare_transcription_thread - Timeout attesa terminazione thread precedente.")
-                else:
-                    app_logger.info("MainWindow: _prepare_transcription_thread - Thread precedente terminato correttamente.")
-            
-            self.transcription_thread = None # Assicura che sia None prima di crearne uno nuovo
-            app_logger.debug("MainWindow: _prepare_transcription_thread - self.transcription_thread impostato a None dopo pulizia.")
-
-        if not self.profile_manager.current_profile_safe_name:
-            app_logger.warning("MainWindow: _prepare_transcription_thread - Nessun profilo attivo, non creo nuovo thread.")
-            self.update_ui_for_no_profile()
-            return
-
-        app_logger.info("MainWindow: _prepare_transcription_thread - Creazione nuova istanza TranscriptionThread.")
-        self.transcription_thread = TranscriptionThread(profile_manager=self.profile_manager, parent=self)
-        # Connetti i segnali del NUOVO thread
-        self.transcription_thread.new_transcription.connect(self.handle_new_transcription_from_thread)
-        self.transcription_thread.status_update.connect(self.update_status_from_thread)
-        self.transcription_thread.error_signal.connect(self.show_error_message_from_thread)
-        self.transcription_thread.initialization_complete.connect(self._handle_thread_initialization_complete)
-        self.transcription_thread.finished.connect(self._on_transcription_thread_finished)
-        app_logger.debug("MainWindow: _prepare_transcription_thread - Nuova istanza TranscriptionThread configurata e pronta.")
-
-
     def init_ui(self):
         central_widget = QWidget()
         self.setCentralWidget(central_widget)
@@ -272,6 +225,11 @@ class MainWindow(QMainWindow):
         self.app_settings_action.triggered.connect(self.open_app_settings_dialog)
         self.profile_settings_action.triggered.connect(self.open_current_profile_settings_dialog)
         self.profile_combo.currentIndexChanged.connect(self.on_profile_changed_from_combo)
+        self.transcription_worker.new_transcription.connect(self.handle_new_transcription_from_thread)
+        self.transcription_worker.status_update.connect(self.update_status_from_thread)
+        self.transcription_worker.error_signal.connect(self.show_error_message_from_thread)
+        self.transcription_worker.initialization_complete.connect(self._handle_listening_started)
+        self.transcription_worker.listening_stopped.connect(self._on_listening_stopped)
 
     def load_profiles_into_combo(self):
         self.profile_combo.blockSignals(True) # Blocca segnali per evitare chiamate multiple a on_profile_changed
@@ -343,17 +301,18 @@ class MainWindow(QMainWindow):
         display_name_to_load = self.profile_combo.itemText(index)
         current_active_profile_display_name = self.profile_manager.get_current_profile_display_name()
 
-        # Se il profilo selezionato è già quello attivo nel manager, non ricaricare, ma prepara il thread
+        # Se il profilo selezionato è già quello attivo nel manager, non ricaricare, aggiorna solo la UI
         if current_active_profile_display_name == display_name_to_load and self.profile_manager.current_profile_data:
-            app_logger.info(f"MainWindow: Profilo '{display_name_to_load}' è già attivo. Preparo thread e aggiorno UI.")
-            self._prepare_transcription_thread() # Assicura che il thread sia pronto per questo profilo
+            app_logger.info(f"MainWindow: Profilo '{display_name_to_load}' è già attivo. Aggiorno UI.")
             self.update_ui_for_current_profile() # Aggiorna la UI (es. editor read-only, stato)
             self._is_operation_in_progress = False # Fine operazione
             self.toggle_button.setEnabled(True) # Riabilita START/STOP
             return
 
         app_logger.info(f"MainWindow: Tentativo di caricare profilo '{display_name_to_load}' da ComboBox.")
-        self._prepare_transcription_thread() # Prepara il thread (fermerà quello vecchio se esiste)
+        if self.transcription_worker.is_listening():
+            # La sessione in corso usa il profilo precedente: si ferma, il worker resta attivo.
+            self.transcription_worker.request_stop()
         
         if self.profile_manager.load_profile(display_name_to_load):
             app_logger.info(f"MainWindow: Profilo '{display_name_to_load}' caricato con successo.")
@@ -379,12 +338,9 @@ class MainWindow(QMainWindow):
         self.internal_editor_widget.setReadOnly(True); self.internal_editor_widget.clear()
         self.output_handler.set_output_mode(False) # Nessun output se non c'è profilo
         
-        if self.transcription_thread and self.transcription_thread.isRunning():
-            app_logger.info("MainWindow: update_ui_for_no_profile - Fermo thread di trascrizione attivo.")
-            self.transcription_thread.request_stop()
-            if not self.transcription_thread.wait(1000): # Breve attesa
-                 app_logger.warning("MainWindow: Timeout attesa stop thread (update_ui_for_no_profile).")
-        # Non impostare self.transcription_thread a None qui, _prepare_transcription_thread lo gestirà.
+        if self.transcription_worker.is_listening():
+            app_logger.info("MainWindow: update_ui_for_no_profile - Fermo la trascrizione attiva.")
+            self.transcription_worker.request_stop() # Asincrono: listening_stopped aggiorna la UI
 
 
     def update_ui_for_current_profile(self):
@@ -395,9 +351,7 @@ class MainWindow(QMainWindow):
         app_logger.info(f"MainWindow: Aggiornamento UI per profilo '{display_name}'.")
         self.profile_label.setText(f"Profilo Attivo: {display_name}")
         
-        # Controlla se un thread è in esecuzione (cioè se la trascrizione è attiva)
-        is_thread_running = self.transcription_thread and self.transcription_thread.isRunning()
-        if not is_thread_running:
+        if not self.transcription_worker.is_listening():
             if not self.loading_spinner_timer.isActive(): # Non sovrascrivere lo spinner
                 self.status_label_gui.setText(f"Stato: Profilo: {display_name} | Pronto.")
             self.set_button_style_start() # Bottone mostra "START"
@@ -412,13 +366,65 @@ class MainWindow(QMainWindow):
         self.profile_settings_action.setEnabled(True) # Abilita impostazioni profilo
         self.toggle_button.setEnabled(True) # Abilita START/STOP
 
+        self._apply_output_settings()
+        self._start_model_preload()
+
+    def _apply_output_settings(self):
         use_internal = self.profile_manager.get_profile_setting("output_to_internal_editor", INTERNAL_EDITOR_ENABLED_DEFAULT)
+        self.output_handler.set_external_output_mode(self.profile_manager.get_profile_setting("external_output_mode", DEFAULT_EXTERNAL_OUTPUT_MODE))
         self.output_handler.set_output_mode(use_internal, self.internal_editor_widget)
         self.internal_editor_widget.setReadOnly(not use_internal) # Editor scrivibile solo se in modalità interna
-        
-        # Assicura che il thread sia pronto per il profilo corrente
-        # Questo è importante se il profilo è cambiato o se le impostazioni sono state aggiornate
-        self._prepare_transcription_thread() 
+
+    def _on_profile_change(self, event: ProfileChangeEvent):
+        """
+        Applica solo ciò che la modifica richiede, senza fermare la trascrizione in corso.
+        Il caricamento di un altro profilo segue invece il percorso completo (on_profile_changed_from_combo).
+        """
+        if CHANGE_PROFILE in event.kinds: return
+        is_listening = self.transcription_worker.is_listening()
+        app_logger.info(f"MainWindow: Modifica profilo {sorted(event.kinds)} (ascolto attivo: {is_listening}).")
+        if event.snapshot.is_empty:
+            if CHANGE_AUDIO_DEVICE in event.kinds: self._apply_audio_device_change(is_listening)
+            return
+        if CHANGE_DISPLAY_NAME in event.kinds:
+            index = self.profile_combo.currentIndex()
+            if index >= 0:
+                self.profile_combo.blockSignals(True)
+                self.profile_combo.setItemText(index, event.snapshot.display_name)
+                self.profile_combo.blockSignals(False)
+            self.profile_label.setText(f"Profilo Attivo: {event.snapshot.display_name}")
+        if CHANGE_OUTPUT in event.kinds:
+            self._apply_output_settings()
+        if CHANGE_RULES in event.kinds or CHANGE_VOCABULARY in event.kinds:
+            # Il TextProcessor usa le regole già compilate nel nuovo snapshot dal testo successivo.
+            app_logger.info("MainWindow: Regole del profilo aggiornate senza riavvio.")
+        if CHANGE_LANGUAGE in event.kinds and is_listening:
+            app_logger.info(f"MainWindow: Lingua '{event.snapshot.get_profile_setting('language')}' attiva dal prossimo segmento.")
+        if CHANGE_MODEL in event.kinds or CHANGE_AUDIO in event.kinds:
+            if is_listening:
+                self.update_status_bar("Modello e opzioni audio aggiornati: avranno effetto al prossimo START.")
+            elif CHANGE_MODEL in event.kinds:
+                self._start_model_preload()
+        if CHANGE_AUDIO_DEVICE in event.kinds:
+            self._apply_audio_device_change(is_listening)
+
+    def _apply_audio_device_change(self, is_listening: bool):
+        """Il dispositivo si sceglie all'apertura dello stream: se in ascolto, ferma e riavvia."""
+        if not is_listening:
+            app_logger.info("Preferenza dispositivo audio aggiornata. Verrà usata al prossimo avvio della trascrizione.")
+            return
+        if self._is_operation_in_progress:
+            self.update_status_from_thread("Dispositivo audio cambiato. Premi STOP e START per usarlo.")
+            return
+        app_logger.info("MainWindow: Dispositivo audio cambiato durante l'ascolto. Riavvio dello stream.")
+        self._restart_after_stop = True
+        self.toggle_transcription_ui_logic() # Stop asincrono; il riavvio parte a sessione terminata
+
+    def _start_model_preload(self):
+        if not self.profile_manager.current_profile_safe_name: return
+        if self.transcription_worker.is_listening(): return # Il modello si ricarica al prossimo START
+        # Il worker carica modello e impostazioni in background; i comandi successivi (es. START) attendono in coda.
+        self.transcription_worker.reconfigure()
 
 
     def toggle_transcription_ui_logic(self):
@@ -432,43 +438,25 @@ class MainWindow(QMainWindow):
         self._is_operation_in_progress = True # Inizia operazione critica
         self.toggle_button.setEnabled(False)  # Disabilita il bottone durante la transizione
 
-        if not self.transcription_thread or not self.transcription_thread.isRunning():
+        if not self.transcription_worker.is_listening():
             # --- AVVIO TRASCRIZIONE ---
             app_logger.info("MainWindow: Richiesto AVVIO trascrizione.")
-            self._prepare_transcription_thread() # Assicura che il thread sia pulito e pronto
-            if not self.transcription_thread: # Se _prepare non ha potuto creare un thread (es. no profilo)
-                app_logger.error("MainWindow: Impossibile avviare, TranscriptionThread non preparato (es. nessun profilo).")
-                QMessageBox.critical(self, "Errore Avvio", "Impossibile preparare il thread di trascrizione.")
-                self._is_operation_in_progress = False # Fine operazione
-                self.toggle_button.setEnabled(self.profile_manager.current_profile_safe_name is not None)
-                self.set_button_style_start()
-                return
-            
-            # Lo stato "Avvio in corso..." o "Caricamento modello..." viene impostato da TranscriptionThread
+            # Lo stato "Avvio stream audio..." o "Caricamento modello..." arriva dal worker
             # tramite il segnale status_update -> update_status_from_thread
-            self.transcription_thread.start() # Avvia il thread (chiama il suo metodo run())
-            # Il bottone e _is_operation_in_progress verranno gestiti da _handle_thread_initialization_complete
+            self._start_requested_at = time.monotonic()
+            self.transcription_worker.start_listening()
+            # Il bottone e _is_operation_in_progress verranno gestiti da _handle_listening_started
         else: 
             # --- STOP TRASCRIZIONE ---
             app_logger.info("MainWindow: Richiesto STOP trascrizione.")
             self.update_status_from_thread("Arresto in corso...") # Aggiorna subito lo stato UI
-            self.transcription_thread.request_stop() # Dice al thread di fermarsi
-            
-            # NON attendere qui con self.transcription_thread.wait() perché bloccherebbe la UI.
-            # Il segnale 'finished' del thread chiamerà _on_transcription_thread_finished
-            # che si occuperà di resettare _is_operation_in_progress e il bottone.
-            # Se il thread impiega troppo a fermarsi, l'utente potrebbe percepire un blocco.
-            # Per ora, ci fidiamo che il thread termini in modo ragionevole.
-            # Il bottone rimane disabilitato finché _on_transcription_thread_finished non lo riabilita.
+            self.transcription_worker.request_stop() # Comando in coda al worker, la UI non attende
+            # Il segnale listening_stopped chiamerà _on_listening_stopped,
+            # che resetta _is_operation_in_progress e riabilita il bottone.
 
 
-    def _handle_thread_initialization_complete(self, success: bool, message: str):
+    def _handle_listening_started(self, success: bool, message: str):
         app_logger.info(f"MainWindow: Segnale initialization_complete. Successo={success}, Msg='{message}'")
-        
-        # Solo agire se questo segnale proviene dal thread attualmente attivo
-        if not self.sender() == self.transcription_thread:
-            app_logger.warning("MainWindow: initialization_complete ricevuto da un thread obsoleto. Ignoro.")
-            return
 
         if success:
             self.set_button_style_stop() # Bottone diventa STOP
@@ -482,52 +470,31 @@ class MainWindow(QMainWindow):
                     QMessageBox.critical(self, "Errore Avvio Trascrizione", message)
             self.set_button_style_start() # Bottone torna a START
             self.update_status_from_thread(f"Fallito: {message[:80]}...") # Aggiorna stato UI
-            # Il thread dovrebbe essersi già fermato o fermarsi a breve.
-            # _on_transcription_thread_finished resetterà _is_operation_in_progress e riabiliterà il bottone.
+            # Il worker segnala subito dopo listening_stopped: _on_listening_stopped
+            # resetterà _is_operation_in_progress e riabiliterà il bottone.
         
-        # Se l'operazione era un avvio (come dovrebbe essere per initialization_complete)
-        # e il segnale proviene dal thread corrente, possiamo considerare l'operazione "avvio" conclusa.
-        if self._is_operation_in_progress and self.sender() == self.transcription_thread:
+        # L'operazione "avvio" è conclusa.
+        if self._is_operation_in_progress:
             self._is_operation_in_progress = False
             self.toggle_button.setEnabled(True) # Riabilita il bottone (ora START o STOP)
 
 
-    def _on_transcription_thread_finished(self):
-        app_logger.info("MainWindow: Inizio _on_transcription_thread_finished.")
-        
-        # Non fare check con self.sender() qui, perché il thread potrebbe essere già stato
-        # dereferenziato da _prepare_transcription_thread se un'altra azione è avvenuta rapidamente.
-        # La disconnessione fatta in _prepare_transcription_thread dovrebbe prevenire chiamate multiple.
+    def _on_listening_stopped(self):
+        app_logger.info("MainWindow: Inizio _on_listening_stopped.")
         
         was_init_failed = False
-        # Controlla se il thread che ha emesso 'finished' aveva fallito l'inizializzazione
-        # Per fare questo, dovremmo passare lo stato dal thread o usare un flag
-        # ma per ora, controlliamo self.transcription_thread se esiste ancora (potrebbe non essere affidabile)
-        # Per semplicità, guardiamo lo stato della GUI. Se non è "Ascolto", probabilmente c'era un problema.
-        # Il flag _initialization_has_failed nel thread è più robusto.
-        # Poiché non possiamo accedere a self.sender()._initialization_has_failed direttamente,
-        # ci affidiamo allo stato UI o a logica precedente.
-        # Consideriamo che se il thread finisce e non era in stato "Ascolto", c'era un problema.
+        # Se la sessione finisce e lo stato non era "Ascolto", l'avvio non era riuscito.
         if "Ascolto" not in self.status_label_gui.text(): # Stima approssimativa
              was_init_failed = True 
-        app_logger.debug(f"MainWindow: _on_transcription_thread_finished - was_init_failed (stimato)={was_init_failed}")
-        
-        # self.transcription_thread è già stato impostato a None e segnali disconnessi
-        # da _prepare_transcription_thread se un nuovo thread è stato preparato.
-        # Se invece è uno stop normale, self.transcription_thread dovrebbe essere ancora l'istanza che ha finito.
-        # Lo impostiamo a None qui per essere sicuri dopo uno stop.
-        if self.transcription_thread and not self.transcription_thread.isRunning(): # Assicurati che sia effettivamente finito
-            self.transcription_thread = None
-            app_logger.debug("MainWindow: _on_transcription_thread_finished - self.transcription_thread impostato a None.")
-
+        app_logger.debug(f"MainWindow: _on_listening_stopped - was_init_failed (stimato)={was_init_failed}")
 
         self._is_operation_in_progress = False # Fine operazione critica
-        app_logger.debug(f"MainWindow: _on_transcription_thread_finished - _is_operation_in_progress impostato a False.")
+        app_logger.debug(f"MainWindow: _on_listening_stopped - _is_operation_in_progress impostato a False.")
         self.set_button_style_start() # Bottone torna a START
         
         can_start_again = self.profile_manager.current_profile_safe_name is not None
         self.toggle_button.setEnabled(can_start_again) # Riabilita il bottone
-        app_logger.debug(f"MainWindow: _on_transcription_thread_finished - toggle_button abilitato: {can_start_again}")
+        app_logger.debug(f"MainWindow: _on_listening_stopped - toggle_button abilitato: {can_start_again}")
         
         current_status_text = self.status_label_gui.text()
         if not was_init_failed and not ("Errore" in current_status_text or "Fallito" in current_status_text):
@@ -535,7 +502,10 @@ class MainWindow(QMainWindow):
         elif not ("Errore" in current_status_text or "Fallito" in current_status_text):
              self.update_status_from_thread("Pronto.") # O un messaggio di fallimento se init fallita
         
-        app_logger.info("MainWindow: Fine _on_transcription_thread_finished.")
+        app_logger.info("MainWindow: Fine _on_listening_stopped.")
+        if self._restart_after_stop:
+            self._restart_after_stop = False
+            if can_start_again: QTimer.singleShot(0, self.toggle_transcription_ui_logic)
 
     def _update_loading_spinner(self):
         if self.loading_spinner_timer.isActive():
@@ -573,10 +543,10 @@ class MainWindow(QMainWindow):
         if is_stopped_or_error_or_failed and self.toggle_button.text() == "STOP":
             self.set_button_style_start() # Reimposta il bottone a "START"
         
-        # Se il thread non è in esecuzione (o non esiste) e non siamo in uno stato di errore/fallimento
+        # Se non c'è una sessione attiva e non siamo in uno stato di errore/fallimento
         # E il messaggio non è già "Trascrizione Stoppata" o "Pronto"
         # Allora imposta lo stato a "Pronto".
-        if not (self.transcription_thread and self.transcription_thread.isRunning()):
+        if not self.transcription_worker.is_listening():
             if not is_stopped_or_error_or_failed and "Stoppata" not in message and "Pronto" not in message:
                 if self.profile_manager.current_profile_safe_name:
                     self.status_label_gui.setText(f"Stato: Profilo: {self.profile_manager.get_current_profile_display_name()} | Pronto.")
@@ -588,15 +558,20 @@ class MainWindow(QMainWindow):
              self.toggle_button.setEnabled(self.profile_manager.current_profile_safe_name is not None)
 
 
-    def handle_new_transcription_from_thread(self, raw_text: str):
-        app_logger.debug(f"MainWindow: Testo grezzo da thread: {repr(raw_text)}")
+    def handle_new_transcription_from_thread(self, raw_text: str, speech_ended_at: Optional[float] = None):
+        app_logger.debug("MainWindow: Testo grezzo da thread: %r", raw_text)
+        if self._start_requested_at is not None:
+            time_to_first_text = time.monotonic() - self._start_requested_at
+            self._start_requested_at = None
+            metrics.histogram("latency.time_to_first_text_s").observe(time_to_first_text)
+            app_logger.info(f"MainWindow: Tempo dal click su START al primo testo: {time_to_first_text:.2f}s.")
         if not self.profile_manager.current_profile_safe_name: return # Non processare se non c'è profilo
 
         # Gestione semplificata comandi base (es. "a capo") se necessario qui,
         # ma la maggior parte della logica dovrebbe essere in TextProcessor.
         if raw_text.strip().lower() == "a capo": # Esempio di comando diretto se TextProcessor non lo copre per qualche motivo
             app_logger.info("MainWindow: 'a capo' rilevato, invio newline a OutputHandler.")
-            self.output_handler.type_text("\n")
+            self.output_pipeline.submit("\n", processed=True, speech_ended_at=speech_ended_at)
             self.update_status_bar("Comando: A Capo")
             return
         
@@ -604,17 +579,48 @@ class MainWindow(QMainWindow):
             command = raw_text.strip().lower()
             if command in COMMAND_STOP_RECORDING: # Usa la lista da config
                 app_logger.info(f"MainWindow: Comando vocale STOP ('{command}') ricevuto.")
-                if self.transcription_thread and self.transcription_thread.isRunning():
+                if self.transcription_worker.is_listening():
                      self.toggle_transcription_ui_logic() # Chiama la stessa logica del click su STOP
                 return
 
-        processed_text = self.text_processor.process_text(raw_text)
-        if processed_text is not None: # TextProcessor può restituire None o stringa vuota
-            self.output_handler.type_text(processed_text)
-            display_text = processed_text.replace("\n", " ").replace("\r", " ").strip()
-            if display_text: self.update_status_bar(f"Trascritto: '{display_text[:50]}...'")
-        elif raw_text.strip(): # Se raw_text non era vuoto ma processed_text lo è
-            app_logger.warning(f"MainWindow: raw_text '{repr(raw_text)}' -> processed_text nullo/vuoto. Nessun output.")
+        # Elaborazione e output proseguono sul worker di output (vedi _deliver_output_batch).
+        self.output_pipeline.submit(raw_text, speech_ended_at=speech_ended_at)
+
+    def _deliver_output_batch(self, texts: List[str], speech_ends: List[float]) -> bool:
+        # Eseguito sul worker di output. L'editor interno è un widget: va aggiornato dal thread della GUI,
+        # che registra anche la latenza end-to-end a inserimento avvenuto (vedi _insert_output_batch).
+        if self.output_handler.use_internal_editor and self.output_handler.internal_editor:
+            self.output_batch_ready.emit(texts, True, time.monotonic(), speech_ends)
+            return False
+        # Le app esterne ricevono i testi consecutivi in un solo inserimento (un solo incolla).
+        self.output_handler.type_text("".join(texts))
+        self.output_batch_ready.emit(texts, False, time.monotonic(), [])
+        return True
+
+    def _insert_output_batch(self, texts: List[str], insert_in_editor: bool, emitted_at: float,
+                             speech_ends: List[float]):
+        # Attesa del blocco nella coda eventi Qt, dal worker di output a questo slot
+        metrics.histogram("output.gui_dispatch_s").observe(time.monotonic() - emitted_at)
+        if insert_in_editor:
+            self.output_handler.type_batch(texts)
+            self.output_pipeline.observe_delivered(speech_ends)
+        display_text = texts[-1].replace("\n", " ").replace("\r", " ").strip()
+        if display_text: self.update_status_bar(f"Trascritto: '{display_text[:50]}...'")
+
+    def _update_metrics_readout(self):
+        end_to_end_s = metrics.histogram("latency.end_to_end_s").percentile(0.5)
+        rtf = metrics.histogram("inference.rtf").percentile(0.5)
+        dropped_segments = metrics.counter("inference.segments_dropped").value
+        input_overflows = metrics.counter("audio.input_overflows").value
+        parts = [
+            f"Latenza {end_to_end_s:.2f}s" if end_to_end_s is not None else "Latenza -",
+            f"RTF {rtf:.2f}" if rtf is not None else "RTF -",
+            f"Coda {metrics.gauge('inference.queue_depth').value:.0f}",
+        ]
+        # Solo se è successo qualcosa: segmenti scartati dalla backpressure, blocchi persi dalla scheda audio
+        if dropped_segments: parts.append(f"Persi {dropped_segments}")
+        if input_overflows: parts.append(f"Overflow {input_overflows}")
+        self.metrics_label.setText(" | ".join(parts))
 
     def show_error_message_from_thread(self, message: str):
         app_logger.error(f"MainWindow: Errore critico da thread (via error_signal): {message}")
@@ -664,7 +670,7 @@ class MainWindow(QMainWindow):
             QMessageBox.information(self, "Operazione in Corso", "Attendi il completamento dell'operazione corrente.")
             return
         
-        if self.transcription_thread and self.transcription_thread.isRunning():
+        if self.transcription_worker.is_listening():
             reply = QMessageBox.question(self, "Trascrizione Attiva", "Fermare la trascrizione per gestire i profili?",
                                          QMessageBox.StandardButton.Yes | QMessageBox.StandardButton.No, QMessageBox.StandardButton.No)
             if reply == QMessageBox.StandardButton.Yes:
@@ -680,7 +686,7 @@ class MainWindow(QMainWindow):
 
     def _check_and_show_profile_management_dialog(self):
         # Questo metodo viene chiamato dal QTimer
-        if (self.transcription_thread and self.transcription_thread.isRunning()) or self._is_operation_in_progress:
+        if self.transcription_worker.is_listening() or self._is_operation_in_progress:
             # Se la trascrizione è ancora in esecuzione o un'altra operazione è in corso, attendi ancora.
             # Il timer continuerà a chiamare questo metodo.
             app_logger.debug("_check_and_show_profile_management_dialog: Attesa stop trascrizione/operazione...")
@@ -712,42 +718,9 @@ class MainWindow(QMainWindow):
     def handle_app_settings_changed(self):
         app_logger.info("MainWindow: Segnale cambio impostazioni globali applicazione.")
         # Aggiorna livello log
-        new_log_level_str = self.profile_manager.get_global_preference("global_log_level", LOG_LEVEL)
-        try:
-            numeric_level = getattr(logging, new_log_level_str.upper(), None)
-            if numeric_level is not None:
-                app_logger.setLevel(numeric_level)
-                for handler in app_logger.handlers: handler.setLevel(numeric_level)
-                if hasattr(app_logger, 'level_name_from_config'): # Aggiorna l'attributo custom
-                    app_logger.level_name_from_config = new_log_level_str.upper()
-                app_logger.info(f"Livello log applicazione aggiornato a: {new_log_level_str}")
-            else: app_logger.error(f"Livello log non valido ricevuto da preferenze: {new_log_level_str}")
-        except Exception as e: app_logger.error(f"Errore durante l'aggiornamento del livello di log: {e}", exc_info=True)
-
-        # Gestisci cambio dispositivo audio
-        new_device_id_pref = self.profile_manager.get_global_preference("selected_audio_device_id")
-        
-        current_transcriber_device_id = None
-        if self.transcription_thread and self.transcription_thread.transcriber_instance:
-             current_transcriber_device_id = self.transcription_thread.transcriber_instance.selected_audio_device_id
-        
-        # Se il dispositivo è cambiato, o se non c'era un transcriber prima, bisogna preparare un nuovo thread.
-        if current_transcriber_device_id != new_device_id_pref or not self.transcription_thread:
-            app_logger.info(f"Rilevato cambio dispositivo audio (da {current_transcriber_device_id} a {new_device_id_pref}) o thread non esistente. Preparo nuovo thread.")
-            was_listening = self.transcription_thread and self.transcription_thread.isRunning()
-            
-            self._prepare_transcription_thread() # Ferma vecchio thread (se esiste), ne prepara uno nuovo.
-                                             # Il nuovo Transcriber userà il nuovo ID dispositivo.
-            if was_listening: # Se stava ascoltando, informa l'utente che deve riavviare
-                self.update_status_from_thread("Dispositivo audio cambiato. Premi START per riavviare.")
-                # Lo stato del bottone (testo START/STOP) dovrebbe essere gestito da _prepare_transcription_thread
-                # e/o dai segnali del thread. Se _prepare ferma un thread, _on_transcription_thread_finished
-                # dovrebbe impostare il bottone a START.
-            else:
-                app_logger.info("Preferenza dispositivo audio aggiornata. Verrà usata al prossimo avvio della trascrizione.")
-        elif self.transcription_thread and self.transcription_thread.transcriber_instance: # Nessun cambio ID, ma ricarica preferenza nel transcriber esistente
-            self.transcription_thread.transcriber_instance._load_global_audio_device_preference()
-            app_logger.info("Preferenza dispositivo audio ricaricata nel transcriber esistente (nessun cambio di ID).")
+        set_log_level(self.profile_manager.get_global_preference("global_log_level", LOG_LEVEL))
+
+        # Il cambio di dispositivo audio arriva come CHANGE_AUDIO_DEVICE (vedi _on_profile_change).
 
 
     def open_current_profile_settings_dialog(self):
@@ -755,36 +728,18 @@ class MainWindow(QMainWindow):
             QMessageBox.warning(self, "Nessun Profilo", "Nessun profilo attivo da configurare.")
             return
         
-        was_listening = self.transcription_thread and self.transcription_thread.isRunning()
-        if was_listening:
+        if self.transcription_worker.is_listening():
              QMessageBox.information(self, "Trascrizione Attiva", 
-                                     "La trascrizione è attiva.\nLe modifiche al modello Whisper o alla lingua "
-                                     "avranno effetto al prossimo avvio della trascrizione.")
+                                     "La trascrizione è attiva.\nMacro, regole, lingua e output si applicano subito; "
+                                     "le modifiche al modello Whisper e alle opzioni audio avranno effetto al prossimo avvio.")
         
         dialog = ProfileSettingsDialog(self.profile_manager, self)
-        # Passa lo stato 'was_listening' al gestore del segnale
-        dialog.profile_settings_changed_signal.connect(
-            lambda: self.handle_profile_settings_change_from_dialog(was_listening_before_dialog=was_listening)
-        )
+        dialog.profile_settings_changed_signal.connect(self.handle_profile_settings_change_from_dialog)
         dialog.exec()
             
-    def handle_profile_settings_change_from_dialog(self, was_listening_before_dialog: bool = False):
-        app_logger.info("MainWindow: Segnale cambio impostazioni profilo ricevuto.")
-        self.load_profiles_into_combo() # Ricarica la combo (il nome potrebbe essere cambiato)
-                                    # Questo a sua volta potrebbe chiamare on_profile_changed_from_combo
-                                    # che chiama _prepare_transcription_thread e update_ui_for_current_profile
-        
-        # Se il profilo corrente è ancora lo stesso (non eliminato e ricaricato)
-        # e la trascrizione era attiva, l'utente potrebbe aver bisogno di riavviare.
-        current_display_name = self.profile_manager.get_current_profile_display_name()
-        if current_display_name == self.profile_combo.currentText(): # Il profilo è ancora quello
-            app_logger.info(f"MainWindow: Profilo '{current_display_name}' riconfigurato. Preparo thread.")
-            self._prepare_transcription_thread() # Prepara il thread con le nuove impostazioni
-            self.update_ui_for_current_profile() # Aggiorna la UI
-            
-            # Se stava ascoltando e ora il thread non è più in esecuzione (perché _prepare lo ha fermato)
-            if was_listening_before_dialog and not (self.transcription_thread and self.transcription_thread.isRunning()):
-                self.update_status_from_thread("Impostazioni profilo aggiornate. Premi START.")
+    def handle_profile_settings_change_from_dialog(self):
+        # Le modifiche sono già state applicate da _on_profile_change (una notifica per salvataggio).
+        app_logger.info(f"MainWindow: Impostazioni profilo '{self.profile_manager.get_current_profile_display_name()}' salvate.")
 
 
     def closeEvent(self, event: QCloseEvent):
@@ -794,7 +749,7 @@ class MainWindow(QMainWindow):
             # Potremmo voler dare un feedback all'utente, ma per ora logghiamo e ignoriamo.
             event.ignore(); return
 
-        if self.transcription_thread and self.transcription_thread.isRunning():
+        if self.transcription_worker.is_listening():
             reply = QMessageBox.question(self, 'Conferma Uscita', 
                                          "La trascrizione è attiva. Fermarla e uscire dall'applicazione?",
                                          QMessageBox.StandardButton.Yes | QMessageBox.StandardButton.No, 
@@ -802,10 +757,8 @@ class MainWindow(QMainWindow):
             if reply == QMessageBox.StandardButton.Yes:
                 app_logger.info("MainWindow: Utente ha scelto di fermare la trascrizione e uscire.")
                 self._is_operation_in_progress = True; self.toggle_button.setEnabled(False) # Blocca UI
-                self.transcription_thread.request_stop()
-                if not self.transcription_thread.wait(2500): # Attendi un po' per la chiusura pulita
-                    app_logger.warning("MainWindow: Timeout attesa chiusura thread durante closeEvent.")
-                # Non chiamare on_app_quit qui, viene chiamato da aboutToQuit
+                self.transcription_worker.request_stop()
+                # Il worker termina (dopo lo stop in coda) in on_app_quit, chiamato da aboutToQuit
                 event.accept() # Permetti la chiusura
             else: # L'utente ha scelto No
                 app_logger.info("MainWindow: Uscita annullata dall'utente.")
@@ -820,15 +773,18 @@ class MainWindow(QMainWindow):
         app_logger.info("MainWindow: Segnale aboutToQuit. Eseguo pulizia finale.")
         self._is_operation_in_progress = True # Previene ulteriori interazioni
         
-        # Assicurati che il thread sia fermo se per qualche motivo è ancora referenziato e attivo
-        if self.transcription_thread and self.transcription_thread.isRunning():
-            app_logger.info("MainWindow: on_app_quit - Fermo thread di trascrizione residuo.")
-            self.transcription_thread.request_stop()
-            self.transcription_thread.wait(1500) # Breve attesa finale
-        self.transcription_thread = None # Dereferenzia
+        # Il worker esegue i comandi in ordine: ferma l'eventuale ascolto, rilascia il modello e termina.
+        if not self.transcription_worker.shutdown(timeout=10.0):
+            app_logger.warning("MainWindow: on_app_quit - Timeout terminazione del worker di trascrizione.")
+        if not self.output_pipeline.stop(timeout=3.0):
+            app_logger.warning("MainWindow: on_app_quit - Timeout consegna dell'output ancora in coda.")
+        self.metrics_refresh_timer.stop()
+        self.metrics_dumper.stop() # Ultima istantanea delle metriche della sessione
         
         if hasattr(self, 'profile_manager') and self.profile_manager:
             self.profile_manager._save_app_preferences() # Salva le preferenze globali
+            if not self.profile_manager.flush_pending_writes(): # Scrive su disco tutto ciò che è ancora in attesa
+                app_logger.error("MainWindow: on_app_quit - Salvataggio di alcuni file non riuscito.")
         app_logger.info(f"--- {APP_NAME} v{VERSION} TERMINATO (on_app_quit) ---")
 
 if __name__ == '__main__':
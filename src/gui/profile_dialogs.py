@@ -15,7 +15,13 @@ from src.core.profile_manager import ProfileManager
 from src.utils.logger import app_logger
 from src.config import (
     AVAILABLE_WHISPER_MODELS, DEFAULT_WHISPER_MODEL, DEFAULT_LANGUAGE,
-    PROFILE_SETTINGS_FILENAME, LOG_LEVEL, INTERNAL_EDITOR_ENABLED_DEFAULT
+    PROFILE_SETTINGS_FILENAME, LOG_LEVEL, INTERNAL_EDITOR_ENABLED_DEFAULT,
+    AVAILABLE_VAD_ENGINES, DEFAULT_VAD_ENGINE,
+    AVAILABLE_BACKPRESSURE_POLICIES, DEFAULT_BACKPRESSURE_POLICY,
+    AVAILABLE_SHORT_UTTERANCE_MODES, DEFAULT_SHORT_UTTERANCE_MODE,
+    AVAILABLE_INFERENCE_BACKENDS, DEFAULT_INFERENCE_BACKEND,
+    AVAILABLE_WHISPER_QUANTIZATIONS, DEFAULT_WHISPER_QUANTIZATION,
+    AVAILABLE_EXTERNAL_OUTPUT_MODES, DEFAULT_EXTERNAL_OUTPUT_MODE
 )
 from typing import Optional, List, Dict, Any # Aggiunto Any
 import logging # Per getattr in AppSettingsDialog (anche se gestito in MainWindow)
@@ -188,20 +194,9 @@ class ProfileManagementDialog(QDialog):
         )
         if not save_file_path: return
 
-        # ProfileManager deve fornire il percorso della cartella del profilo.
-        profile_source_path = self.profile_manager._get_profile_path_from_safe_name(
-            self.profile_manager._sanitize_profile_name_for_folder(display_name)
-        )
-        if not profile_source_path.is_dir():
-            QMessageBox.critical(self, "Errore Esportazione", f"Cartella sorgente del profilo '{display_name}' non trovata.")
-            return
-
         try:
-            archive_base_name = Path(save_file_path).with_suffix('')
-            # root_dir è la directory genitore della cartella del profilo.
-            # base_dir è il nome della cartella del profilo stessa.
-            shutil.make_archive(str(archive_base_name), 'zip', root_dir=profile_source_path.parent, base_dir=profile_source_path.name)
-            final_zip_path = str(archive_base_name) + ".zip"
+            # Lo ZIP usa sempre il layout JSON, qualunque sia il motore di archiviazione dei profili.
+            final_zip_path = self.profile_manager.export_profile_archive(display_name, Path(save_file_path).with_suffix(''))
             app_logger.info(f"Profilo '{display_name}' esportato in '{final_zip_path}'")
             QMessageBox.information(self, "Esportazione Completata", f"Profilo esportato con successo in:\n{final_zip_path}")
         except Exception as e:
@@ -238,6 +233,13 @@ class ProfileManagementDialog(QDialog):
             target_profile_path.mkdir(parents=True)
             shutil.unpack_archive(zip_file_path, target_profile_path, 'zip')
             app_logger.info(f"File ZIP '{zip_file_path}' scompattato in '{target_profile_path}'.")
+            # Gli archivi esportati contengono la cartella del profilo: i file vanno portati al primo livello.
+            unpacked_items = list(target_profile_path.iterdir())
+            if (len(unpacked_items) == 1 and unpacked_items[0].is_dir()
+                    and (unpacked_items[0] / PROFILE_SETTINGS_FILENAME).is_file()):
+                for item in list(unpacked_items[0].iterdir()):
+                    shutil.move(str(item), str(target_profile_path / item.name))
+                unpacked_items[0].rmdir()
 
             # Aggiorna display_name nel file settings.json importato
             settings_data = self.profile_manager._load_profile_file(target_profile_path, PROFILE_SETTINGS_FILENAME, {})
@@ -246,8 +248,16 @@ class ProfileManagementDialog(QDialog):
             settings_data.setdefault("whisper_model", DEFAULT_WHISPER_MODEL)
             settings_data.setdefault("language", DEFAULT_LANGUAGE)
             settings_data.setdefault("output_to_internal_editor", INTERNAL_EDITOR_ENABLED_DEFAULT)
+            settings_data.setdefault("external_output_mode", DEFAULT_EXTERNAL_OUTPUT_MODE)
             settings_data.setdefault("enable_audio_debug_recording", False)
+            settings_data.setdefault("vad_engine", DEFAULT_VAD_ENGINE)
+            settings_data.setdefault("backpressure_policy", DEFAULT_BACKPRESSURE_POLICY)
+            settings_data.setdefault("short_utterance_mode", DEFAULT_SHORT_UTTERANCE_MODE)
+            settings_data.setdefault("inference_backend", DEFAULT_INFERENCE_BACKEND)
+            settings_data.setdefault("whisper_quantization", DEFAULT_WHISPER_QUANTIZATION)
             self.profile_manager._save_profile_file(target_profile_path, PROFILE_SETTINGS_FILENAME, settings_data)
+            self.profile_manager.flush_pending_writes()
+            self.profile_manager.import_profile_sections(target_safe_folder_name)
 
             QMessageBox.information(self, "Importazione Completata", f"Profilo '{new_profile_display_name}' importato.")
             self.populate_profile_list()
@@ -295,9 +305,39 @@ class ProfileSettingsDialog(QDialog):
         self.model_combo.addItems(AVAILABLE_WHISPER_MODELS)
         self.model_combo.setCurrentText(self.profile_manager.get_profile_setting("whisper_model", DEFAULT_WHISPER_MODEL))
         general_form_layout.addRow("Modello Whisper:", self.model_combo)
+        self.inference_backend_combo = QComboBox()
+        self.inference_backend_combo.addItems(AVAILABLE_INFERENCE_BACKENDS)
+        self.inference_backend_combo.setCurrentText(self.profile_manager.get_profile_setting("inference_backend", DEFAULT_INFERENCE_BACKEND))
+        self.inference_backend_combo.setToolTip("'openai-whisper' (PyTorch) o 'faster-whisper' (int8, più veloce su CPU; richiede il pacchetto faster-whisper).")
+        general_form_layout.addRow("Motore di Inferenza:", self.inference_backend_combo)
+        self.quantization_combo = QComboBox()
+        self.quantization_combo.addItems(AVAILABLE_WHISPER_QUANTIZATIONS)
+        self.quantization_combo.setCurrentText(self.profile_manager.get_profile_setting("whisper_quantization", DEFAULT_WHISPER_QUANTIZATION))
+        self.quantization_combo.setToolTip("Solo openai-whisper su CPU: 'int8' riduce memoria e tempi (la prima conversione viene salvata in cache).")
+        general_form_layout.addRow("Quantizzazione Modello:", self.quantization_combo)
+        self.vad_engine_combo = QComboBox()
+        self.vad_engine_combo.addItems(AVAILABLE_VAD_ENGINES)
+        self.vad_engine_combo.setCurrentText(self.profile_manager.get_profile_setting("vad_engine", DEFAULT_VAD_ENGINE))
+        self.vad_engine_combo.setToolTip("Rilevamento del parlato: 'energy' (energia adattiva) o 'webrtc' (richiede il pacchetto webrtcvad).")
+        general_form_layout.addRow("Rilevamento Voce (VAD):", self.vad_engine_combo)
+        self.backpressure_policy_combo = QComboBox()
+        self.backpressure_policy_combo.addItems(AVAILABLE_BACKPRESSURE_POLICIES)
+        self.backpressure_policy_combo.setCurrentText(self.profile_manager.get_profile_setting("backpressure_policy", DEFAULT_BACKPRESSURE_POLICY))
+        self.backpressure_policy_combo.setToolTip("Se la trascrizione resta indietro: 'drop' scarta il segmento più vecchio, 'merge' unisce i segmenti in attesa, 'degrade' usa un modello più veloce.")
+        general_form_layout.addRow("Coda Trascrizione Piena:", self.backpressure_policy_combo)
+        self.short_utterance_mode_combo = QComboBox()
+        self.short_utterance_mode_combo.addItems(AVAILABLE_SHORT_UTTERANCE_MODES)
+        self.short_utterance_mode_combo.setCurrentText(self.profile_manager.get_profile_setting("short_utterance_mode", DEFAULT_SHORT_UTTERANCE_MODE))
+        self.short_utterance_mode_combo.setToolTip("Frasi brevi: 'off' usa sempre la finestra di 30 s, 'trimmed' la taglia sulla durata della frase, 'bucketed' usa poche lunghezze fisse.")
+        general_form_layout.addRow("Percorso Rapido Frasi Brevi:", self.short_utterance_mode_combo)
         self.output_internal_editor_check = QCheckBox("Scrivi nell'editor interno dell'app")
         self.output_internal_editor_check.setChecked(self.profile_manager.get_profile_setting("output_to_internal_editor", INTERNAL_EDITOR_ENABLED_DEFAULT))
         general_form_layout.addRow(self.output_internal_editor_check)
+        self.external_output_mode_combo = QComboBox()
+        self.external_output_mode_combo.addItems(AVAILABLE_EXTERNAL_OUTPUT_MODES)
+        self.external_output_mode_combo.setCurrentText(self.profile_manager.get_profile_setting("external_output_mode", DEFAULT_EXTERNAL_OUTPUT_MODE))
+        self.external_output_mode_combo.setToolTip("Applicazioni esterne: 'paste' incolla il testo dagli appunti (che vengono poi ripristinati), 'type' lo digita carattere per carattere.")
+        general_form_layout.addRow("Inserimento in App Esterne:", self.external_output_mode_combo)
         self.record_audio_check = QCheckBox("Registra audio per debug (in logs/audio_debugs)")
         self.record_audio_check.setChecked(self.profile_manager.get_profile_setting("enable_audio_debug_recording", False))
         general_form_layout.addRow(self.record_audio_check)
@@ -418,20 +458,28 @@ class ProfileSettingsDialog(QDialog):
             QMessageBox.warning(self, "Nome Esistente", f"Un profilo chiamato '{new_display_name}' esiste già.")
             return
         
-        self.profile_manager.set_profile_setting("display_name", new_display_name)
-        self.profile_manager.set_profile_setting("whisper_model", self.model_combo.currentText())
-        self.profile_manager.set_profile_setting("output_to_internal_editor", self.output_internal_editor_check.isChecked())
-        self.profile_manager.set_profile_setting("enable_audio_debug_recording", self.record_audio_check.isChecked())
-
-        new_macros = {self.macros_table.item(r, 0).text(): self.macros_table.item(r, 1).text()
-                      for r in range(self.macros_table.rowCount()) if self.macros_table.item(r,0) and self.macros_table.item(r,0).text().strip()}
-        self.profile_manager.update_macros(new_macros)
+        # Una sola notifica (e un solo nuovo snapshot) per tutte le modifiche del dialogo
+        with self.profile_manager.batch_update():
+            self.profile_manager.set_profile_setting("display_name", new_display_name)
+            self.profile_manager.set_profile_setting("whisper_model", self.model_combo.currentText())
+            self.profile_manager.set_profile_setting("inference_backend", self.inference_backend_combo.currentText())
+            self.profile_manager.set_profile_setting("whisper_quantization", self.quantization_combo.currentText())
+            self.profile_manager.set_profile_setting("vad_engine", self.vad_engine_combo.currentText())
+            self.profile_manager.set_profile_setting("backpressure_policy", self.backpressure_policy_combo.currentText())
+            self.profile_manager.set_profile_setting("short_utterance_mode", self.short_utterance_mode_combo.currentText())
+            self.profile_manager.set_profile_setting("output_to_internal_editor", self.output_internal_editor_check.isChecked())
+            self.profile_manager.set_profile_setting("external_output_mode", self.external_output_mode_combo.currentText())
+            self.profile_manager.set_profile_setting("enable_audio_debug_recording", self.record_audio_check.isChecked())
+
+            new_macros = {self.macros_table.item(r, 0).text(): self.macros_table.item(r, 1).text()
+                          for r in range(self.macros_table.rowCount()) if self.macros_table.item(r,0) and self.macros_table.item(r,0).text().strip()}
+            self.profile_manager.update_macros(new_macros)
         
-        self.profile_manager.update_vocabulary(self.vocab_text_edit.toPlainText().splitlines())
+            self.profile_manager.update_vocabulary(self.vocab_text_edit.toPlainText().splitlines())
         
-        new_pron_rules = {self.pron_table.item(r, 0).text(): self.pron_table.item(r, 1).text()
-                          for r in range(self.pron_table.rowCount()) if self.pron_table.item(r,0) and self.pron_table.item(r,0).text().strip()}
-        self.profile_manager.update_pronunciation_rules(new_pron_rules)
+            new_pron_rules = {self.pron_table.item(r, 0).text(): self.pron_table.item(r, 1).text()
+                              for r in range(self.pron_table.rowCount()) if self.pron_table.item(r,0) and self.pron_table.item(r,0).text().strip()}
+            self.profile_manager.update_pronunciation_rules(new_pron_rules)
 
         if self.profile_manager.save_current_profile_data():
             app_logger.info("Impostazioni profilo salvate.")
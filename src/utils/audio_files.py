@@ -0,0 +1,80 @@
+# src/utils/audio_files.py
+import re
+import wave
+from typing import List, Tuple
+
+import numpy as np
+
+from src.config import AUDIO_SAMPLE_RATE
+
+# Punteggiatura esclusa dal confronto delle parole (gli apostrofi restano: "l'esame" è una parola)
+_PUNCTUATION_PATTERN = re.compile(r"[^\w\s']+")
+
+
+def read_wav_mono(path: str, target_rate: int = AUDIO_SAMPLE_RATE) -> Tuple[np.ndarray, int]:
+    """
+    Legge un file audio e restituisce (campioni float32 in [-1, 1] del primo canale, frequenza).
+    Con il pacchetto opzionale soundfile legge tutti i formati che supporta (WAV, FLAC, OGG...);
+    altrimenti solo WAV PCM a 8, 16 o 32 bit tramite il modulo wave.
+    Se target_rate è indicato e diverso da quello del file, ricampiona con interpolazione lineare.
+    """
+    try:
+        import soundfile
+    except ImportError:
+        soundfile = None
+    if soundfile is not None:
+        try:
+            data, wav_rate = soundfile.read(str(path), dtype='float32', always_2d=True)
+        except RuntimeError as e: # soundfile segnala così i formati non riconosciuti
+            raise ValueError(f"File audio non leggibile: {path} ({e})")
+        samples = data[:, 0]
+    else:
+        if not str(path).lower().endswith(".wav"):
+            raise ValueError(f"Per leggere file diversi da WAV serve il pacchetto soundfile: {path}")
+        with wave.open(str(path), 'rb') as wav_in:
+            sample_width = wav_in.getsampwidth()
+            wav_rate = wav_in.getframerate()
+            wav_channels = wav_in.getnchannels()
+            raw_data = wav_in.readframes(wav_in.getnframes())
+        if sample_width == 1: # PCM 8 bit senza segno
+            pcm_data = (np.frombuffer(raw_data, dtype=np.uint8).astype(np.float32) - 128.0) / 128.0
+        elif sample_width == 2:
+            pcm_data = np.frombuffer(raw_data, dtype='<i2').astype(np.float32) / 32768.0
+        elif sample_width == 4:
+            pcm_data = np.frombuffer(raw_data, dtype='<i4').astype(np.float32) / 2147483648.0
+        else:
+            raise ValueError(f"Sono supportati solo WAV PCM a 8, 16 o 32 bit: {path}")
+        samples = pcm_data.reshape(-1, wav_channels)[:, 0]
+    samples = np.ascontiguousarray(samples, dtype=np.float32)
+    if target_rate and wav_rate != target_rate and len(samples):
+        target_len = int(round(len(samples) * target_rate / wav_rate))
+        positions = np.linspace(0, len(samples) - 1, target_len)
+        samples = np.interp(positions, np.arange(len(samples)), samples).astype(np.float32)
+        wav_rate = target_rate
+    return samples, wav_rate
+
+
+def normalize_words(text: str) -> List[str]:
+    """Parole minuscole senza punteggiatura: la stessa normalizzazione per tutti i calcoli di WER."""
+    return _PUNCTUATION_PATTERN.sub(" ", text.lower()).split()
+
+
+def word_errors(reference: str, hypothesis: str) -> Tuple[int, int]:
+    """(sostituzioni + cancellazioni + inserimenti, parole del riferimento): distanza di Levenshtein sulle parole."""
+    ref_words, hyp_words = normalize_words(reference), normalize_words(hypothesis)
+    previous_row = list(range(len(hyp_words) + 1))
+    for i, ref_word in enumerate(ref_words, 1):
+        current_row = [i]
+        for j, hyp_word in enumerate(hyp_words, 1):
+            current_row.append(min(previous_row[j] + 1, current_row[j - 1] + 1,
+                                   previous_row[j - 1] + (ref_word != hyp_word)))
+        previous_row = current_row
+    return previous_row[-1], len(ref_words)
+
+
+def word_error_rate(reference: str, hypothesis: str) -> float:
+    """WER a livello di parola (distanza di Levenshtein / parole di riferimento)."""
+    errors, reference_words = word_errors(reference, hypothesis)
+    if not reference_words:
+        return 0.0 if not errors else 1.0
+    return errors / reference_words
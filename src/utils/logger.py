@@ -1,11 +1,23 @@
 # src/utils/logger.py
+import atexit
+import gzip
 import logging
+import logging.handlers
+import os
+import queue
+import shutil
 import sys
+from datetime import date
 from pathlib import Path # Path è già usato nella versione originale di config.py per LOG_FILE
+from threading import Lock
+from typing import Dict, List, Optional, Tuple
 
 # Importa le configurazioni rilevanti da src.config
 try:
-    from src.config import LOG_FILE, LOG_LEVEL, APP_NAME
+    from src.config import (
+        LOG_FILE, LOG_LEVEL, APP_NAME, LOG_MAX_BYTES, LOG_BACKUP_COUNT, LOG_ROTATE_DAILY,
+        LOG_RATE_LIMIT_INTERVAL_S, LOG_RATE_LIMIT_BURST
+    )
 except ImportError:
     # Fallback nel caso config.py non sia accessibile o le costanti non siano definite
     # Questo è più per robustezza durante lo sviluppo o in caso di problemi di importazione.
@@ -16,15 +28,138 @@ except ImportError:
     LOG_FILE = fallback_log_dir / "app_fallback.log"
     LOG_LEVEL = "INFO"
     APP_NAME = "TrascriviProApp_Fallback"
+    LOG_MAX_BYTES = 5 * 1024 * 1024
+    LOG_BACKUP_COUNT = 5
+    LOG_ROTATE_DAILY = True
+    LOG_RATE_LIMIT_INTERVAL_S = 10.0
+    LOG_RATE_LIMIT_BURST = 5
 
 # Definisci il formato del log qui per chiarezza
 LOG_FORMAT = '%(asctime)s - %(name)s - %(levelname)s - [%(module)s.%(funcName)s:%(lineno)d] - %(message)s'
 
+# Argomenti che si possono formattare più tardi, nel thread del listener, senza rischio che cambino
+_IMMUTABLE_ARG_TYPES = (str, int, float, bool, bytes, type(None))
+
+
+def _gzip_rotator(source: str, dest: str):
+    with open(source, 'rb') as f_in, gzip.open(dest, 'wb') as f_out:
+        shutil.copyfileobj(f_in, f_out)
+    os.remove(source)
+
+
+class CompressingRotatingFileHandler(logging.handlers.RotatingFileHandler):
+    """
+    Ruota il file quando supera max_bytes e, con daily=True, al primo messaggio di un nuovo giorno.
+    I file ruotati vengono compressi con gzip (app.log.1.gz, app.log.2.gz, ...).
+    """
+
+    def __init__(self, filename: Path, max_bytes: int = LOG_MAX_BYTES, backup_count: int = LOG_BACKUP_COUNT,
+                 daily: bool = LOG_ROTATE_DAILY):
+        super().__init__(filename, maxBytes=max_bytes, backupCount=backup_count, encoding='utf-8')
+        self.daily = daily
+        self.namer = lambda name: name + ".gz"
+        self.rotator = _gzip_rotator
+        self._current_day = self._file_day()
+
+    def _file_day(self) -> date:
+        # Un file di log già esistente appartiene al giorno della sua ultima scrittura
+        try:
+            file_stat = os.stat(self.baseFilename)
+            if file_stat.st_size > 0: return date.fromtimestamp(file_stat.st_mtime)
+        except OSError: pass
+        return date.today()
+
+    def shouldRollover(self, record: logging.LogRecord) -> bool:
+        if self.daily and date.fromtimestamp(record.created) != self._current_day:
+            return True
+        return bool(super().shouldRollover(record))
+
+    def doRollover(self):
+        super().doRollover()
+        self._current_day = date.today()
+
+
+class RateLimitFilter(logging.Filter):
+    """
+    Limita i messaggi ripetuti dello stesso punto di chiamata (file e riga): al massimo burst
+    messaggi ogni interval_s secondi. Il primo messaggio della finestra successiva riporta
+    quanti ne sono stati soppressi. I livelli sotto min_level passano sempre.
+    """
+
+    def __init__(self, interval_s: float = LOG_RATE_LIMIT_INTERVAL_S, burst: int = LOG_RATE_LIMIT_BURST,
+                 min_level: int = logging.WARNING):
+        super().__init__()
+        self.interval_s = interval_s
+        self.burst = max(1, burst)
+        self.min_level = min_level
+        # (file, riga) -> [inizio finestra, messaggi emessi, messaggi soppressi]
+        self._call_sites: Dict[Tuple[str, int], List] = {}
+        self._lock = Lock()
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno < self.min_level: return True
+        key = (record.pathname, record.lineno)
+        with self._lock:
+            state = self._call_sites.get(key)
+            if state is None or record.created - state[0] >= self.interval_s:
+                suppressed = state[2] if state is not None else 0
+                self._call_sites[key] = [record.created, 1, 0]
+            elif state[1] < self.burst:
+                state[1] += 1
+                suppressed = 0
+            else:
+                state[2] += 1
+                return False
+        if suppressed:
+            record.msg = f"{record.getMessage()} [{suppressed} messaggi simili soppressi]"
+            record.args = None
+        return True
+
+
+class _DeferredFormatQueueHandler(logging.handlers.QueueHandler):
+    """
+    Mette in coda il record senza formattarlo: messaggio e traceback vengono composti dal thread
+    del listener. Solo gli argomenti mutabili (liste, dizionari, oggetti) vengono fissati subito.
+    """
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        args = record.args
+        if args and not (isinstance(args, tuple) and all(isinstance(arg, _IMMUTABLE_ARG_TYPES) for arg in args)):
+            record.msg = record.getMessage()
+            record.args = None
+        return record
+
+
+# Un QueueListener per logger configurato: riconfigurare un logger non tocca gli altri
+_listeners: Dict[str, logging.handlers.QueueListener] = {}
+_listeners_lock = Lock()
+
+
+def stop_logging(logger_name: Optional[str] = None):
+    """
+    Scrive i messaggi ancora in coda e chiude i file di log del logger indicato,
+    oppure di tutti i logger configurati se logger_name è None (chiamata anche all'uscita).
+    """
+    with _listeners_lock:
+        if logger_name is None:
+            listeners = list(_listeners.values())
+            _listeners.clear()
+        else:
+            listener = _listeners.pop(logger_name, None)
+            listeners = [listener] if listener is not None else []
+    for listener in listeners:
+        listener.stop()
+        for handler in listener.handlers:
+            handler.close()
+
+
 def setup_logger(logger_name: str = APP_NAME,
                  log_file_path: Path = LOG_FILE,
                  level_name: str = LOG_LEVEL) -> logging.Logger:
     """
     Configura e restituisce un'istanza del logger per l'applicazione.
+    I thread che loggano si limitano a mettere il record in una coda (QueueHandler); un QueueListener
+    lo formatta e lo scrive su file (con rotazione e compressione) e su console.
     """
     logger = logging.getLogger(logger_name)
 
@@ -40,21 +175,24 @@ def setup_logger(logger_name: str = APP_NAME,
         level_name = "INFO" # Aggiorna level_name per coerenza con l'attributo sotto
 
 
-    # Evita di aggiungere handler multipli se la funzione viene chiamata più volte
+    # Evita di aggiungere handler e filtri multipli se la funzione viene chiamata più volte
     if logger.hasHandlers():
         logger.handlers.clear()
+    for old_filter in [f for f in logger.filters if isinstance(f, RateLimitFilter)]:
+        logger.removeFilter(old_filter)
+    stop_logging(logger_name)
 
     # Crea il formatter
     formatter = logging.Formatter(LOG_FORMAT)
+    handlers: List[logging.Handler] = []
 
-    # Handler per scrivere su file
+    # Handler per scrivere su file (il livello si filtra sul logger, prima di mettere in coda)
     try:
         # Assicurati che la directory del file di log esista
         log_file_path.parent.mkdir(parents=True, exist_ok=True)
-        file_handler = logging.FileHandler(log_file_path, encoding='utf-8')
+        file_handler = CompressingRotatingFileHandler(log_file_path)
         file_handler.setFormatter(formatter)
-        file_handler.setLevel(logger.getEffectiveLevel()) # L'handler dovrebbe avere lo stesso livello del logger o inferiore
-        logger.addHandler(file_handler)
+        handlers.append(file_handler)
     except Exception as e:
         # Questo è un problema serio, stampalo sulla console standard
         # perché il logger potrebbe non essere ancora completamente configurato.
@@ -63,49 +201,65 @@ def setup_logger(logger_name: str = APP_NAME,
     # Handler per scrivere sulla console (stdout)
     console_handler = logging.StreamHandler(sys.stdout)
     console_handler.setFormatter(formatter)
-    console_handler.setLevel(logger.getEffectiveLevel()) # Anche per la console
-    logger.addHandler(console_handler)
+    handlers.append(console_handler)
+
+    log_queue: queue.SimpleQueue = queue.SimpleQueue()
+    listener = logging.handlers.QueueListener(log_queue, *handlers, respect_handler_level=True)
+    listener.start()
+    with _listeners_lock:
+        _listeners[logger_name] = listener
+    logger.addHandler(_DeferredFormatQueueHandler(log_queue))
+    logger.addFilter(RateLimitFilter())
 
     # Aggiungiamo un attributo per recuperare il nome del livello dalla config,
     # utile per il dialogo delle impostazioni per mostrare il livello corrente.
     logger.level_name_from_config = level_name.upper()
 
-    logger.info(f"Logger '{logger_name}' configurato. Livello effettivo: {logging.getLevelName(logger.getEffectiveLevel())}. File di log: {log_file_path}")
+    logger.info("Logger '%s' configurato. Livello effettivo: %s. File di log: %s",
+                logger_name, logging.getLevelName(logger.getEffectiveLevel()), str(log_file_path))
     return logger
 
+
+def set_log_level(level_name: str, logger: Optional[logging.Logger] = None) -> bool:
+    """Cambia al volo il livello del logger (es. dalle impostazioni). False se il livello non è valido."""
+    logger = logger or app_logger
+    numeric_level = getattr(logging, str(level_name).upper(), None)
+    if not isinstance(numeric_level, int):
+        logger.error("Livello log non valido: %s", level_name)
+        return False
+    logger.setLevel(numeric_level)
+    logger.level_name_from_config = str(level_name).upper()
+    logger.info("Livello log applicazione aggiornato a: %s", logger.level_name_from_config)
+    return True
+
+
 # Istanza globale del logger per l'applicazione
 # Viene configurato quando il modulo logger.py viene importato per la prima volta.
 app_logger = setup_logger()
+atexit.register(stop_logging)
 
 if __name__ == '__main__':
     # Esempio di utilizzo per testare il logger
     print(f"Test logger. Livello impostato: {app_logger.level_name_from_config}")
     print(f"Livello effettivo del logger: {logging.getLevelName(app_logger.getEffectiveLevel())}")
-    
+
     app_logger.debug("Questo è un messaggio di debug (visibile se LOG_LEVEL è DEBUG).")
     app_logger.info("Questo è un messaggio informativo.")
     app_logger.warning("Questo è un avviso.")
     app_logger.error("Questo è un errore.")
     app_logger.critical("Questo è un errore critico.")
 
-    # Test cambio livello al volo (simula quello che farebbe AppSettingsDialog)
+    # Test cambio livello al volo (come MainWindow.handle_app_settings_changed)
     print("\n--- Cambio livello log a DEBUG (solo per questo test, non persistente) ---")
-    # Nota: questa modifica diretta non è come l'app lo farebbe; l'app
-    # modificherebbe la preferenza e poi MainWindow.handle_app_settings_changed
-    # chiamerebbe app_logger.setLevel e handler.setLevel.
-    # Per un test semplice qui, modifichiamo direttamente l'istanza.
-    app_logger.setLevel(logging.DEBUG)
-    for handler in app_logger.handlers: # Importante aggiornare anche gli handler
-        handler.setLevel(logging.DEBUG)
-    app_logger.level_name_from_config = "DEBUG" # Simula aggiornamento
-    
+    set_log_level("DEBUG")
     print(f"Nuovo livello effettivo del logger: {logging.getLevelName(app_logger.getEffectiveLevel())}")
     app_logger.debug("Ora questo messaggio di debug DOVREBBE essere visibile.")
     app_logger.info("Messaggio informativo dopo cambio livello.")
 
+    # Avvisi ripetuti dallo stesso punto: ne passano LOG_RATE_LIMIT_BURST per finestra
+    for i in range(LOG_RATE_LIMIT_BURST + 3):
+        app_logger.warning("Avviso ripetuto n. %d", i)
+
     # Ripristina a un livello più comune per non inondare i log se il test viene eseguito più volte
     # Questa è solo una precauzione per il blocco if __name__ == '__main__'
-    app_logger.setLevel(logging.INFO)
-    for handler in app_logger.handlers:
-        handler.setLevel(logging.INFO)
-    app_logger.level_name_from_config = "INFO"
\ No newline at end of file
+    set_log_level("INFO")
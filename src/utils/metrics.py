@@ -0,0 +1,209 @@
+# src/utils/metrics.py
+import json
+import math
+import time
+from collections import deque
+from datetime import datetime
+from pathlib import Path
+from threading import Event, Lock, Thread
+from typing import Any, Deque, Dict, Optional
+
+from src.config import METRICS_ENABLED, METRICS_DUMP_INTERVAL_S
+
+
+class Counter:
+    def __init__(self):
+        self._lock = Lock()
+        self.value = 0
+
+    def inc(self, amount: int = 1):
+        with self._lock:
+            self.value += amount
+
+    def snapshot(self) -> Any:
+        return self.value
+
+
+class Gauge:
+    def __init__(self):
+        self.value: float = 0.0
+
+    def set(self, value: float):
+        self.value = value
+
+    def snapshot(self) -> Any:
+        return self.value
+
+
+class Histogram:
+    """Conteggio, somma, minimo e massimo di tutte le osservazioni, percentili sulle più recenti."""
+
+    def __init__(self, window: int = 512):
+        self._lock = Lock()
+        self.count = 0
+        self.total = 0.0
+        self.min: Optional[float] = None
+        self.max: Optional[float] = None
+        self._recent: Deque[float] = deque(maxlen=window)
+
+    def observe(self, value: float):
+        with self._lock:
+            self.count += 1
+            self.total += value
+            self.min = value if self.min is None else min(self.min, value)
+            self.max = value if self.max is None else max(self.max, value)
+            self._recent.append(value)
+
+    def percentile(self, q: float) -> Optional[float]:
+        with self._lock:
+            values = sorted(self._recent)
+        if not values:
+            return None
+        return values[min(len(values) - 1, max(0, math.ceil(q * len(values)) - 1))]
+
+    def snapshot(self) -> Any:
+        return {
+            "count": self.count,
+            "mean": (self.total / self.count) if self.count else None,
+            "min": self.min, "max": self.max,
+            "p50": self.percentile(0.5), "p95": self.percentile(0.95),
+        }
+
+
+class Timer:
+    """Context manager che registra in un istogramma la durata del blocco (secondi)."""
+    __slots__ = ("_histogram", "_started_at")
+
+    def __init__(self, histogram: Histogram):
+        self._histogram = histogram
+        self._started_at = 0.0
+
+    def __enter__(self):
+        self._started_at = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self._histogram.observe(time.perf_counter() - self._started_at)
+        return False
+
+
+class _NullMetric:
+    """Metrica (e timer) che non registra nulla: usata quando le metriche sono disabilitate."""
+    value = 0
+    count = 0
+
+    def inc(self, amount: int = 1): pass
+
+    def set(self, value: float): pass
+
+    def observe(self, value: float): pass
+
+    def percentile(self, q: float) -> Optional[float]:
+        return None
+
+    def snapshot(self) -> Any:
+        return None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+
+_NULL_METRIC = _NullMetric()
+
+
+class MetricsRegistry:
+    """
+    Registro in-process delle metriche della pipeline di dettatura (thread-safe).
+    Se disabilitato restituisce sempre la stessa metrica vuota: chi registra non paga lock né calcoli.
+    """
+
+    def __init__(self, enabled: bool = METRICS_ENABLED):
+        self.enabled = enabled
+        self._lock = Lock()
+        self._metrics: Dict[str, Any] = {}
+
+    def _get_or_create(self, name: str, metric_class):
+        if not self.enabled:
+            return _NULL_METRIC
+        metric = self._metrics.get(name)
+        if metric is None:
+            with self._lock:
+                metric = self._metrics.setdefault(name, metric_class())
+        return metric
+
+    def counter(self, name: str) -> Counter:
+        return self._get_or_create(name, Counter)
+
+    def gauge(self, name: str) -> Gauge:
+        return self._get_or_create(name, Gauge)
+
+    def histogram(self, name: str) -> Histogram:
+        return self._get_or_create(name, Histogram)
+
+    def timer(self, name: str) -> Timer:
+        """Uso: with metrics.timer("fase_s"): ... (la durata finisce nell'istogramma name)."""
+        if not self.enabled:
+            return _NULL_METRIC
+        return Timer(self.histogram(name))
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            items = list(self._metrics.items())
+        return {name: metric.snapshot() for name, metric in sorted(items)}
+
+
+class MetricsDumper:
+    """
+    Scrive periodicamente l'istantanea del registro in un file JSON Lines (una riga per dump,
+    con data e ora). Se dall'ultimo dump non è cambiato nulla la riga viene saltata.
+    """
+
+    def __init__(self, path: Path, registry: Optional[MetricsRegistry] = None,
+                 interval_s: float = METRICS_DUMP_INTERVAL_S):
+        self.path = Path(path)
+        self.registry = registry or metrics
+        self.interval_s = interval_s
+        self._last_snapshot: Optional[Dict[str, Any]] = None
+        self._stop_event = Event()
+        self._thread: Optional[Thread] = None
+
+    def start(self):
+        if not self.registry.enabled or (self._thread is not None and self._thread.is_alive()):
+            return
+        self._stop_event.clear()
+        self._thread = Thread(target=self._run, name="MetricsDumper", daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        while not self._stop_event.wait(self.interval_s):
+            self.dump()
+
+    def dump(self) -> bool:
+        """Aggiunge una riga al file. False se non è cambiato nulla o la scrittura non è riuscita."""
+        snapshot = self.registry.snapshot()
+        if not snapshot or snapshot == self._last_snapshot:
+            return False
+        line = json.dumps({"ts": datetime.now().isoformat(timespec="seconds"), "metrics": snapshot})
+        try:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            with open(self.path, 'a', encoding='utf-8') as f:
+                f.write(line + "\n")
+        except OSError:
+            return False
+        self._last_snapshot = snapshot
+        return True
+
+    def stop(self):
+        """Ferma il thread e scrive un'ultima istantanea."""
+        if self._thread is not None:
+            self._stop_event.set()
+            self._thread.join()
+            self._thread = None
+        self.dump()
+
+
+# Istanza globale del registro, come app_logger per il logging.
+metrics = MetricsRegistry()